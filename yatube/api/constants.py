@@ -0,0 +1,2 @@
+API_PAGE_SIZE: int = 20
+API_MAX_PAGE_SIZE: int = 100
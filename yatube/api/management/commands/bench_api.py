@@ -0,0 +1,68 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from core.benchmark import isolated_database
+from posts.models import Comment, Group, Post, User
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность JSON API и HTML-страниц '
+            'на временной базе.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--requests', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with isolated_database(), override_settings(
+                ALLOWED_HOSTS=['*'], PAGE_CACHE_TIMEOUT=0, DEBUG=False):
+            group = self.seed(options['posts'])
+            self.compare(group, options['requests'])
+
+    def seed(self, total):
+        author = User.objects.create_user(username='bench')
+        group = Group.objects.create(title='Бенчмарк', slug='bench')
+        with transaction.atomic():
+            Post.objects.bulk_create(
+                Post(text=f'Пост {i} ' * 30, author=author, group=group)
+                for i in range(total)
+            )
+            Comment.objects.bulk_create(
+                Comment(post_id=pk, author=author, text='Комментарий')
+                for pk in Post.objects.values_list('pk', flat=True)[:100]
+            )
+        return group
+
+    def compare(self, group, total):
+        api_posts = reverse('api:v1:post_list')
+        cases = (
+            ('HTML /', reverse('posts:index'), {}),
+            ('HTML /group/', reverse('posts:group_list', args=(group.slug,)),
+             {}),
+            ('API posts', api_posts + '?limit=10', {}),
+            ('API posts, fields=id,text', api_posts + '?limit=10&fields=id,'
+             'text', {}),
+            ('API group', api_posts + f'?limit=10&group={group.slug}', {}),
+        )
+        client = Client()
+        etag = client.get(api_posts + '?limit=10')['ETag']
+        cases += (('API posts, 304', api_posts + '?limit=10',
+                   {'HTTP_IF_NONE_MATCH': etag}),)
+        self.stdout.write(f'{"":>28} {"req/s":>9} {"bytes":>8} {"SQL":>5}')
+        for title, address, headers in cases:
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(address, **headers)
+            query_count = len(queries)
+            started = time.perf_counter()
+            for _ in range(total):
+                client.get(address, **headers)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{title:>28} {total / elapsed:9.1f} '
+                f'{len(response.content):8} {query_count:5}'
+            )
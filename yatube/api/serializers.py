@@ -0,0 +1,118 @@
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.models import Comment, Post
+
+
+def count_of(model, field):
+    """Число связанных записей коррелированным подзапросом:
+    он вычисляется только для строк страницы и не требует GROUP BY."""
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field).annotate(total=Count('pk')).values('total'),
+        output_field=IntegerField(),
+    ), 0)
+
+
+class Serializer:
+    """
+    Преобразует объекты модели в словари для JSON.
+    fields - имя поля и функция, получающая значение из объекта,
+    related - пути select_related, нужные полю,
+    annotations - аннотации queryset, нужные полю.
+    Queryset подготавливается под запрошенные поля заранее, поэтому
+    сериализация страницы не выполняет дополнительных запросов.
+    """
+
+    fields = {}
+    related = {}
+    annotations = {}
+
+    def __init__(self, names=None):
+        self.names = tuple(names or self.fields)
+        unknown = set(self.names) - set(self.fields)
+        if unknown:
+            raise ValueError(
+                'Неизвестные поля: ' + ', '.join(sorted(unknown)))
+
+    def prepare(self, queryset):
+        related = [
+            path
+            for name in self.names
+            for path in self.related.get(name, ())
+        ]
+        annotations = {
+            name: self.annotations[name]
+            for name in self.names
+            if name in self.annotations
+        }
+        if related:
+            queryset = queryset.select_related(*related)
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        return queryset
+
+    def to_dict(self, obj):
+        return {name: self.fields[name](obj) for name in self.names}
+
+
+def isoformat(value):
+    return value.isoformat() if value else None
+
+
+class GroupSerializer(Serializer):
+    fields = {
+        'id': lambda group: group.pk,
+        'slug': lambda group: group.slug,
+        'title': lambda group: group.title,
+        'description': lambda group: group.description,
+        'posts_count': lambda group: group.posts_count,
+    }
+    annotations = {
+        'posts_count': count_of(Post, 'group'),
+    }
+
+
+class PostSerializer(Serializer):
+    fields = {
+        'id': lambda post: post.pk,
+        'text': lambda post: post.text,
+        'pub_date': lambda post: isoformat(post.pub_date),
+        'updated': lambda post: isoformat(post.updated),
+        'author': lambda post: post.author.username,
+        'group': lambda post: post.group.slug if post.group else None,
+        'image': lambda post: post.image.url if post.image else None,
+        'comments_count': lambda post: post.comments_count,
+    }
+    related = {
+        'author': ('author',),
+        'group': ('group',),
+    }
+    annotations = {
+        'comments_count': count_of(Comment, 'post'),
+    }
+
+
+class CommentSerializer(Serializer):
+    fields = {
+        'id': lambda comment: comment.pk,
+        'post': lambda comment: comment.post_id,
+        'author': lambda comment: comment.author.username,
+        'text': lambda comment: comment.text,
+        'created': lambda comment: isoformat(comment.created),
+    }
+    related = {
+        'author': ('author',),
+    }
+
+
+class FollowSerializer(Serializer):
+    fields = {
+        'id': lambda follow: follow.pk,
+        'user': lambda follow: follow.user.username,
+        'author': lambda follow: follow.author.username,
+    }
+    related = {
+        'user': ('user',),
+        'author': ('author',),
+    }
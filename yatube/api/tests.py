@@ -0,0 +1,122 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+from . import views
+from .serializers import PostSerializer
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Тестовый текст {i}',
+                author=cls.author,
+                group=cls.group if i % 2 else None,
+            )
+            for i in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_post_list_cursor_pagination(self):
+        """Курсор обходит все посты от новых к старым без повторов."""
+        address = reverse('api:v1:post_list') + '?limit=2'
+        ids = []
+        while address:
+            data = self.client.get(address).json()
+            ids += [post['id'] for post in data['results']]
+            address = data['next']
+        self.assertEqual(ids, [post.pk for post in reversed(self.posts)])
+
+    def test_post_fields(self):
+        """Пост сериализуется со всеми полями, связанными
+        объектами и числом комментариев."""
+        data = self.client.get(reverse(
+            'api:v1:post_detail', args=(self.posts[1].pk,))).json()
+        self.assertEqual(data['author'], 'Author')
+        self.assertEqual(data['group'], 'test-slug')
+        self.assertIsNone(data['image'])
+        first = self.client.get(reverse(
+            'api:v1:post_detail', args=(self.posts[0].pk,))).json()
+        self.assertEqual(first['comments_count'], 1)
+
+    def test_sparse_fieldsets(self):
+        """Параметр fields ограничивает набор полей."""
+        address = reverse('api:v1:post_list')
+        data = self.client.get(address, {'fields': 'id,text'}).json()
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        response = self.client.get(address, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_internal_value_error_not_bad_request(self):
+        """Некорректные limit и курсор дают ответ 400, а ValueError
+        внутри сериализатора не превращается в 400 с текстом ошибки."""
+        fields = dict(PostSerializer.fields, text=mock.Mock(
+            side_effect=ValueError('внутренняя ошибка')))
+        for params in ({'limit': 'много'}, {'after': 'abc'}):
+            with self.subTest(params=params):
+                response = self.client.get(
+                    reverse('api:v1:group_list'), params)
+                self.assertEqual(response.status_code, 400)
+        request = RequestFactory().get(reverse('api:v1:post_list'))
+        with mock.patch.object(PostSerializer, 'fields', fields), \
+                self.assertRaises(ValueError):
+            views.post_list(request)
+
+    def test_fixed_query_count(self):
+        """Число запросов не зависит от размера страницы."""
+        address = reverse('api:v1:post_list')
+        for limit in (1, 5):
+            with self.subTest(limit=limit), self.assertNumQueries(1):
+                self.client.get(address, {'limit': limit})
+        with self.assertNumQueries(1):
+            self.client.get(reverse('api:v1:group_list'))
+
+    def test_etag(self):
+        """Повторный запрос с If-None-Match получает 304."""
+        address = reverse('api:v1:group_list')
+        etag = self.client.get(address)['ETag']
+        response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        Group.objects.create(title='Новая', slug='new')
+        response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_comments(self):
+        address = reverse('api:v1:comment_list', args=(self.posts[0].pk,))
+        data = self.client.get(address).json()
+        self.assertEqual(data['results'][0]['author'], 'Reader')
+        missing = reverse('api:v1:comment_list', args=(0,))
+        self.assertEqual(self.client.get(missing).status_code, 404)
+
+    def test_follows_require_login(self):
+        """Подписки видны только авторизованному пользователю."""
+        address = reverse('api:v1:follow_list')
+        self.assertEqual(self.client.get(address).status_code, 401)
+        data = self.reader_client.get(address).json()
+        self.assertEqual(data['results'][0]['author'], 'Author')
+
+    def test_read_only(self):
+        response = self.client.post(reverse('api:v1:post_list'))
+        self.assertEqual(response.status_code, 405)
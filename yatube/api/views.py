@@ -0,0 +1,170 @@
+import hashlib
+from functools import wraps
+
+from django.http import Http404, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_safe
+
+from posts.models import Comment, Follow, Group, Post
+from posts.utils import KeysetPaginator
+
+from .constants import API_MAX_PAGE_SIZE, API_PAGE_SIZE
+from .serializers import (CommentSerializer, FollowSerializer,
+                          GroupSerializer, PostSerializer)
+
+
+class NotAuthenticated(Exception):
+    pass
+
+
+class BadRequest(Exception):
+    """Некорректные параметры запроса; текст передаётся клиенту."""
+
+
+def json_response(request, data, status=200):
+    """JSON-ответ с ETag по содержимому; при совпадении
+    If-None-Match тело не передаётся."""
+    response = JsonResponse(
+        data, status=status, json_dumps_params={'ensure_ascii': False})
+    if status != 200:
+        return response
+    etag = '"{}"'.format(hashlib.md5(response.content).hexdigest())
+    response['ETag'] = etag
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+def api_view(view):
+    """Только безопасные методы; ошибки возвращаются в JSON."""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return json_response(request, view(request, *args, **kwargs))
+        except BadRequest as error:
+            return json_response(request, {'detail': str(error)}, 400)
+        except Http404:
+            return json_response(request, {'detail': 'Не найдено.'}, 404)
+        except NotAuthenticated:
+            return json_response(
+                request, {'detail': 'Требуется авторизация.'}, 401)
+    return wrapper
+
+
+def requested_fields(request, serializer_class):
+    fields = request.GET.get('fields')
+    if fields is None:
+        return None
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = set(names) - set(serializer_class.fields)
+    if unknown:
+        raise BadRequest('Неизвестные поля: ' + ', '.join(sorted(unknown)))
+    return names
+
+
+def page_size(request):
+    try:
+        limit = int(request.GET.get('limit', API_PAGE_SIZE))
+    except ValueError:
+        raise BadRequest('limit должен быть числом.')
+    return min(max(limit, 1), API_MAX_PAGE_SIZE)
+
+
+def page_link(request, param, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query.pop('after', None)
+    query.pop('before', None)
+    query[param] = cursor
+    return request.build_absolute_uri('?' + query.urlencode())
+
+
+def serialize_page(request, queryset, serializer_class, ordering=None):
+    """
+    Страница по курсору: для моделей с датой - KeysetPaginator
+    по (дата, id), для остальных - по id. Всего один запрос,
+    COUNT(*) не выполняется.
+    """
+    serializer = serializer_class(
+        requested_fields(request, serializer_class))
+    queryset = serializer.prepare(queryset)
+    limit = page_size(request)
+    if ordering is None:
+        rows, next_cursor, previous_cursor = id_page(request, queryset, limit)
+    else:
+        before = request.GET.get('before')
+        paginator = KeysetPaginator(
+            queryset, limit, cursor=before or request.GET.get('after'),
+            backwards=bool(before), ordering=ordering,
+        )
+        rows = paginator.page()
+        next_cursor = paginator.next_cursor
+        previous_cursor = paginator.previous_cursor
+    return {
+        'results': [serializer.to_dict(obj) for obj in rows],
+        'next': page_link(request, 'after', next_cursor),
+        'previous': page_link(request, 'before', previous_cursor),
+    }
+
+
+def id_page(request, queryset, limit):
+    after = request.GET.get('after')
+    if after:
+        if not after.isdigit():
+            raise BadRequest('Некорректный курсор.')
+        queryset = queryset.filter(pk__gt=int(after))
+    rows = list(queryset.order_by('pk')[:limit + 1])
+    next_cursor = str(rows[limit - 1].pk) if len(rows) > limit else None
+    return rows[:limit], next_cursor, None
+
+
+def serialize_one(request, queryset, serializer_class, **lookup):
+    serializer = serializer_class(
+        requested_fields(request, serializer_class))
+    obj = serializer.prepare(queryset).filter(**lookup).first()
+    if obj is None:
+        raise Http404
+    return serializer.to_dict(obj)
+
+
+@api_view
+def post_list(request):
+    posts = Post.objects.all()
+    if request.GET.get('group'):
+        posts = posts.filter(group__slug=request.GET['group'])
+    if request.GET.get('author'):
+        posts = posts.filter(author__username=request.GET['author'])
+    return serialize_page(request, posts, PostSerializer, '-pub_date')
+
+
+@api_view
+def post_detail(request, post_id):
+    return serialize_one(request, Post.objects, PostSerializer, pk=post_id)
+
+
+@api_view
+def comment_list(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    return serialize_page(
+        request, Comment.objects.filter(post_id=post_id),
+        CommentSerializer, 'created',
+    )
+
+
+@api_view
+def group_list(request):
+    return serialize_page(request, Group.objects.all(), GroupSerializer)
+
+
+@api_view
+def group_detail(request, slug):
+    return serialize_one(request, Group.objects, GroupSerializer, slug=slug)
+
+
+@api_view
+def follow_list(request):
+    if not request.user.is_authenticated:
+        raise NotAuthenticated
+    return serialize_page(
+        request, Follow.objects.filter(user=request.user), FollowSerializer)
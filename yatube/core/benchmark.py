@@ -0,0 +1,35 @@
+import time
+from contextlib import contextmanager
+
+from django.test.utils import setup_databases, teardown_databases
+
+
+@contextmanager
+def isolated_database(verbosity=0):
+    """Создаёт временную тестовую базу, чтобы замеры
+    не затрагивали рабочие данные."""
+    old_config = setup_databases(verbosity, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity)
+
+
+def measure(func, repeat=5):
+    """Возвращает список длительностей вызова func в секундах."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def percentile(values, pct):
+    """Перцентиль pct (0-100) по методу ближайшего ранга."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1,
+                       round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
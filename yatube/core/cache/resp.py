@@ -0,0 +1,266 @@
+"""Кэш-бэкенд для Redis-совместимых серверов без внешних зависимостей.
+
+Клиент говорит на протоколе RESP напрямую через сокет, поэтому
+подходит как для Redis, так и для совместимых серверов
+(KeyDB, Dragonfly, core.cache.stand_in для тестов).
+"""
+import pickle
+import socket
+import threading
+from urllib.parse import urlparse
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+PICKLE_MARK = b'\x80'
+# INCRBY, который не создаёт отсутствующий ключ: проверка и изменение
+# выполняются сервером атомарно, для отсутствующего ключа - nil.
+INCR_EXISTING = (
+    "if redis.call('EXISTS', KEYS[1]) == 0 then return false end "
+    "return redis.call('INCRBY', KEYS[1], ARGV[1])"
+)
+
+
+class RespError(Exception):
+    pass
+
+
+class RespConnection:
+    """Одно соединение с сервером, команды выполняются последовательно."""
+
+    def __init__(self, host, port, db=0, timeout=5):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.file = self.sock.makefile('rb')
+        if db:
+            self.execute('SELECT', db)
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+    @staticmethod
+    def encode(args):
+        chunks = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            chunks.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(chunks)
+
+    def read_reply(self):
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError('Соединение закрыто сервером')
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode()
+        if kind == b'-':
+            # Ошибка возвращается, а не выбрасывается: ответы на
+            # остальные команды конвейера ещё нужно дочитать.
+            return RespError(payload.decode())
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self.file.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(payload)
+            if length < 0:
+                return None
+            return [self.read_reply() for _ in range(length)]
+        raise RespError(f'Неизвестный ответ: {line!r}')
+
+    def execute(self, *args):
+        return self.pipeline([args])[0]
+
+    def pipeline(self, commands):
+        """Отправляет команды одним пакетом и читает все ответы;
+        первая ошибка сервера выбрасывается после того, как прочитаны
+        ответы на все команды."""
+        self.sock.sendall(b''.join(self.encode(args) for args in commands))
+        replies = [self.read_reply() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies
+
+
+class RespCache(BaseCache):
+    """
+    Кэш Django поверх Redis-совместимого сервера.
+    LOCATION - адрес вида redis://host:port/db.
+    Целые числа хранятся как есть, чтобы работал INCRBY,
+    остальные значения сериализуются pickle.
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        url = urlparse(location)
+        self.host = url.hostname or '127.0.0.1'
+        self.port = url.port or 6379
+        self.db = int(url.path.lstrip('/') or 0)
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = RespConnection(self.host, self.port, self.db)
+            self._local.connection = connection
+        return connection
+
+    def _call(self, *commands, retry=True):
+        try:
+            return self._pipeline(commands)
+        except (ConnectionError, OSError):
+            # Обрыв после отправки (например, таймаут чтения) не значит,
+            # что команды не выполнены: повторяются только те, повтор
+            # которых безопасен.
+            if not retry:
+                raise
+            return self._pipeline(commands)
+
+    def _pipeline(self, commands):
+        try:
+            return self.connection.pipeline(commands)
+        except RespError:
+            raise
+        except BaseException:
+            # Часть ответов могла остаться в сокете и достаться
+            # следующим командам потока: соединение закрывается.
+            self._disconnect()
+            raise
+
+    def _disconnect(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def encode(self, value):
+        if type(value) is int:
+            return str(value).encode()
+        return pickle.dumps(value, self.pickle_protocol)
+
+    @staticmethod
+    def decode(data):
+        if data.startswith(PICKLE_MARK):
+            return pickle.loads(data)
+        return int(data)
+
+    def _timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            return self.default_timeout
+        return timeout
+
+    def expiry_args(self, timeout):
+        # timeout <= 0 сюда не попадает: такие ключи удаляются.
+        timeout = self._timeout(timeout)
+        if timeout is None:
+            return ()
+        return ('PX', max(1, int(timeout * 1000)))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        timeout = self._timeout(timeout)
+        if timeout is not None and timeout <= 0:
+            return False
+        reply, = self._call(
+            ('SET', key, self.encode(value), 'NX',
+             *self.expiry_args(timeout)))
+        return reply == 'OK'
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        data, = self._call(('GET', key))
+        return default if data is None else self.decode(data)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        timeout = self._timeout(timeout)
+        if timeout is not None and timeout <= 0:
+            self._call(('DEL', key))
+            return
+        self._call(('SET', key, self.encode(value),
+                    *self.expiry_args(timeout)))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        timeout = self._timeout(timeout)
+        if timeout is not None and timeout <= 0:
+            reply, = self._call(('DEL', key))
+            return bool(reply)
+        args = self.expiry_args(timeout)
+        if args:
+            reply, = self._call(('PEXPIRE', key, args[1]))
+        else:
+            reply, = self._call(('PERSIST', key))
+            reply = reply or self.has_key(key, version=version)
+        return bool(reply)
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._call(('DEL', key))
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        made = [self.make_key(key, version=version) for key in keys]
+        values, = self._call(('MGET', *made))
+        return {
+            key: self.decode(data)
+            for key, data in zip(keys, values)
+            if data is not None
+        }
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        reply, = self._call(('EXISTS', key))
+        return bool(reply)
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        reply, = self._call(
+            ('EVAL', INCR_EXISTING, 1, key, delta), retry=False)
+        if reply is None:
+            raise ValueError("Key '%s' not found" % key)
+        return reply
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        if timeout is not None and timeout <= 0:
+            self.delete_many(data, version=version)
+            return []
+        commands = []
+        for key, value in data.items():
+            key = self.make_key(key, version=version)
+            self.validate_key(key)
+            commands.append(('SET', key, self.encode(value),
+                             *self.expiry_args(timeout)))
+        if commands:
+            self._call(*commands)
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_key(key, version=version) for key in keys]
+        if keys:
+            self._call(('DEL', *keys))
+
+    def clear(self):
+        self._call(('FLUSHDB',))
+
+    def close(self, **kwargs):
+        # Django закрывает кэши после каждого запроса, а соединение
+        # выгоднее переиспользовать; разрывается оно только при ошибке.
+        pass
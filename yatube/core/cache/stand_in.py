@@ -0,0 +1,177 @@
+"""Минимальный Redis-совместимый сервер в памяти.
+
+Поддерживает подмножество команд, которое использует
+core.cache.resp.RespCache, а вместо Lua в EVAL - только его скрипты,
+реализованные на Python. Нужен для тестов и локальной разработки
+без установленного Redis.
+"""
+import socketserver
+import threading
+import time
+
+from .resp import INCR_EXISTING
+
+
+class Status(str):
+    pass
+
+
+class Error(str):
+    pass
+
+
+class Store:
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+        self.lock = threading.Lock()
+
+    def alive(self, key):
+        expires = self.expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def command(self, name, *args):
+        handler = getattr(self, 'cmd_' + name.decode().lower(), None)
+        if handler is None:
+            return Error(f'ERR unknown command {name.decode()}')
+        with self.lock:
+            return handler(*args)
+
+    def cmd_ping(self):
+        return Status('PONG')
+
+    def cmd_select(self, db):
+        return Status('OK')
+
+    def cmd_get(self, key):
+        return self.data[key] if self.alive(key) else None
+
+    def cmd_mget(self, *keys):
+        return [self.cmd_get(key) for key in keys]
+
+    def cmd_set(self, key, value, *options):
+        options = [option.upper() for option in options]
+        exists = self.alive(key)
+        if b'NX' in options and exists or b'XX' in options and not exists:
+            return None
+        self.data[key] = value
+        self.expires.pop(key, None)
+        for unit, scale in ((b'PX', 1000), (b'EX', 1)):
+            if unit in options:
+                ttl = int(options[options.index(unit) + 1]) / scale
+                self.expires[key] = time.monotonic() + ttl
+        return Status('OK')
+
+    def cmd_del(self, *keys):
+        deleted = 0
+        for key in keys:
+            if self.alive(key):
+                del self.data[key]
+                self.expires.pop(key, None)
+                deleted += 1
+        return deleted
+
+    def cmd_exists(self, *keys):
+        return sum(1 for key in keys if self.alive(key))
+
+    def cmd_incrby(self, key, delta):
+        try:
+            value = int(self.data[key]) if self.alive(key) else 0
+        except ValueError:
+            return Error('ERR value is not an integer or out of range')
+        value += int(delta)
+        self.data[key] = str(value).encode()
+        return value
+
+    def cmd_pexpire(self, key, ttl):
+        if not self.alive(key):
+            return 0
+        self.expires[key] = time.monotonic() + int(ttl) / 1000
+        return 1
+
+    def cmd_persist(self, key):
+        if not self.alive(key) or key not in self.expires:
+            return 0
+        del self.expires[key]
+        return 1
+
+    def cmd_eval(self, script, numkeys, *args):
+        handler = self.scripts.get(script.decode())
+        if handler is None:
+            return Error('NOSCRIPT unknown script')
+        numkeys = int(numkeys)
+        return handler(self, args[:numkeys], args[numkeys:])
+
+    def incr_existing(self, keys, argv):
+        if not self.alive(keys[0]):
+            return None
+        return self.cmd_incrby(keys[0], argv[0])
+
+    scripts = {INCR_EXISTING: incr_existing}
+
+    def cmd_flushdb(self):
+        self.data.clear()
+        self.expires.clear()
+        return Status('OK')
+
+
+def encode_reply(value):
+    if isinstance(value, Status):
+        return b'+%s\r\n' % value.encode()
+    if isinstance(value, Error):
+        return b'-%s\r\n' % value.encode()
+    if isinstance(value, int):
+        return b':%d\r\n' % value
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, list):
+        return b'*%d\r\n' % len(value) + b''.join(
+            encode_reply(item) for item in value)
+    return b'$%d\r\n%s\r\n' % (len(value), value)
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def read_command(self):
+        header = self.rfile.readline()
+        if not header:
+            return None
+        args = []
+        for _ in range(int(header[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            self.wfile.write(encode_reply(self.server.store.command(*args)))
+
+
+class StandInServer(socketserver.ThreadingTCPServer):
+    """Сервер на свободном порту: location подставляется в CACHES."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), Handler)
+        self.store = Store()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def location(self):
+        host, port = self.server_address[:2]
+        return f'redis://{host}:{port}/0'
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,62 @@
+import shutil
+import tempfile
+from statistics import median
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core.benchmark import isolated_database, measure
+from posts.models import Post
+from posts.seeding import seed
+
+METRICS_MIDDLEWARE = 'core.metrics.MetricsMiddleware'
+
+
+class Command(BaseCommand):
+    help = ('Измеряет накладные расходы MetricsMiddleware на временной '
+            'базе: запросы с метриками и без них.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=300)
+
+    def handle(self, *args, **options):
+        media_root = tempfile.mkdtemp()
+        try:
+            with override_settings(MEDIA_ROOT=media_root,
+                                   ALLOWED_HOSTS=['*'], DEBUG=False,
+                                   PAGE_CACHE_TIMEOUT=0), \
+                    isolated_database():
+                seed(users=100, posts=1000, images=0)
+                self.compare(options['repeat'])
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+
+    def compare(self, repeat):
+        post = Post.objects.order_by('-pk').first()
+        addresses = (
+            reverse('posts:index'),
+            reverse('posts:post_detail', args=(post.pk,)),
+            reverse('about:author'),
+        )
+        without = [name for name in settings.MIDDLEWARE
+                   if name != METRICS_MIDDLEWARE]
+        self.stdout.write(f'{"address":<16} {"без, мс":>10} '
+                          f'{"с метриками, мс":>16} {"разница, мкс":>13}')
+        for address in addresses:
+            client = Client()
+            timings = {}
+            # Чередуем варианты, чтобы дрейф машины влиял на оба.
+            for _ in range(5):
+                for name, middleware in (('off', without),
+                                         ('on', settings.MIDDLEWARE)):
+                    with override_settings(MIDDLEWARE=middleware):
+                        client.get(address)
+                        timings.setdefault(name, []).extend(measure(
+                            lambda: client.get(address), repeat // 5))
+            off, on = median(timings['off']), median(timings['on'])
+            self.stdout.write(
+                f'{address:<16} {off * 1000:>10.3f} {on * 1000:>16.3f} '
+                f'{(on - off) * 1e6:>13.0f} ({(on / off - 1) * 100:+.1f}%)')
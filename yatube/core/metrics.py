@@ -0,0 +1,211 @@
+"""Метрики запросов в памяти процесса.
+
+MetricsMiddleware замеряет для каждого представления время ответа,
+число и время SQL-запросов и время рендера шаблонов и складывает их
+в гистограммы. Представление metrics отдаёт их в текстовом формате
+Prometheus. Метрики свои у каждого процесса: Prometheus собирает
+их с каждого воркера отдельно.
+Запросы дольше METRICS_SLOW_REQUEST_SECONDS пишутся в журнал
+вместе с самыми долгими SQL-запросами.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import Template
+
+logger = logging.getLogger(__name__)
+
+SECONDS_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERIES_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+UNRESOLVED = '<unresolved>'
+
+_current = ContextVar('metrics_request', default=None)
+
+
+class Histogram:
+    """Гистограмма с накопленными счётчиками по корзинам для
+    каждого значения метки view."""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, view, value):
+        counts, total = self.series.get(view, (None, None))
+        if counts is None:
+            counts = [0] * (len(self.buckets) + 1)
+            total = [0, 0.0]
+            self.series[view] = counts, total
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += 1
+        total[1] += value
+
+    def exposition(self):
+        lines = [f'# HELP {self.name} {self.help_text}',
+                 f'# TYPE {self.name} histogram']
+        for view, (counts, (count, value_sum)) in sorted(
+                self.series.items()):
+            label = view.replace('\\', '\\\\').replace('"', '\\"')
+            cumulative = 0
+            for bound, amount in zip(self.buckets + ('+Inf',), counts):
+                cumulative += amount
+                lines.append(f'{self.name}_bucket{{view="{label}",'
+                             f'le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{view="{label}"}} {value_sum}')
+            lines.append(f'{self.name}_count{{view="{label}"}} {count}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {
+            'request': Histogram(
+                'yatube_request_seconds',
+                'Время ответа представления.', SECONDS_BUCKETS),
+            'queries': Histogram(
+                'yatube_sql_queries',
+                'Число SQL-запросов за запрос.', QUERIES_BUCKETS),
+            'sql': Histogram(
+                'yatube_sql_seconds',
+                'Время SQL-запросов за запрос.', SECONDS_BUCKETS),
+            'template': Histogram(
+                'yatube_template_seconds',
+                'Время рендера шаблонов без SQL-запросов из них.',
+                SECONDS_BUCKETS),
+        }
+
+    def observe(self, view, **values):
+        with self.lock:
+            for name, value in values.items():
+                self.histograms[name].observe(view, value)
+
+    def exposition(self):
+        with self.lock:
+            lines = []
+            for histogram in self.histograms.values():
+                lines.extend(histogram.exposition())
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        with self.lock:
+            for histogram in self.histograms.values():
+                histogram.series.clear()
+
+
+registry = Registry()
+
+
+class RequestMetrics:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.queries = []
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.sql_seconds += elapsed
+            self.queries.append((elapsed, sql))
+
+
+def _timed_render(render):
+    def wrapper(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return render(self, context, request)
+        started = time.perf_counter()
+        sql_before = metrics.sql_seconds
+        try:
+            return render(self, context, request)
+        finally:
+            metrics.template_seconds += (
+                time.perf_counter() - started
+                - (metrics.sql_seconds - sql_before))
+    wrapper.timed = True
+    return wrapper
+
+
+def install_template_timer():
+    """Оборачивает рендер шаблонов Django; вложенные include
+    идут мимо этого метода, поэтому время не считается дважды."""
+    if not getattr(Template.render, 'timed', False):
+        Template.render = _timed_render(Template.render)
+
+
+class MetricsMiddleware:
+    """Стоит первой в MIDDLEWARE, чтобы замер охватывал весь запрос.
+    Для потоковых ответов учитывается время до начала потока."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_template_timer()
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        wrappers = [connection.execute_wrapper(metrics)
+                    for connection in connections.all()]
+        started = time.perf_counter()
+        try:
+            for wrapper in wrappers:
+                wrapper.__enter__()
+            response = self.get_response(request)
+        finally:
+            for wrapper in reversed(wrappers):
+                wrapper.__exit__(None, None, None)
+            _current.reset(token)
+        elapsed = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match else UNRESOLVED
+        registry.observe(
+            view,
+            request=elapsed,
+            queries=len(metrics.queries),
+            sql=metrics.sql_seconds,
+            template=metrics.template_seconds,
+        )
+        if elapsed >= settings.METRICS_SLOW_REQUEST_SECONDS:
+            self.log_slow(request, view, elapsed, metrics)
+        return response
+
+    @staticmethod
+    def log_slow(request, view, elapsed, metrics):
+        top = sorted(metrics.queries, reverse=True)[
+            :settings.METRICS_SLOW_TOP_QUERIES]
+        logger.warning(
+            'Медленный запрос %s %s (%s): %.3f с, SQL %d за %.3f с, '
+            'шаблоны %.3f с%s',
+            request.method, request.get_full_path(), view, elapsed,
+            len(metrics.queries), metrics.sql_seconds,
+            metrics.template_seconds,
+            ''.join(f'\n  {seconds:.4f} с: {sql[:300]}'
+                    for seconds, sql in top),
+        )
+
+
+def metrics(request):
+    """Метрики в текстовом формате Prometheus; доступны только
+    с адресов METRICS_ALLOWED_IPS."""
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.exposition(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
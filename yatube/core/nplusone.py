@@ -0,0 +1,86 @@
+"""Обнаружение N+1 запросов.
+
+NPlusOneMiddleware подключает к соединениям с базой обёртку
+execute_wrapper, которая приводит каждый SELECT к отпечатку (SQL без
+значений и с IN-списком любой длины) и считает повторы за запрос.
+Если один отпечаток выполняется больше NPLUSONE_THRESHOLD раз,
+режим NPLUSONE_MODE решает, что делать: 'raise' - исключение
+(для тестов), 'warn' - предупреждение в журнал (для стенда),
+'off' - обёртка не подключается.
+"""
+import logging
+import re
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def fingerprint(sql):
+    """SQL-запрос без конкретных значений."""
+    sql = IN_LIST.sub('IN (...)', sql)
+    sql = STRING.sub('?', sql)
+    return NUMBER.sub('?', sql)
+
+
+class Detector:
+    def __init__(self, mode, threshold):
+        self.mode = mode
+        self.threshold = threshold
+        self.counts = Counter()
+        self.reported = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip()[:6].upper() == 'SELECT':
+            shape = fingerprint(sql)
+            self.counts[shape] += 1
+            if (self.counts[shape] > self.threshold
+                    and shape not in self.reported):
+                self.report(shape)
+        return execute(sql, params, many, context)
+
+    def report(self, shape):
+        message = (f'Запрос выполнен больше {self.threshold} раз '
+                   f'за один запрос, вероятно N+1: {shape}')
+        if self.mode == 'raise':
+            raise NPlusOneError(message)
+        self.reported.add(shape)
+        logger.warning(message)
+
+
+@contextmanager
+def detect(mode=None, threshold=None):
+    """Следит за повторами SELECT во всех соединениях потока."""
+    mode = mode or settings.NPLUSONE_MODE
+    if mode == 'off':
+        yield None
+        return
+    detector = Detector(
+        mode, threshold if threshold is not None
+        else settings.NPLUSONE_THRESHOLD)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(detector))
+        yield detector
+
+
+class NPlusOneMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if settings.NPLUSONE_MODE == 'off':
+            return self.get_response(request)
+        with detect():
+            return self.get_response(request)
@@ -0,0 +1,16 @@
+"""Плагин pytest: каждый запрос тестового клиента падает с
+NPlusOneError, если в нём есть N+1. Подключается строкой
+'core.pytest_nplusone' в pytest_plugins файла conftest.py;
+отдельный тест можно исключить маркером allow_nplusone."""
+import pytest
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers', 'allow_nplusone: не проверять тест на N+1 запросы')
+
+
+@pytest.fixture(autouse=True)
+def _detect_nplusone(request, settings):
+    if request.node.get_closest_marker('allow_nplusone') is None:
+        settings.NPLUSONE_MODE = 'raise'
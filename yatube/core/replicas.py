@@ -0,0 +1,73 @@
+"""Чтение с реплик базы данных.
+
+ReplicaMiddleware разрешает читать с реплик только во время
+представлений из REPLICA_VIEWS. После изменения данных, которые
+видит пользователь (посты, комментарии, подписки), сессия
+на REPLICA_PIN_SECONDS закрепляется за основной базой, чтобы
+пользователь сразу видел свои изменения несмотря на отставание реплик.
+Служебные записи - сессии, метаданные миниатюр - сессию не закрепляют:
+иначе анонимные страницы получали бы сессию и Set-Cookie.
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PIN_KEY = '_replica_pinned_until'
+
+_use_replicas = ContextVar('use_replicas', default=False)
+_wrote = ContextVar('wrote', default=False)
+
+
+def mark_written():
+    """Отмечает, что текущий запрос изменил данные пользователя:
+    после ответа сессия закрепится за основной базой. Вызывается
+    из сигналов моделей и явно, когда запись выполняет другой поток."""
+    _wrote.set(True)
+
+
+class ReplicaRouter:
+    """Запись - всегда в default, чтение - со случайной реплики,
+    если текущий запрос это разрешает."""
+
+    def db_for_read(self, model, **hints):
+        if (settings.REPLICA_DATABASES and _use_replicas.get()
+                and model._meta.app_label != 'sessions'):
+            return random.choice(settings.REPLICA_DATABASES)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - копии default, объекты из них совместимы.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in settings.REPLICA_DATABASES
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        replicas = _use_replicas.set(False)
+        wrote = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            if _wrote.get() and hasattr(request, 'session'):
+                request.session[PIN_KEY] = (
+                    time.time() + settings.REPLICA_PIN_SECONDS)
+        finally:
+            _use_replicas.reset(replicas)
+            _wrote.reset(wrote)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (settings.REPLICA_DATABASES
+                and request.method in ('GET', 'HEAD')
+                and request.resolver_match.view_name in settings.REPLICA_VIEWS
+                and request.session.get(PIN_KEY, 0) < time.time()):
+            _use_replicas.set(True)
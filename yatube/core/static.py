@@ -0,0 +1,177 @@
+"""Статика с хешами в именах и заранее сжатыми копиями.
+
+CompressedManifestStaticFilesStorage при collectstatic добавляет
+к именам хеш содержимого и рядом с текстовыми файлами кладёт
+сжатые копии .gz и, если установлен пакет brotli, .br.
+StaticFiles - слой WSGI, который отдаёт собранную статику без
+отдельного веб-сервера: выбирает копию по Accept-Encoding, а файлы
+с хешем в имени помечает неизменяемыми на год, так что браузер
+больше не спрашивает их до смены версии.
+"""
+import gzip
+import mimetypes
+import os
+from email.utils import formatdate
+from io import BytesIO
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.ico', '.json', '.txt', '.xml',
+                '.map', '.html')
+# Файлы меньше этого размера сжатие почти не уменьшает.
+COMPRESS_MIN_SIZE = 256
+IMMUTABLE = 'public, max-age=31536000, immutable'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def gzip_compress(content):
+    """gzip с нулевым временем в заголовке: одинаковый файл даёт
+    одинаковую копию. gzip.compress принимает mtime только с 3.8."""
+    buffer = BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=9,
+                       mtime=0) as output:
+        output.write(content)
+    return buffer.getvalue()
+
+
+def compress(content):
+    """Сжатые копии содержимого: {'.gz': байты, '.br': байты}.
+    Копия, которая не меньше исходника, не создаётся."""
+    variants = {'.gz': gzip_compress(content)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(content)
+    return {suffix: data for suffix, data in variants.items()
+            if len(data) < len(content)}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # collectstatic не запускался (разработка, тесты):
+            # файлы отдаются по исходным именам.
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in self.hashed_files.values():
+            if not name.endswith(COMPRESSIBLE) or not self.exists(name):
+                continue
+            with self.open(name) as source:
+                content = source.read()
+            if len(content) < COMPRESS_MIN_SIZE:
+                continue
+            for suffix, data in compress(content).items():
+                if self.exists(name + suffix):
+                    self.delete(name + suffix)
+                self._save(name + suffix, ContentFile(data))
+
+
+class StaticFile:
+    """Файл и его сжатые копии с готовыми заголовками ответа."""
+
+    def __init__(self, path, immutable):
+        stat = os.stat(path)
+        content_type, _ = mimetypes.guess_type(path)
+        if content_type and content_type.startswith('text/'):
+            content_type += '; charset=utf-8'
+        self.headers = [
+            ('Content-Type', content_type or 'application/octet-stream'),
+            ('Cache-Control', IMMUTABLE if immutable else
+             f'public, max-age={settings.STATIC_MAX_AGE}'),
+            ('Last-Modified', formatdate(stat.st_mtime, usegmt=True)),
+        ]
+        # Слабый ETag: копии в разных кодировках совпадают по смыслу.
+        self.etag = f'W/"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        self.headers.append(('ETag', self.etag))
+        self.variants = [(None, path, stat.st_size)]
+        for encoding, suffix in ENCODINGS:
+            if os.path.exists(path + suffix):
+                self.variants.insert(
+                    -1, (encoding, path + suffix,
+                         os.path.getsize(path + suffix)))
+        if len(self.variants) > 1:
+            self.headers.append(('Vary', 'Accept-Encoding'))
+
+    def choose(self, accept_encoding):
+        accepted = {part.split(';')[0].strip()
+                    for part in accept_encoding.split(',')}
+        for encoding, path, size in self.variants:
+            if encoding is None or encoding in accepted:
+                return encoding, path, size
+
+
+def scan(root, immutable_names):
+    """Все файлы каталога root по их адресам относительно него."""
+    files = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if name.endswith(('.gz', '.br')) and os.path.exists(
+                    os.path.join(directory, name[:-3])):
+                continue
+            path = os.path.join(directory, name)
+            relative = os.path.relpath(path, root).replace(os.sep, '/')
+            files[relative] = StaticFile(
+                path, relative in immutable_names)
+    return files
+
+
+class StaticFiles:
+    """Оборачивает приложение WSGI и отдаёт файлы из STATIC_ROOT
+    по адресам STATIC_URL. Каталог читается один раз при запуске,
+    после collectstatic процесс нужно перезапустить."""
+
+    def __init__(self, application, root=None, prefix=None):
+        self.application = application
+        self.root = root or settings.STATIC_ROOT
+        self.prefix = prefix or settings.STATIC_URL
+        self.files = {}
+        if self.root and os.path.isdir(self.root):
+            storage = CompressedManifestStaticFilesStorage(
+                location=self.root)
+            self.files = scan(
+                self.root, set(storage.load_manifest().values()))
+
+    def __call__(self, environ, start_response):
+        path = unquote(environ.get('PATH_INFO', ''))
+        if not self.files or not path.startswith(self.prefix):
+            return self.application(environ, start_response)
+        static_file = self.files.get(path[len(self.prefix):])
+        if static_file is None:
+            return self.application(environ, start_response)
+        if environ['REQUEST_METHOD'] not in ('GET', 'HEAD'):
+            start_response('405 Method Not Allowed', [('Allow', 'GET, HEAD')])
+            return []
+        headers = list(static_file.headers)
+        if environ.get('HTTP_IF_NONE_MATCH') == static_file.etag:
+            start_response('304 Not Modified', headers)
+            return []
+        encoding, file_path, size = static_file.choose(
+            environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+        headers.append(('Content-Length', str(size)))
+        start_response('200 OK', headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        body = open(file_path, 'rb')
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if file_wrapper:
+            return file_wrapper(body)
+        return read_chunks(body)
+
+
+def read_chunks(body, size=64 * 1024):
+    with body:
+        yield from iter(lambda: body.read(size), b'')
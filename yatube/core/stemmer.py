@@ -0,0 +1,76 @@
+"""Стеммер Портера (Snowball) для русского языка.
+
+Облегчённая реализация алгоритма
+https://snowballstem.org/algorithms/russian/stemmer.html:
+окончания отсекаются только внутри области RV, а R2 для
+словообразовательных суффиксов проверяется приближённо.
+"""
+import re
+
+VOWELS = 'аеиоуыэюя'
+
+RV = re.compile(rf'^(.*?[{VOWELS}])(.*)$')
+PERFECTIVE_GERUND = re.compile(
+    r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$')
+REFLEXIVE = re.compile(r'(с[яь])$')
+ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|'
+    r'их|ых|ую|юю|ая|яя|ою|ею)$')
+PARTICIPLE = re.compile(r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+VERB = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|'
+    r'ыло|ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)|'
+    r'((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$')
+NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|'
+    r'ем|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$')
+DERIVATIONAL = re.compile(rf'.*[^{VOWELS}]+[{VOWELS}].*ость?$')
+DERIVATIONAL_ENDING = re.compile(r'ость?$')
+SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+WORD = re.compile(r'\w+')
+
+
+def strip(pattern, word):
+    return pattern.sub('', word, 1)
+
+
+def stem(word):
+    """Основа слова; слова не на кириллице только приводятся
+    к нижнему регистру."""
+    word = word.lower().replace('ё', 'е')
+    match = RV.match(word)
+    if not match:
+        return word
+    start, rv = match.groups()
+
+    # Шаг 1: деепричастия, иначе возвратность и части речи.
+    stripped = strip(PERFECTIVE_GERUND, rv)
+    if stripped == rv:
+        rv = strip(REFLEXIVE, rv)
+        stripped = strip(ADJECTIVE, rv)
+        if stripped != rv:
+            rv = strip(PARTICIPLE, stripped)
+        else:
+            stripped = strip(VERB, rv)
+            rv = strip(NOUN, rv) if stripped == rv else stripped
+    else:
+        rv = stripped
+
+    # Шаг 2-4: «и», словообразовательные суффиксы,
+    # превосходная степень, «нн» и мягкий знак.
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    if DERIVATIONAL.match(rv):
+        rv = strip(DERIVATIONAL_ENDING, rv)
+    if rv.endswith('ь'):
+        rv = rv[:-1]
+    else:
+        rv = strip(SUPERLATIVE, rv)
+        if rv.endswith('нн'):
+            rv = rv[:-1]
+    return start + rv
+
+
+def tokenize(text):
+    """Основы всех слов текста по порядку."""
+    return [stem(word) for word in WORD.findall(text)]
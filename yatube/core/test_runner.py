@@ -0,0 +1,17 @@
+"""Запуск manage.py test с поиском N+1: как и с плагином pytest
+core.pytest_nplusone, каждый запрос тестового клиента падает
+с NPlusOneError, если в нём есть N+1. Отдельный тест можно
+исключить через override_settings(NPLUSONE_MODE='off')."""
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class NPlusOneRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.nplusone_mode = settings.NPLUSONE_MODE
+        settings.NPLUSONE_MODE = 'raise'
+
+    def teardown_test_environment(self, **kwargs):
+        settings.NPLUSONE_MODE = self.nplusone_mode
+        super().teardown_test_environment(**kwargs)
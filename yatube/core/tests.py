@@ -1,4 +1,34 @@
-from django.test import TestCase
+import gzip
+import os
+import shutil
+import socket
+import sqlite3
+import tempfile
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         TransactionTestCase, override_settings)
+from django.test.runner import DiscoverRunner
+from django.urls import reverse
+from sorl.thumbnail.models import KVStore
+
+from posts.models import Post, User
+
+from .cache.resp import RespCache, RespConnection, RespError
+from .cache.stand_in import StandInServer
+from .metrics import Histogram, registry
+from .nplusone import NPlusOneError, detect, fingerprint
+from .replicas import PIN_KEY, ReplicaMiddleware
+from .static import IMMUTABLE, StaticFiles
+from .stemmer import stem, tokenize
+from .test_runner import NPlusOneRunner
 
 
 class StaticPagesURLTests(TestCase):
@@ -11,3 +41,377 @@ class StaticPagesURLTests(TestCase):
             with self.subTest(address=address):
                 response = self.client.get(address)
                 self.assertTemplateUsed(response, template)
+
+
+class RespCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = StandInServer().start()
+        cls.cache = RespCache(cls.server.location, {})
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.cache._disconnect()
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.cache.clear()
+
+    def test_set_get_delete(self):
+        """Значения любых типов сохраняются и удаляются."""
+        values = {
+            'number': 42,
+            'text': 'Тестовый текст',
+            'structure': {'page': [1, 2, 3]},
+        }
+        for key, value in values.items():
+            with self.subTest(key=key):
+                self.cache.set(key, value)
+                self.assertEqual(self.cache.get(key), value)
+        self.assertEqual(self.cache.get_many(values.keys()), values)
+        self.cache.delete('text')
+        self.assertIsNone(self.cache.get('text'))
+        self.assertFalse(self.cache.has_key('text'))
+
+    def test_add_and_incr(self):
+        """add не перезаписывает ключ, incr работает атомарно."""
+        self.assertTrue(self.cache.add('counter', 1))
+        self.assertFalse(self.cache.add('counter', 5))
+        self.assertEqual(self.cache.incr('counter', 2), 3)
+        self.assertEqual(self.cache.get('counter'), 3)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_timeout(self):
+        """Ключ истекает по таймауту, touch продлевает его."""
+        self.cache.set('short', 'value', 0.05)
+        self.cache.set('long', 'value', 0.05)
+        self.assertTrue(self.cache.touch('long', 10))
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertEqual(self.cache.get('long'), 'value')
+        self.cache.set('gone', 'value', 0)
+        self.assertIsNone(self.cache.get('gone'))
+        self.cache.set('gone', 'value')
+        self.cache.set_many({'gone': 'new', 'other': 'new'}, 0)
+        self.assertEqual(self.cache.get_many(['gone', 'other']), {})
+
+    def test_incr_does_not_create_key(self):
+        """incr проверяет ключ и меняет его одной командой."""
+        with mock.patch.object(
+                RespConnection, 'pipeline',
+                autospec=True,
+                side_effect=RespConnection.pipeline) as pipeline:
+            with self.assertRaises(ValueError):
+                self.cache.incr('missing')
+        self.assertEqual(pipeline.call_count, 1)
+        self.assertFalse(self.cache.has_key('missing'))
+
+    def test_lost_reply_not_retried_for_incr(self):
+        """Если ответ потерян после отправки, get повторяется,
+        а incr - нет, чтобы не увеличить счётчик дважды."""
+        self.cache.set('counter', 1)
+        read_reply = RespConnection.read_reply
+
+        def lose_first_reply(connection):
+            reply = read_reply(connection)
+            if not lost:
+                lost.append(True)
+                raise socket.timeout
+            return reply
+
+        with mock.patch.object(RespConnection, 'read_reply', autospec=True,
+                               side_effect=lose_first_reply):
+            lost = []
+            self.assertEqual(self.cache.get('counter'), 1)
+            lost = []
+            with self.assertRaises(OSError):
+                self.cache.incr('counter')
+        self.assertEqual(self.cache.get('counter'), 2)
+
+    def test_error_in_pipeline(self):
+        """После ошибки в конвейере ответы не сдвигаются."""
+        self.cache.set_many({'first': 1, 'second': 2})
+        with self.assertRaises(RespError):
+            self.cache._call(('GET', ':1:first'), ('UNKNOWN',),
+                             ('GET', ':1:second'))
+        self.assertEqual(self.cache.get('second'), 2)
+        self.assertEqual(self.cache.get('first'), 1)
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username='Author')
+        Post.objects.create(text='Тестовый текст', author=author)
+
+    def setUp(self):
+        registry.clear()
+
+    def test_histogram_buckets(self):
+        histogram = Histogram('test', 'Тест', (1, 5))
+        for value in (0, 1, 3, 10):
+            histogram.observe('view', value)
+        self.assertEqual(histogram.exposition()[2:], [
+            'test_bucket{view="view",le="1"} 2',
+            'test_bucket{view="view",le="5"} 3',
+            'test_bucket{view="view",le="+Inf"} 4',
+            'test_sum{view="view"} 14.0',
+            'test_count{view="view"} 4',
+        ])
+
+    def test_metrics_endpoint(self):
+        """Запросы попадают в гистограммы своего представления."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('# TYPE yatube_request_seconds histogram', body)
+        self.assertIn(
+            'yatube_request_seconds_count{view="posts:index"} 2', body)
+        self.assertIn('yatube_sql_queries_count{view="posts:index"} 2', body)
+        self.assertIn('yatube_sql_queries_bucket{view="posts:index",le="0"} 0',
+                      body)
+        template = registry.histograms['template'].series['posts:index']
+        self.assertGreater(template[1][1], 0)
+
+    def test_metrics_allowed_ips(self):
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_SLOW_REQUEST_SECONDS=0)
+    def test_slow_request_logged(self):
+        """Медленный запрос пишется в журнал с SQL-запросами."""
+        with self.assertLogs('core.metrics', 'WARNING') as logs:
+            self.client.get(reverse('posts:index'))
+        self.assertIn('posts:index', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.client.get(reverse('posts:index'))
+        self.assertNotIn('posts:index', registry.histograms['request'].series)
+
+
+class NPlusOneTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='Author')
+        cls.posts = Post.objects.bulk_create(
+            Post(text=f'Пост {number}', author=author)
+            for number in range(5))
+        cls.post = Post.objects.latest('pk')
+        for number in range(10):
+            cls.post.comments.create(
+                text=f'Комментарий {number}',
+                author=User.objects.create_user(username=f'user{number}'))
+
+    def test_fingerprint(self):
+        """Отпечаток не зависит от значений и длины IN-списка."""
+        self.assertEqual(
+            fingerprint('SELECT "a" FROM "t" WHERE "id" IN (%s, %s, %s) '
+                        "AND \"b\" = 'it''s' LIMIT 21"),
+            fingerprint('SELECT "a" FROM "t" WHERE "id" IN (%s) '
+                        "AND \"b\" = 'x' LIMIT 1"),
+        )
+
+    def test_raise(self):
+        with self.assertRaises(NPlusOneError):
+            with detect('raise', threshold=2):
+                for post in Post.objects.all():
+                    post.author.username
+
+    def test_warn_once(self):
+        with self.assertLogs('core.nplusone', 'WARNING') as logs:
+            with detect('warn', threshold=2):
+                for post in Post.objects.all():
+                    post.author.username
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('auth_user', logs.output[0])
+
+    @override_settings(NPLUSONE_MODE='off')
+    def test_runner_raises(self):
+        """manage.py test проверяет запросы тестов в режиме raise."""
+        runner = NPlusOneRunner()
+        with mock.patch.object(DiscoverRunner, 'setup_test_environment'), \
+                mock.patch.object(DiscoverRunner,
+                                  'teardown_test_environment'):
+            runner.setup_test_environment()
+            self.assertEqual(settings.NPLUSONE_MODE, 'raise')
+            runner.teardown_test_environment()
+        self.assertEqual(settings.NPLUSONE_MODE, 'off')
+
+    @override_settings(NPLUSONE_MODE='raise', NPLUSONE_THRESHOLD=1,
+                       PAGE_CACHE_TIMEOUT=0)
+    def test_pages_without_nplusone(self):
+        """На страницах нет повторяющихся запросов, даже при
+        десятке комментаторов."""
+        for address in (reverse('posts:index'),
+                        reverse('posts:post_detail', args=(self.post.pk,))):
+            with self.subTest(address=address):
+                self.assertEqual(self.client.get(address).status_code, 200)
+
+
+class StaticFilesTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.mkdtemp()
+        with override_settings(STATIC_ROOT=cls.root):
+            call_command('collectstatic', interactive=False, verbosity=0)
+        cls.app = StaticFiles(cls.application, root=cls.root)
+        cls.css = next(
+            name for name in cls.app.files
+            if name.startswith('css/bootstrap.min.')
+            and name != 'css/bootstrap.min.css')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.root, ignore_errors=True)
+        super().tearDownClass()
+
+    @staticmethod
+    def application(environ, start_response):
+        start_response('200 OK', [])
+        return [b'django']
+
+    def request(self, path, method='GET', **headers):
+        response = {}
+
+        def start_response(status, response_headers):
+            response['status'] = status
+            response['headers'] = dict(response_headers)
+
+        environ = {'PATH_INFO': path, 'REQUEST_METHOD': method, **headers}
+        response['body'] = b''.join(self.app(environ, start_response))
+        return response
+
+    def test_precompressed(self):
+        """Файл с хешем отдаётся сжатым и неизменяемым."""
+        with open(os.path.join(self.root, self.css), 'rb') as source:
+            original = source.read()
+        response = self.request(
+            '/static/' + self.css, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['status'], '200 OK')
+        self.assertEqual(response['headers']['Content-Encoding'], 'gzip')
+        self.assertEqual(response['headers']['Cache-Control'], IMMUTABLE)
+        self.assertEqual(response['headers']['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(response['body']), original)
+        self.assertLess(
+            int(response['headers']['Content-Length']), len(original))
+
+    def test_plain(self):
+        response = self.request('/static/css/bootstrap.min.css')
+        self.assertNotIn('Content-Encoding', response['headers'])
+        self.assertNotEqual(response['headers']['Cache-Control'], IMMUTABLE)
+        response = self.request('/static/' + self.css, 'HEAD')
+        self.assertNotIn('Content-Encoding', response['headers'])
+        self.assertEqual(response['body'], b'')
+
+    def test_not_modified(self):
+        etag = self.request('/static/' + self.css)['headers']['ETag']
+        response = self.request(
+            '/static/' + self.css, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response['status'], '304 Not Modified')
+        self.assertEqual(response['body'], b'')
+
+    def test_other_paths_reach_django(self):
+        for path in ('/', '/static/missing.css'):
+            with self.subTest(path=path):
+                self.assertEqual(self.request(path)['body'], b'django')
+
+    def test_hashed_urls(self):
+        with override_settings(STATIC_ROOT=self.root):
+            response = self.client.get(reverse('about:author'))
+        self.assertContains(response, '/static/' + self.css)
+
+
+class StemmerTests(SimpleTestCase):
+    def test_word_forms_share_stem(self):
+        """Формы одного слова сводятся к общей основе."""
+        groups = (
+            ('книга', 'книги', 'книгами', 'книгой'),
+            ('красивая', 'красивые', 'красивый', 'красивейший'),
+            ('ёлка', 'елки', 'ёлкам'),
+        )
+        for words in groups:
+            with self.subTest(words=words):
+                self.assertEqual(len({stem(word) for word in words}), 1)
+
+    def test_tokenize(self):
+        """Текст разбивается на основы, латиница не меняется."""
+        self.assertEqual(tokenize('Django, Котики!'), ['django', 'котик'])
+
+
+@override_settings(REPLICA_DATABASES=['replica'], REPLICA_PIN_SECONDS=60)
+class ReplicaRoutingTests(TransactionTestCase):
+    """Реплика - отдельный файл SQLite, снятый с тестовой базы;
+    записи после снимка в нём не видны, как при отставании."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='Author')
+        Post.objects.create(text='Старый пост', author=self.author)
+        handle, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        connections['default'].ensure_connection()
+        with sqlite3.connect(self.path) as replica:
+            connections['default'].connection.backup(replica)
+        connections.databases['replica'] = dict(
+            connections['default'].settings_dict, NAME=self.path)
+        Post.objects.create(text='Новый пост', author=self.author)
+        self.client.force_login(self.author)
+
+    def tearDown(self):
+        connections['replica'].close()
+        del connections.databases['replica']
+        del connections._connections.replica
+        os.remove(self.path)
+
+    def test_reads_from_replica(self):
+        """Ленты читаются с реплики."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Старый пост')
+        self.assertNotContains(response, 'Новый пост')
+
+    def test_write_views_use_primary(self):
+        """Запись идёт в основную базу, после неё сессия
+        читает свои изменения оттуда же."""
+        self.client.post(
+            reverse('posts:post_create'), data={'text': 'Свежий пост'})
+        self.assertTrue(Post.objects.filter(text='Свежий пост').exists())
+        self.assertIn(PIN_KEY, self.client.session)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Свежий пост')
+
+    def test_service_writes_do_not_pin(self):
+        """Записи сессий и метаданных миниатюр не закрепляют сессию,
+        изменение поста - закрепляет."""
+        writes = {
+            'thumbnail': lambda: KVStore.objects.create(key='k', value='v'),
+            'session': lambda: SessionStore().create(),
+            'post': lambda: Post.objects.create(
+                text='Пост', author=self.author),
+        }
+        for name, write in writes.items():
+            with self.subTest(write=name):
+                request = RequestFactory().get('/')
+                request.session = SessionStore()
+
+                def get_response(request):
+                    write()
+                    return HttpResponse()
+
+                ReplicaMiddleware(get_response)(request)
+                self.assertEqual(PIN_KEY in request.session, name == 'post')
+
+    def test_pin_expires(self):
+        """По истечении окна сессия снова читает с реплики."""
+        session = self.client.session
+        session[PIN_KEY] = time.time() - 1
+        session.save()
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Новый пост')
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Comment, Group, Post
+from .models import Comment, Group, Post, ThumbnailJob
 
 
 @admin.register(Post)
@@ -47,3 +47,16 @@ class Comment(admin.ModelAdmin):
     )
     search_fields = ('text',)
     list_filter = ('created', 'author',)
+
+
+@admin.register(ThumbnailJob)
+class ThumbnailJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'post',
+        'status',
+        'attempts',
+        'created',
+        'finished',
+    )
+    list_filter = ('status',)
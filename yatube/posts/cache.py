@@ -0,0 +1,65 @@
+import hashlib
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+VERSION_KEY = 'pages:version:{}'
+
+
+def scope_version(scope):
+    """Текущая версия области кэша; создаётся при первом обращении."""
+    key = VERSION_KEY.format(scope)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def invalidate(*scopes):
+    """Делает недействительными все страницы областей scopes:
+    старые записи перестают читаться и истекают по таймауту."""
+    cache.set_many(
+        {VERSION_KEY.format(scope): uuid.uuid4().hex for scope in scopes},
+        None,
+    )
+
+
+def cache_anonymous_page(scope):
+    """
+    Кэширует страницу для анонимных пользователей.
+    scope - шаблон области, например 'group:{slug}', заполняется
+    аргументами представления; каждая страница пагинации
+    хранится под своим ключом. Условный GET к закэшированной
+    странице получает 304 по её ETag.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (settings.PAGE_CACHE_TIMEOUT <= 0
+                    or request.method != 'GET'
+                    or request.user.is_authenticated):
+                return view(request, *args, **kwargs)
+            area = scope.format(**kwargs)
+            path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+            key = f'pages:{area}:{scope_version(area)}:{path}'
+            response = cache.get(key)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+                return response
+            return get_conditional_response(
+                request,
+                etag=response.get('ETag'),
+                last_modified=parse_http_date_safe(
+                    response.get('Last-Modified', '')),
+                response=response,
+            )
+        return wrapper
+    return decorator
@@ -0,0 +1,127 @@
+"""Запись комментариев пачками.
+
+Под наплывом комментариев к горячему посту каждая отдельная вставка
+ждёт блокировку записи SQLite. WriteBuffer собирает комментарии,
+пришедшие за COMMENT_BUFFER_WINDOW секунд, и первый из запросов
+пачки записывает их одной транзакцией через bulk_create; остальные
+запросы ждут её окончания, поэтому ответ уходит только после записи.
+При нулевом окне пачку составляют только запросы, пришедшие, пока
+пишется предыдущая.
+"""
+import threading
+
+from django.conf import settings
+from django.db import connections, router, transaction
+
+from core import replicas
+
+from . import search
+from .constants import COMMENT_BATCH_SIZE
+from .models import Comment, Post
+
+
+class Batch:
+    def __init__(self):
+        self.items = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.error = None
+
+
+class WriteBuffer:
+    """Группирует объекты и передаёт их функции write списком."""
+
+    def __init__(self, write, window=None, max_size=COMMENT_BATCH_SIZE):
+        self.write = write
+        self.window = window
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        # Пока пишется одна пачка, лидер следующей ждёт здесь,
+        # а новые объекты продолжают попадать в его пачку.
+        self.write_lock = threading.Lock()
+        self.batch = None
+
+    def add(self, item):
+        with self.lock:
+            batch = self.batch
+            leader = batch is None
+            if leader:
+                batch = self.batch = Batch()
+            batch.items.append(item)
+            if len(batch.items) >= self.max_size:
+                self.batch = None
+                batch.full.set()
+        if leader:
+            self.flush(batch)
+        else:
+            batch.done.wait()
+        if batch.error is not None:
+            raise batch.error
+        return item
+
+    def flush(self, batch):
+        window = (self.window if self.window is not None
+                  else settings.COMMENT_BUFFER_WINDOW)
+        if window > 0:
+            batch.full.wait(window)
+        with self.write_lock:
+            with self.lock:
+                if self.batch is batch:
+                    self.batch = None
+            try:
+                self.write(batch.items)
+            except Exception as error:
+                batch.error = error
+            finally:
+                batch.done.set()
+
+
+def write_comments(comments):
+    """Сохраняет комментарии одной вставкой и индексирует их для
+    поиска. Комментарии к удалённым за это время постам
+    пропускаются и остаются без pk."""
+    using = router.db_for_write(Comment)
+    with transaction.atomic(using=using):
+        existing = set(Post.objects.using(using).filter(
+            pk__in={comment.post_id for comment in comments},
+        ).order_by().values_list('pk', flat=True))
+        comments = [comment for comment in comments
+                    if comment.post_id in existing]
+        if not comments:
+            return
+        connection = connections[using]
+        if not (connection.features.can_return_ids_from_bulk_insert
+                or connection.vendor == 'sqlite'):
+            # Узнать id строк пачки здесь нельзя: по одной,
+            # post_save проиндексирует каждую.
+            for comment in comments:
+                comment.save(using=using)
+            return
+        Comment.objects.using(using).bulk_create(comments)
+        if comments[0].pk is None:
+            # SQLite не возвращает id вставленных строк, но до конца
+            # транзакции другие соединения писать не могут, поэтому
+            # последние id принадлежат этой вставке.
+            ids = list(Comment.objects.using(using).order_by(
+                '-pk').values_list('pk', flat=True)[:len(comments)])
+            for comment, pk in zip(comments, reversed(ids)):
+                comment.pk = pk
+        # bulk_create не отправляет post_save.
+        search.get_index().index_many([
+            (search.comment_document(comment.pk), comment.post_id,
+             comment.text, False)
+            for comment in comments
+        ])
+
+
+buffer = WriteBuffer(write_comments)
+
+
+def save_comment(comment):
+    """Сохраняет комментарий в составе пачки; возвращает False,
+    если поста уже нет."""
+    # Запись может выполнить другой поток: сессию этого запроса
+    # нужно закрепить за основной базой явно.
+    replicas.mark_written()
+    buffer.add(comment)
+    return comment.pk is not None
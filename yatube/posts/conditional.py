@@ -0,0 +1,66 @@
+import hashlib
+
+from django.db.models import (Count, DateTimeField, IntegerField, Max,
+                              OuterRef, Subquery)
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from .models import Comment, Post
+
+
+def related(model, field, aggregate, output_field):
+    """Агрегат по связанным записям коррелированным подзапросом:
+    он читает только строки одного объекта по индексу field."""
+    return Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field).annotate(value=aggregate).values('value'),
+        output_field=output_field,
+    )
+
+
+def last_post_update(field):
+    """Дата последнего изменения постов группы или автора."""
+    return related(Post, field, Max('updated'), DateTimeField())
+
+
+def posts_total(field):
+    """Число постов группы: по нему видно удаление и перенос поста."""
+    return related(Post, field, Count('pk'), IntegerField())
+
+
+def last_comment():
+    """Дата последнего комментария к посту."""
+    return related(Comment, 'post', Max('created'), DateTimeField())
+
+
+class PageVersion:
+    """
+    Валидатор условного GET страницы.
+    last_modified - дата последнего изменения данных страницы,
+    state - прочие значения, от которых зависит её содержимое.
+    ETag учитывает зрителя: для авторизованного пользователя -
+    и секрет CSRF, который выводят формы страницы.
+    Last-Modified не отдаётся: удаление поста или комментария
+    уменьшает дату, а счётчики и подписки её не меняют, поэтому
+    клиент с одним If-Modified-Since получил бы 304 на изменённую
+    страницу. Версию проверяет только ETag.
+    Если клиент уже хранит эту версию, response содержит ответ 304.
+    """
+
+    def __init__(self, request, last_modified, *state):
+        viewer = ('anonymous',)
+        if request.user.is_authenticated:
+            viewer = (request.user.pk, request.META.get('CSRF_COOKIE'))
+        source = repr((request.get_full_path(), viewer, last_modified, state))
+        self.etag = quote_etag(hashlib.md5(source.encode()).hexdigest())
+        self.response = None
+        if request.method in ('GET', 'HEAD'):
+            self.response = get_conditional_response(request, etag=self.etag)
+            if self.response is not None:
+                self.finish(self.response)
+
+    def finish(self, response):
+        """Проставляет ETag ответу."""
+        if response.status_code in (200, 304):
+            response.setdefault('ETag', self.etag)
+        return response
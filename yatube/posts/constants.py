@@ -1,2 +1,25 @@
 POSTS_AMOUNT: int = 10
 LEN_STR: int = 15
+APPROXIMATE_COUNT_TIMEOUT: int = 60 * 5
+TIMELINE_LENGTH: int = 1000
+TIMELINE_FANOUT_LIMIT: int = 5000
+TIMELINE_BATCH_SIZE: int = 1000
+CELEBRITIES_TIMEOUT: int = 60
+COMMENTS_AMOUNT: int = 50
+THUMBNAIL_JOB_ATTEMPTS: int = 3
+THUMBNAIL_JOB_TIMEOUT: int = 60 * 10
+ORPHAN_MIN_AGE: int = 60 * 60
+SEARCH_MAX_RESULTS: int = 1000
+SEARCH_POST_WEIGHT: int = 2
+SEARCH_BATCH_SIZE: int = 500
+FEED_MAX_POSTS: int = 1000
+FEED_CHUNK_SIZE: int = 100
+FEED_TITLE_LENGTH: int = 60
+COMMENT_BATCH_SIZE: int = 100
+UPLOAD_MAX_DIMENSION: int = 2048
+UPLOAD_JPEG_QUALITY: int = 85
+CARD_WIDTHS: tuple = (320, 480, 640, 768, 960)
+CARD_HEIGHT: int = 339
+CARD_SIZES: str = '(max-width: 960px) 100vw, 960px'
+THUMBNAIL_LRU_SIZE: int = 10000
+THUMBNAIL_LRU_TIMEOUT: int = 60 * 5
@@ -0,0 +1,226 @@
+"""Потоковые ленты Atom и RSS.
+
+Лента отдаётся StreamingHttpResponse: посты читаются .iterator()
+порциями по FEED_CHUNK_SIZE, и в памяти держится только одна порция.
+Готовые порции кэшируются под версией области кэша страниц, поэтому
+создание и правка поста, которые сбрасывают область, сбрасывают и ленту.
+"""
+import hashlib
+from datetime import datetime
+from xml.sax.saxutils import escape, quoteattr
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.feedgenerator import rfc2822_date, rfc3339_date
+from django.utils.functional import cached_property
+from django.utils.http import http_date, quote_etag
+from django.utils.text import Truncator
+
+from .cache import scope_version
+from .constants import FEED_CHUNK_SIZE, FEED_MAX_POSTS, FEED_TITLE_LENGTH
+
+
+def post_title(post):
+    return Truncator(' '.join(post.text.split())).chars(FEED_TITLE_LENGTH)
+
+
+class Atom:
+    content_type = 'application/atom+xml; charset=utf-8'
+
+    def head(self, title, link, feed_url, updated):
+        return (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<feed xmlns="http://www.w3.org/2005/Atom" xml:lang="ru">'
+            f'<title>{escape(title)}</title>'
+            f'<link href={quoteattr(link)} rel="alternate"/>'
+            f'<link href={quoteattr(feed_url)} rel="self"/>'
+            f'<id>{escape(feed_url)}</id>'
+            f'<updated>{rfc3339_date(updated)}</updated>'
+        )
+
+    def item(self, post, link):
+        author = escape(post.author.get_full_name() or post.author.username)
+        category = ''
+        if post.group:
+            category = f'<category term={quoteattr(post.group.title)}/>'
+        return (
+            '<entry>'
+            f'<title>{escape(post_title(post))}</title>'
+            f'<link href={quoteattr(link)} rel="alternate"/>'
+            f'<id>{escape(link)}</id>'
+            f'<published>{rfc3339_date(post.pub_date)}</published>'
+            f'<updated>{rfc3339_date(post.updated)}</updated>'
+            f'<author><name>{author}</name></author>'
+            f'{category}'
+            f'<content type="text">{escape(post.text)}</content>'
+            '</entry>'
+        )
+
+    def tail(self):
+        return '</feed>\n'
+
+
+class Rss:
+    content_type = 'application/rss+xml; charset=utf-8'
+
+    def head(self, title, link, feed_url, updated):
+        return (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom">'
+            '<channel>'
+            f'<title>{escape(title)}</title>'
+            f'<link>{escape(link)}</link>'
+            f'<description>{escape(title)}</description>'
+            f'<atom:link href={quoteattr(feed_url)} rel="self"/>'
+            '<language>ru</language>'
+            f'<lastBuildDate>{rfc2822_date(updated)}</lastBuildDate>'
+        )
+
+    def item(self, post, link):
+        category = ''
+        if post.group:
+            category = f'<category>{escape(post.group.title)}</category>'
+        return (
+            '<item>'
+            f'<title>{escape(post_title(post))}</title>'
+            f'<link>{escape(link)}</link>'
+            f'<guid>{escape(link)}</guid>'
+            f'<pubDate>{rfc2822_date(post.pub_date)}</pubDate>'
+            f'{category}'
+            f'<description>{escape(post.text)}</description>'
+            '</item>'
+        )
+
+    def tail(self):
+        return '</channel></rss>\n'
+
+
+FORMATS = {'atom': Atom(), 'rss': Rss()}
+
+
+class FeedStream:
+    """
+    Части ленты: заголовок, порции постов и окончание.
+    load() возвращает заголовок ленты, адрес страницы и queryset
+    постов; вызывается только при промахе кэша.
+    Порции берутся из кэша, если лента уже собрана под текущей
+    версией области, иначе читаются из базы и сохраняются в кэш.
+    """
+
+    def __init__(self, request, feed_format, key, meta, load):
+        self.request = request
+        self.format = feed_format
+        self.key = key
+        self.meta = meta
+        self.load = load
+        if meta is None:
+            # Отсутствующая группа или автор дают 404 до начала потока.
+            self.source
+
+    @cached_property
+    def source(self):
+        return self.load()
+
+    def chunk_key(self, number):
+        return f'{self.key}:{number}'
+
+    def link(self, post):
+        return self.request.build_absolute_uri(
+            reverse('posts:post_detail', args=(post.pk,)))
+
+    def render_head(self, updated):
+        title, link, _ = self.source
+        return self.format.head(
+            title,
+            self.request.build_absolute_uri(link),
+            self.request.build_absolute_uri(),
+            updated,
+        )
+
+    def render_items(self, posts):
+        return ''.join(self.format.item(post, self.link(post))
+                       for post in posts)
+
+    def __iter__(self):
+        if self.meta is None:
+            yield from self.generate()
+        else:
+            yield from self.replay()
+        yield self.format.tail()
+
+    def generate(self):
+        updated = timezone.now()
+        yield self.store(0, self.render_head(updated))
+        _, _, posts = self.source
+        chunks = 0
+        chunk = []
+        for post in posts[:FEED_MAX_POSTS].iterator(FEED_CHUNK_SIZE):
+            chunk.append(post)
+            if len(chunk) == FEED_CHUNK_SIZE:
+                chunks += 1
+                yield self.store(chunks, self.render_items(chunk))
+                chunk = []
+        if chunk:
+            chunks += 1
+            yield self.store(chunks, self.render_items(chunk))
+        # Описание ленты пишется последним: до него неполная лента
+        # из кэша не читается.
+        self.store(None, {
+            'chunks': chunks,
+            'updated': int(updated.timestamp()),
+        })
+
+    def store(self, number, value):
+        timeout = settings.PAGE_CACHE_TIMEOUT
+        if timeout > 0:
+            key = self.key if number is None else self.chunk_key(number)
+            cache.set(key, value, timeout)
+        return value
+
+    def replay(self):
+        for number in range(self.meta['chunks'] + 1):
+            body = cache.get(self.chunk_key(number))
+            if body is None:
+                # Порция вытеснена из кэша: версия та же, значит
+                # и посты те же, их можно прочитать заново.
+                body = self.restore(number)
+            yield body
+
+    def restore(self, number):
+        if number == 0:
+            return self.render_head(
+                datetime.fromtimestamp(self.meta['updated'], timezone.utc))
+        _, _, posts = self.source
+        start = (number - 1) * FEED_CHUNK_SIZE
+        return self.render_items(posts[start:start + FEED_CHUNK_SIZE])
+
+
+def feed_response(request, scope, feed_format, load):
+    """
+    Потоковый ответ с лентой области кэша scope в формате
+    feed_format ('atom' или 'rss'). ETag строится по версии
+    области, поэтому ответ 304 не обращается к базе.
+    """
+    feed_format = FORMATS[feed_format]
+    url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    key = f'feeds:{scope}:{scope_version(scope)}:{url}'
+    etag = quote_etag(hashlib.md5(key.encode()).hexdigest())
+    meta = None
+    if settings.PAGE_CACHE_TIMEOUT > 0:
+        meta = cache.get(key)
+    last_modified = meta and meta['updated']
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = StreamingHttpResponse(
+            FeedStream(request, feed_format, key, meta, load),
+            content_type=feed_format.content_type,
+        )
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
@@ -1,5 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from . import uploads
 from .models import Comment, Post
 
 
@@ -9,6 +11,20 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image',)
 
+    def clean_image(self):
+        """Новое изображение уменьшается и пережимается до сохранения."""
+        image = self.cleaned_data.get('image')
+        self.image_uploaded = isinstance(image, UploadedFile)
+        if self.image_uploaded:
+            return uploads.normalize(image)
+        return image
+
+    def save(self, commit=True):
+        post = super().save(commit)
+        if commit and getattr(self, 'image_uploaded', False):
+            uploads.save_variants(post.image)
+        return post
+
 
 class CommentForm(forms.ModelForm):
     """Форма для создания комментария."""
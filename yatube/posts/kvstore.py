@@ -0,0 +1,145 @@
+"""Хранилище метаданных миниатюр sorl с пакетной загрузкой.
+
+Стандартное cached_db-хранилище sorl ищет каждую миниатюру отдельно:
+запрос к кэшу, а при промахе - к таблице thumbnail_kvstore. Карточка
+поста запрашивает миниатюры всех ширин и форматов, поэтому страница
+ленты делала десятки обращений. Здесь записи для всех постов страницы
+загружаются заранее одним get_many из кэша и одним запросом к базе
+для промахов (prefetch), а найденные хранятся в LRU процесса
+ограниченного размера, так что повторные страницы не ходят даже
+в кэш. Запись и удаление идут через кэш и базу, как в sorl,
+и обновляют LRU этого процесса; записи из LRU других процессов
+устаревают через THUMBNAIL_LRU_TIMEOUT секунд.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from .constants import THUMBNAIL_LRU_SIZE, THUMBNAIL_LRU_TIMEOUT
+
+
+class LRU:
+    """Потокобезопасный словарь не больше max_size записей, которые
+    живут timeout секунд; при переполнении вытесняются самые давние
+    по обращению."""
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class BatchedKVStore(cached_db_kvstore.KVStore):
+    # Один LRU на процесс: sorl создаёт хранилище один раз,
+    # но тесты и команды могут создавать и свои экземпляры.
+    lru = LRU(THUMBNAIL_LRU_SIZE, THUMBNAIL_LRU_TIMEOUT)
+
+    def _get_raw(self, key):
+        value = self.lru.get(key)
+        if value is None:
+            value = super()._get_raw(key)
+            # Промахи не запоминаются: миниатюру может создать
+            # другой процесс.
+            if value is not None:
+                self.lru.set(key, value)
+        return value
+
+    def _set_raw(self, key, value):
+        super()._set_raw(key, value)
+        self.lru.set(key, value)
+
+    def _delete_raw(self, *keys):
+        super()._delete_raw(*keys)
+        self.lru.delete(*keys)
+
+    def clear(self, delete_thumbnails=False):
+        super().clear(delete_thumbnails)
+        self.lru.clear()
+
+    def prefetch(self, image_files):
+        """Загружает записи о файлах image_files, которых нет в LRU:
+        одним get_many из кэша и одним запросом к базе для промахов.
+        Записи, которых нет и в базе, кэшируются как пустые, как это
+        делает _get_raw."""
+        keys = list(dict.fromkeys(
+            add_prefix(image_file.key) for image_file in image_files))
+        keys = [key for key in keys if key not in self.lru]
+        if not keys:
+            return
+        found = self.cache.get_many(keys)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            stored = dict(KVStoreModel.objects.filter(
+                key__in=missing).values_list('key', 'value'))
+            self.cache.set_many(
+                {key: stored.get(key, EMPTY_VALUE) for key in missing},
+                settings.THUMBNAIL_CACHE_TIMEOUT)
+            found.update(stored)
+        for key, value in found.items():
+            if value != EMPTY_VALUE:
+                self.lru.set(key, value)
+
+
+def thumbnail_file(file_, geometry, **options):
+    """Файл миниатюры с тем же именем, что вернёт get_thumbnail,
+    но без обращения к хранилищу. Повторяет подстановку опций
+    из ThumbnailBackend.get_thumbnail."""
+    backend = default.backend
+    source = ImageFile(file_)
+    if settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    return ImageFile(
+        backend._get_thumbnail_filename(source, geometry, options),
+        default.storage)
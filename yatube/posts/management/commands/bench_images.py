@@ -0,0 +1,128 @@
+import re
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core.benchmark import isolated_database
+from posts import thumbnails
+from posts.constants import CARD_WIDTHS, POSTS_AMOUNT
+from posts.models import Post, User
+
+IMAGE_TAG = re.compile(r'<(?:img|source)\b[^>]*>')
+ATTRIBUTE = re.compile(r'(\w+)="([^"]*)"')
+# Ширина экрана в CSS-пикселях и плотность пикселей.
+DEVICES = (
+    ('телефон 360x1', 360, 1),
+    ('телефон 360x2', 360, 2),
+    ('телефон 414x3', 414, 3),
+    ('планшет 768x1', 768, 1),
+    ('планшет 768x2', 768, 2),
+    ('ноутбук 1366x1', 1366, 1),
+)
+
+
+def photo(number):
+    """Снимок 1920x1080 с шумом: сжимается как настоящая фотография."""
+    gradient = Image.linear_gradient('L').resize((1920, 1080))
+    noise = Image.effect_noise((1920, 1080), 10 + number)
+    image = Image.merge('RGB', (gradient, noise, gradient.rotate(180)))
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def choose(candidates, device_width, density):
+    """Кандидат srcset, который выберет браузер для карточки
+    шириной min(экран, наибольшая ширина) из sizes."""
+    needed = min(device_width, CARD_WIDTHS[-1]) * density
+    for url, width in candidates:
+        if width >= needed:
+            return url
+    return candidates[-1][0]
+
+
+class Command(BaseCommand):
+    help = ('Считает байты картинок на странице ленты для разных экранов: '
+            'с одной миниатюрой 960x339 и с выбором из srcset.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=POSTS_AMOUNT)
+
+    def handle(self, *args, **options):
+        media_root = tempfile.mkdtemp()
+        overrides = {
+            'MEDIA_ROOT': media_root,
+            'ALLOWED_HOSTS': ['*'],
+            'DEBUG': False,
+            'PAGE_CACHE_TIMEOUT': 0,
+        }
+        try:
+            with override_settings(**overrides), isolated_database():
+                cache.clear()
+                self.seed(options['posts'])
+                cards = self.parse(Client().get(reverse('posts:index')))
+                self.report(cards)
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+
+    def seed(self, total):
+        author = User.objects.create_user(username='bench')
+        for number in range(total):
+            post = Post(text=f'Пост {number}', author=author)
+            post.image.save(f'bench_{number}.jpg',
+                            ContentFile(photo(number)), save=False)
+            post.save()
+            thumbnails.generate(post.image)
+        Post.objects.update(thumbnails_ready=True)
+
+    @staticmethod
+    def parse(response):
+        """Для каждой карточки - кандидаты srcset тега <img>
+        и те, из которых выберет браузер: у <picture> это первый
+        <source>. Кандидат - пара (адрес, ширина)."""
+        cards = []
+        source = None
+        for tag in IMAGE_TAG.findall(response.content.decode()):
+            attributes = dict(ATTRIBUTE.findall(tag))
+            if 'srcset' not in attributes:
+                continue
+            candidates = [
+                (url, int(width[:-1])) for url, width in (
+                    candidate.split()
+                    for candidate in attributes['srcset'].split(', '))
+            ]
+            if tag.startswith('<source'):
+                source = source or candidates
+                continue
+            cards.append((candidates, source or candidates))
+            source = None
+        return cards
+
+    @staticmethod
+    def size(url):
+        return default_storage.size(url[len(settings.MEDIA_URL):])
+
+    def report(self, cards):
+        # До srcset каждая карточка загружала JPEG наибольшей ширины.
+        before = sum(self.size(fallback[-1][0]) for fallback, _ in cards)
+        self.stdout.write(
+            f'Карточек с картинками: {len(cards)}, '
+            f'до srcset: {before / 1024:.1f} КБ на любом экране')
+        self.stdout.write(f'{"экран":>16} {"до, КБ":>9} {"после, КБ":>10} '
+                          f'{"разница":>8}')
+        for name, width, density in DEVICES:
+            after = sum(self.size(choose(candidates, width, density))
+                        for _, candidates in cards)
+            self.stdout.write(
+                f'{name:>16} {before / 1024:>9.1f} {after / 1024:>10.1f} '
+                f'{(after - before) / before * 100 if before else 0:>7.0f}%')
@@ -0,0 +1,79 @@
+from datetime import timedelta
+from statistics import median
+
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.benchmark import isolated_database, measure
+from posts.constants import POSTS_AMOUNT
+from posts.models import Post, User
+from posts.utils import KeysetPaginator, encode_cursor
+
+PAGE_DEPTHS = (1, 10, 100, 1000, 10000, 50000)
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает OFFSET- и keyset-пагинацию ленты постов '
+            'на временной базе.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--batch', type=int, default=50_000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            self.seed(options['posts'], options['batch'])
+            self.compare(options['posts'], options['repeat'])
+
+    def seed(self, total, batch):
+        """Вставляет посты напрямую через executemany:
+        bulk_create перезаписал бы pub_date из-за auto_now_add."""
+        author = User.objects.create_user(username='bench')
+        table = Post._meta.db_table
+        sql = (f'INSERT INTO {table} '
+               '(text, pub_date, updated, author_id, image, '
+               'thumbnails_ready, fanned_out) '
+               'VALUES (%s, %s, %s, %s, %s, %s, %s)')
+        started = timezone.now() - timedelta(seconds=total)
+        with transaction.atomic(), connection.cursor() as cursor:
+            for offset in range(0, total, batch):
+                rows = [
+                    (f'Пост {i}', started + timedelta(seconds=i),
+                     started + timedelta(seconds=i), author.pk, '',
+                     True, True)
+                    for i in range(offset, min(offset + batch, total))
+                ]
+                cursor.executemany(sql, rows)
+        self.stdout.write(f'Создано постов: {total}')
+
+    def compare(self, total, repeat):
+        posts = Post.objects.select_related('author', 'group')
+        last_page = max(1, -(-total // POSTS_AMOUNT))
+        depths = sorted({d for d in PAGE_DEPTHS if d < last_page}
+                        | {last_page})
+        self.stdout.write(f'{"page":>8} {"offset, ms":>12} '
+                          f'{"keyset, ms":>12} {"x":>8}')
+        for number in depths:
+            offset_time = median(measure(
+                lambda: list(
+                    Paginator(posts, POSTS_AMOUNT).page(number)),
+                repeat,
+            ))
+            cursor = None
+            if number > 1:
+                boundary = posts.order_by(*KeysetPaginator.ordering)[
+                    (number - 1) * POSTS_AMOUNT - 1]
+                cursor = encode_cursor(boundary)
+            keyset_time = median(measure(
+                lambda: list(KeysetPaginator(
+                    posts, POSTS_AMOUNT, cursor=cursor).page()),
+                repeat,
+            ))
+            self.stdout.write(
+                f'{number:>8} {offset_time * 1000:>12.2f} '
+                f'{keyset_time * 1000:>12.2f} '
+                f'{offset_time / keyset_time:>8.1f}'
+            )
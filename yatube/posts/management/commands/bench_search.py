@@ -0,0 +1,83 @@
+import random
+from statistics import median
+
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Q
+from faker import Faker
+
+from core.benchmark import isolated_database, measure
+from posts import search
+from posts.constants import POSTS_AMOUNT, SEARCH_MAX_RESULTS
+from posts.models import Comment, Post, User
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает поиск по индексам FTS5 и обратному индексу '
+            'с фильтром icontains на временной базе.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10_000)
+        parser.add_argument('--comments', type=int, default=2)
+        parser.add_argument('--queries', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            words = self.seed(options['posts'], options['comments'])
+            queries = random.Random(0).sample(words, options['queries'])
+            self.compare(queries, options['repeat'])
+
+    def seed(self, total, comments_per_post):
+        fake = Faker('ru_RU')
+        fake.seed_instance(0)
+        author = User.objects.create_user(username='bench')
+        with transaction.atomic():
+            Post.objects.bulk_create(
+                Post(text=fake.text(300), author=author)
+                for _ in range(total)
+            )
+            posts = list(Post.objects.values_list('pk', flat=True))
+            Comment.objects.bulk_create(
+                Comment(post_id=post_id, author=author, text=fake.text(100))
+                for post_id in posts
+                for _ in range(comments_per_post)
+            )
+        self.stdout.write(f'Постов: {total}, комментариев: '
+                          f'{total * comments_per_post}')
+        return sorted({
+            word.lower() for word in fake.words(500) if len(word) > 4})
+
+    def compare(self, queries, repeat):
+        """Первая страница выдачи вместе с общим числом результатов,
+        как её строит представление поиска."""
+        def icontains(word):
+            posts = Post.objects.filter(
+                Q(text__icontains=word) | Q(comments__text__icontains=word),
+            ).distinct()
+            return list(Paginator(posts, POSTS_AMOUNT).page(1))
+
+        def indexed(index, word):
+            post_ids = index.search(search.terms(word), SEARCH_MAX_RESULTS)
+            page = Paginator(post_ids, POSTS_AMOUNT).page(1)
+            return list(Post.objects.in_bulk(page.object_list))
+
+        timings = {'icontains': [
+            median(measure(lambda: icontains(word), repeat))
+            for word in queries
+        ]}
+        for index in (search.FTS5Index(), search.InvertedIndex()):
+            name = type(index).__name__
+            with transaction.atomic():
+                build = median(measure(lambda: search.rebuild(index), 1))
+            self.stdout.write(f'{name}: построение {build:.2f} с')
+            timings[name] = [
+                median(measure(lambda: indexed(index, word), repeat))
+                for word in queries
+            ]
+        self.stdout.write(f'Запросов: {len(queries)}, ms')
+        self.stdout.write(f'{"":>14} {"медиана":>9} {"макс.":>9}')
+        for name, values in timings.items():
+            self.stdout.write(f'{name:>14} {median(values) * 1000:9.2f} '
+                              f'{max(values) * 1000:9.2f}')
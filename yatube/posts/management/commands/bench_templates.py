@@ -0,0 +1,76 @@
+import re
+import shutil
+import tempfile
+from io import BytesIO
+from statistics import median
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.template import engines
+from django.template.loader import get_template
+from django.test.utils import override_settings
+from PIL import Image
+
+from core.benchmark import isolated_database, measure
+from posts.constants import POSTS_AMOUNT
+from posts.models import Post, User
+
+CARD_TEMPLATE = 'posts/includes/post.html'
+CACHE_TAG = re.compile(r'{%\s*(end)?cache[^%]*%}')
+
+
+class Command(BaseCommand):
+    help = ('Измеряет время рендера карточек постов с кэшем фрагментов '
+            'и без него.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=POSTS_AMOUNT)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        media_root = tempfile.mkdtemp()
+        try:
+            with override_settings(MEDIA_ROOT=media_root), \
+                    isolated_database():
+                posts = self.seed(options['posts'])
+                self.compare(posts, options['repeat'])
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+
+    def seed(self, total):
+        author = User.objects.create_user(username='bench')
+        posts = []
+        for i in range(total):
+            # Разные картинки: одинаковые хранилище сохранит один раз.
+            buffer = BytesIO()
+            Image.new('RGB', (1920, 1080), (40, 120, i % 256)).save(
+                buffer, 'JPEG')
+            post = Post(text=f'Тестовый пост {i} ' * 20, author=author)
+            post.image.save(
+                f'bench_{i}.jpg', ContentFile(buffer.getvalue()), save=False)
+            post.save()
+            posts.append(post)
+        return list(Post.objects.select_related('author', 'group'))
+
+    def compare(self, posts, repeat):
+        source = get_template(CARD_TEMPLATE).template.source
+        cached = engines['django'].from_string(source)
+        uncached = engines['django'].from_string(CACHE_TAG.sub('', source))
+
+        def render(template):
+            for post in posts:
+                template.render({'post': post})
+
+        cache.clear()
+        first = median(measure(lambda: render(uncached), 1))
+        results = (
+            ('первый рендер (создание миниатюр)', first),
+            ('без кэша фрагментов',
+             median(measure(lambda: render(uncached), repeat))),
+            ('с кэшем фрагментов',
+             median(measure(lambda: render(cached), repeat))),
+        )
+        self.stdout.write(f'Карточек на странице: {len(posts)}')
+        for title, seconds in results:
+            self.stdout.write(f'{title:>36}: {seconds * 1000:8.2f} ms')
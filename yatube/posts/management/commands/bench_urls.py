@@ -0,0 +1,179 @@
+import json
+import platform
+import shutil
+import tempfile
+import time
+import tracemalloc
+from statistics import mean
+
+import django
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.benchmark import isolated_database, percentile
+from posts import urls
+from posts.models import Group, Post, User
+from posts.seeding import SEED_PASSWORD, seed
+
+
+class Command(BaseCommand):
+    help = ('Заполняет временную базу синтетическими данными и замеряет '
+            'все адреса posts: перцентили времени ответа, число '
+            'запросов к базе и память. Результаты пишутся в JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--output', default='bench_urls.json')
+        parser.add_argument(
+            '--compare', help='Прошлый JSON для сравнения результатов.')
+        parser.add_argument(
+            '--page-cache', action='store_true',
+            help='Не отключать кэш страниц для анонимных пользователей.')
+
+    def handle(self, *args, **options):
+        media_root = tempfile.mkdtemp()
+        overrides = {
+            'MEDIA_ROOT': media_root,
+            'ALLOWED_HOSTS': ['*'],
+            'DEBUG': False,
+        }
+        if not options['page_cache']:
+            overrides['PAGE_CACHE_TIMEOUT'] = 0
+        try:
+            with override_settings(**overrides), isolated_database():
+                cache.clear()
+                started = time.perf_counter()
+                created = seed(users=options['users'], posts=options['posts'])
+                self.stdout.write(
+                    f'Данные созданы за {time.perf_counter() - started:.1f} с'
+                    f': {created}')
+                results = self.run(options['repeat'], options['warmup'])
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+        report = {
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'options': {name: options[name] for name in (
+                'users', 'posts', 'repeat', 'warmup', 'page_cache')},
+            'data': created,
+            'results': results,
+        }
+        with open(options['output'], 'w') as out:
+            json.dump(report, out, ensure_ascii=False, indent=2)
+        self.print(results, options['compare'])
+        self.stdout.write(f'Результаты сохранены в {options["output"]}')
+
+    def targets(self):
+        """Адреса всех маршрутов posts на самых нагруженных объектах:
+        самый популярный автор, самая большая группа, пост
+        с наибольшим числом комментариев."""
+        author = User.objects.order_by('-stats__followers_count').first()
+        group = Group.objects.annotate(
+            total=Count('posts')).order_by('-total').first()
+        post = Post.objects.annotate(
+            total=Count('comments')).order_by('-total').first()
+        values = {
+            'username': author.username,
+            'slug': group.slug,
+            'post_id': post.pk,
+        }
+        query = {'search': '?q=' + post.text.split()[0]}
+        for pattern in urls.urlpatterns:
+            kwargs = {name: values[name]
+                      for name in pattern.pattern.converters}
+            kwargs.update(pattern.default_args)
+            address = reverse(f'posts:{pattern.name}', kwargs=kwargs)
+            yield pattern.name, address + query.get(pattern.name, ''), post
+
+    def run(self, repeat, warmup):
+        anonymous = Client()
+        reader = Client()
+        reader.login(
+            username=User.objects.order_by(
+                '-stats__following_count').first().username,
+            password=SEED_PASSWORD,
+        )
+        results = []
+        for name, address, post in self.targets():
+            user = reader
+            if name == 'post_edit':
+                # Форма редактирования доступна только автору поста.
+                user = Client()
+                user.force_login(post.author)
+            for client_name, client in (('anonymous', anonymous),
+                                        ('user', user)):
+                results.append(self.measure(
+                    name, address, client_name, client, repeat, warmup))
+        return results
+
+    @staticmethod
+    def request(client, address):
+        response = client.get(address)
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        return response.status_code, size
+
+    def measure(self, name, address, client_name, client, repeat, warmup):
+        for _ in range(warmup):
+            self.request(client, address)
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            status, size = self.request(client, address)
+            timings.append(time.perf_counter() - started)
+        with CaptureQueriesContext(connection) as queries:
+            self.request(client, address)
+        query_count = len(queries)
+        tracemalloc.start()
+        self.request(client, address)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return {
+            'name': name,
+            'url': address,
+            'client': client_name,
+            'status': status,
+            'bytes': size,
+            'mean_ms': mean(timings) * 1000,
+            'p50_ms': percentile(timings, 50) * 1000,
+            'p95_ms': percentile(timings, 95) * 1000,
+            'p99_ms': percentile(timings, 99) * 1000,
+            'queries': query_count,
+            'peak_kb': peak / 1024,
+        }
+
+    def print(self, results, compare):
+        previous = {}
+        if compare:
+            with open(compare) as source:
+                previous = {
+                    (row['name'], row['client']): row
+                    for row in json.load(source)['results']
+                }
+        self.stdout.write(
+            f'{"name":<16} {"client":<9} {"code":>4} {"p50":>8} {"p95":>8} '
+            f'{"p99":>8} {"sql":>4} {"KiB":>8}'
+            + (f' {"p50 было":>9} {"sql было":>8}' if previous else ''))
+        for row in results:
+            line = (
+                f'{row["name"]:<16} {row["client"]:<9} {row["status"]:>4} '
+                f'{row["p50_ms"]:>8.2f} {row["p95_ms"]:>8.2f} '
+                f'{row["p99_ms"]:>8.2f} {row["queries"]:>4} '
+                f'{row["peak_kb"]:>8.0f}'
+            )
+            old = previous.get((row['name'], row['client']))
+            if old:
+                line += f' {old["p50_ms"]:>9.2f} {old["queries"]:>8}'
+            self.stdout.write(line)
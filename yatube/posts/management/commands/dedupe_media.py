@@ -0,0 +1,44 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from posts import thumbnails
+from posts.models import Post
+from posts.storage import ADDRESS
+
+
+class Command(BaseCommand):
+    help = ('Переносит изображения постов, загруженные до хранения '
+            'по хешу содержимого, на адреса по хешу: одинаковые файлы '
+            'становятся одним, старые копии и их миниатюры удаляются.')
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        names = [
+            name for name in Post.objects.exclude(image='').order_by(
+                'image').values_list('image', flat=True).distinct()
+            if not ADDRESS.search(name)
+        ]
+        addresses = set()
+        freed = missing = 0
+        for name in names:
+            if not storage.exists(name):
+                missing += 1
+                continue
+            size = storage.size(name)
+            with storage.open(name) as source:
+                address = storage.save(name, source)
+            if address in addresses:
+                freed += size
+            else:
+                addresses.add(address)
+                thumbnails.warm([address])
+            Post.objects.filter(image=name).update(image=address)
+            default.kvstore.delete(ImageFile(name, storage))
+            storage.delete(name)
+        # На закэшированных страницах остались старые адреса картинок.
+        cache.clear()
+        self.stdout.write(
+            f'Файлов: {len(names)}, уникальных: {len(addresses)}, '
+            f'не найдено: {missing}, освобождено {freed / 1024:.1f} КБ')
@@ -0,0 +1,80 @@
+import json
+import os
+import time
+from contextlib import suppress
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.transfer import SPECS, dump
+
+
+class Command(BaseCommand):
+    help = ('Выгружает группы, посты, комментарии и подписки в JSONL '
+            'порциями, с контрольной точкой для продолжения.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--chunk', type=int, default=5000)
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить прерванную выгрузку с контрольной точки.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        self.checkpoint = path + '.checkpoint'
+        state = self.load_checkpoint() if options['resume'] else None
+        names = [spec.name for spec in SPECS]
+        started = time.perf_counter()
+        total = 0
+        with open(path, 'r+b' if state else 'wb') as out:
+            if state:
+                # Всё после контрольной точки могло записаться не целиком.
+                out.truncate(state['offset'])
+                out.seek(state['offset'])
+            for spec in SPECS:
+                after = 0
+                if state:
+                    if names.index(spec.name) < names.index(state['model']):
+                        continue
+                    if spec.name == state['model']:
+                        after = state['after']
+                total += self.export(spec, out, after, options['chunk'])
+        with suppress(FileNotFoundError):
+            os.remove(self.checkpoint)
+        self.report('всего', total, time.perf_counter() - started)
+
+    def export(self, spec, out, after, chunk):
+        started = time.perf_counter()
+        rows = 0
+        while True:
+            last = None
+            for record in spec.rows(after, chunk):
+                out.write(dump(record))
+                last = record['id']
+                rows += 1
+            if last is None:
+                break
+            after = last
+            out.flush()
+            self.save_checkpoint(
+                {'model': spec.name, 'after': after, 'offset': out.tell()})
+        self.report(spec.name, rows, time.perf_counter() - started)
+        return rows
+
+    def load_checkpoint(self):
+        try:
+            with open(self.checkpoint) as source:
+                return json.load(source)
+        except FileNotFoundError:
+            raise CommandError('Контрольная точка не найдена.')
+
+    def save_checkpoint(self, state):
+        temporary = self.checkpoint + '.tmp'
+        with open(temporary, 'w') as out:
+            json.dump(state, out)
+        os.replace(temporary, self.checkpoint)
+
+    def report(self, title, rows, seconds):
+        rate = rows / seconds if seconds else 0
+        self.stdout.write(
+            f'{title:>8}: {rows} строк, {seconds:.2f} с, {rate:.0f} строк/с')
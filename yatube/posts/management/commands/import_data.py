@@ -0,0 +1,111 @@
+import json
+import os
+import time
+from contextlib import suppress
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from posts import timeline
+from posts.transfer import SPECS, SPECS_BY_NAME, original_dates, resolve_users
+
+
+class Command(BaseCommand):
+    help = ('Загружает JSONL из export_data пачками bulk_create '
+            'в транзакциях, с контрольной точкой для продолжения.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch', type=int, default=1000)
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить прерванную загрузку с контрольной точки.')
+        parser.add_argument(
+            '--skip-derived', action='store_true',
+            help='Не пересчитывать счётчики, ленты и поисковый индекс.')
+
+    def handle(self, *args, **options):
+        self.checkpoint = options['path'] + '.checkpoint'
+        self.derived = not options['skip_derived']
+        offset = self.load_checkpoint() if options['resume'] else 0
+        self.rows = {}
+        self.seconds = {}
+        started = time.perf_counter()
+        with open(options['path'], 'rb') as source, original_dates():
+            source.seek(offset)
+            spec, batch = None, []
+            for line in source:
+                record = json.loads(line)
+                if spec is not None and record['model'] != spec.name:
+                    self.flush(spec, batch, offset)
+                    batch = []
+                spec = SPECS_BY_NAME[record['model']]
+                batch.append(record)
+                offset += len(line)
+                if len(batch) == options['batch']:
+                    self.flush(spec, batch, offset)
+                    batch = []
+            if batch:
+                self.flush(spec, batch, offset)
+        with suppress(FileNotFoundError):
+            os.remove(self.checkpoint)
+        for spec in SPECS:
+            if spec.name in self.rows:
+                self.report(
+                    spec.name, self.rows[spec.name], self.seconds[spec.name])
+        self.report('всего', sum(self.rows.values()),
+                    time.perf_counter() - started)
+        self.finish()
+
+    def flush(self, spec, batch, offset):
+        started = time.perf_counter()
+        with transaction.atomic():
+            usernames = {record[name]
+                         for record in batch for name in spec.users}
+            user_ids = resolve_users(usernames) if usernames else {}
+            objects = [spec.build(record, user_ids) for record in batch]
+            # Уже загруженные строки пропускаются, поэтому повторная
+            # загрузка того же файла безопасна.
+            spec.model.objects.bulk_create(objects, ignore_conflicts=True)
+            if spec.name == 'follow' and self.derived:
+                for follow in objects:
+                    timeline.backfill(follow.user_id, follow.author_id)
+        self.save_checkpoint(offset)
+        self.rows[spec.name] = self.rows.get(spec.name, 0) + len(batch)
+        self.seconds[spec.name] = (
+            self.seconds.get(spec.name, 0) + time.perf_counter() - started)
+
+    def finish(self):
+        # id пришли из выгрузки: последовательности нужно сдвинуть.
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [spec.model for spec in SPECS])
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+        if self.derived:
+            # bulk_create не отправляет сигналы: производные данные
+            # пересчитываются целиком.
+            call_command('reconcile_author_stats', stdout=self.stdout)
+            call_command('rebuild_search_index', stdout=self.stdout)
+            cache.clear()
+
+    def load_checkpoint(self):
+        try:
+            with open(self.checkpoint) as source:
+                return json.load(source)['offset']
+        except FileNotFoundError:
+            raise CommandError('Контрольная точка не найдена.')
+
+    def save_checkpoint(self, offset):
+        temporary = self.checkpoint + '.tmp'
+        with open(temporary, 'w') as out:
+            json.dump({'offset': offset}, out)
+        os.replace(temporary, self.checkpoint)
+
+    def report(self, title, rows, seconds):
+        rate = rows / seconds if seconds else 0
+        self.stdout.write(
+            f'{title:>8}: {rows} строк, {seconds:.2f} с, {rate:.0f} строк/с')
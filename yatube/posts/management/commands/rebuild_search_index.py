@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс постов и комментариев.'
+
+    def handle(self, *args, **options):
+        index = search.get_index()
+        started = time.perf_counter()
+        with transaction.atomic():
+            total = search.rebuild(index)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{type(index).__name__}: документов {total}, {elapsed:.2f} с')
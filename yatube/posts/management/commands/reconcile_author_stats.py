@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import User
+from posts.stats import reconcile
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счётчики карточки автора и исправляет '
+            'расхождения с фактическими данными.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        user_ids = User.objects.order_by('pk').values_list('pk', flat=True)
+        checked = fixed = 0
+        chunk = []
+        for user_id in user_ids.iterator():
+            chunk.append(user_id)
+            if len(chunk) == options['chunk']:
+                fixed += self.reconcile_chunk(chunk)
+                checked += len(chunk)
+                chunk = []
+        if chunk:
+            fixed += self.reconcile_chunk(chunk)
+            checked += len(chunk)
+        self.stdout.write(
+            f'Проверено пользователей: {checked}, исправлено: {fixed}')
+
+    def reconcile_chunk(self, user_ids):
+        with transaction.atomic():
+            return reconcile(user_ids)
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.seeding import SEED_PASSWORD, seed
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, группами, '
+            'постами, комментариями и подписками.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок пользователя.')
+        parser.add_argument('--hot-posts', type=int, default=20)
+        parser.add_argument(
+            '--hot-comments', type=int, default=200,
+            help='Комментариев у каждого горячего поста.')
+        parser.add_argument(
+            '--comments', type=int, default=3,
+            help='Наибольшее число комментариев обычного поста.')
+        parser.add_argument('--images', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        created = seed(
+            users=options['users'],
+            posts=options['posts'],
+            groups=options['groups'],
+            follows=options['follows'],
+            hot_posts=options['hot_posts'],
+            hot_comments=options['hot_comments'],
+            comments=options['comments'],
+            images=options['images'],
+            random_seed=options['seed'],
+        )
+        elapsed = time.perf_counter() - started
+        for name, total in created.items():
+            self.stdout.write(f'{name:>9}: {total}')
+        self.stdout.write(
+            f'Готово за {elapsed:.1f} с, пароль пользователей: '
+            f'{SEED_PASSWORD}')
@@ -0,0 +1,38 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = ('Создаёт миниатюры изображений постов из очереди задач '
+            'в пуле потоков.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--interval', type=float, default=1.0)
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Разобрать текущую очередь и завершиться.',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        done = failed = 0
+        with ThreadPoolExecutor(workers) as pool:
+            while True:
+                thumbnails.requeue_stale()
+                jobs = thumbnails.pending(workers * 4)
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+                for result in pool.map(thumbnails.run_in_thread, jobs):
+                    if result:
+                        done += 1
+                    else:
+                        failed += 1
+        self.stdout.write(f'Готово: {done}, не выполнено: {failed}')
@@ -0,0 +1,139 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from multiprocessing import get_context
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as thumbnail_settings
+
+from posts import thumbnails
+from posts.constants import ORPHAN_MIN_AGE
+from posts.models import Post
+from posts.storage import TEMP_PREFIX
+
+
+def walk(storage, path):
+    """Все файлы каталога хранилища, включая вложенные."""
+    if not storage.exists(path):
+        return
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield os.path.join(path, name)
+    for directory in directories:
+        yield from walk(storage, os.path.join(path, directory))
+
+
+def settled(storage, name, before):
+    """Файл не временный и не менялся после before: запись о нём
+    уже должна быть в базе."""
+    return (not os.path.basename(name).startswith(TEMP_PREFIX)
+            and storage.get_modified_time(name) < before)
+
+
+class Command(BaseCommand):
+    help = ('Создаёт недостающие миниатюры изображений постов в пуле '
+            'процессов и удаляет файлы, на которые не ссылается ни один '
+            'пост.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk', type=int, default=100)
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Число процессов; 0 - работать в текущем процессе.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать лишние файлы, не удаляя их.',
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=ORPHAN_MIN_AGE,
+            help='Не трогать файлы моложе стольких секунд: их пост '
+                 'может быть ещё не сохранён.',
+        )
+
+    def handle(self, *args, **options):
+        upload_to = Post._meta.get_field('image').upload_to
+        cache_prefix = thumbnail_settings.THUMBNAIL_PREFIX
+        cached_before = set(walk(default_storage, cache_prefix))
+
+        started = time.perf_counter()
+        images, referenced, errors = self.warm(
+            options['chunk'], options['workers'])
+        elapsed = time.perf_counter() - started
+        created = len(referenced - cached_before)
+        self.stdout.write(
+            f'Изображений: {images}, создано миниатюр: {created}, '
+            f'ошибок: {errors}, {elapsed:.2f} с, '
+            f'{images / elapsed if elapsed else 0:.1f} изобр./с'
+        )
+
+        originals = set(
+            Post.objects.exclude(image='').values_list('image', flat=True))
+        # Копии в других форматах лежат рядом с оригиналом под тем же
+        # именем с другим расширением.
+        stems = {os.path.splitext(name)[0] for name in originals}
+        before = timezone.now() - timedelta(seconds=options['min_age'])
+        storage = Post._meta.get_field('image').storage
+        sources = [
+            name for name in walk(storage, upload_to)
+            if os.path.splitext(name)[0] not in stems
+            and settled(storage, name, before)
+        ]
+        cached = [
+            name for name in walk(default_storage, cache_prefix)
+            if name not in referenced
+            and settled(default_storage, name, before)
+        ]
+        sizes = {name: default_storage.size(name)
+                 for name in sources + cached}
+        if not options['dry_run']:
+            # Такой же файл мог только что загрузиться для нового поста:
+            # collect перепроверяет его время перед удалением.
+            sources = [name for name in sources
+                       if storage.collect(name, before)]
+            for name in cached:
+                default_storage.delete(name)
+            default.kvstore.cleanup()
+        orphans = sources + cached
+        freed = sum(sizes[name] for name in orphans)
+        for name in orphans:
+            self.stdout.write(f'  {name}', self.style.WARNING)
+        action = 'Найдено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(
+            f'{action} лишних файлов: {len(orphans)}, '
+            f'{freed / 1024:.1f} КБ'
+        )
+
+    def chunks(self, size):
+        names = Post.objects.exclude(image='').order_by('pk').values_list(
+            'image', flat=True).iterator(chunk_size=size)
+        chunk = []
+        for name in names:
+            chunk.append(name)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def warm(self, size, workers):
+        chunks = list(self.chunks(size))
+        if workers > 0:
+            # Дочерние процессы открывают свои соединения с базой.
+            connections.close_all()
+            with ProcessPoolExecutor(
+                    workers, mp_context=get_context('fork')) as pool:
+                results = list(pool.map(thumbnails.warm, chunks))
+        else:
+            results = [thumbnails.warm(chunk) for chunk in chunks]
+        referenced = set()
+        errors = 0
+        for names, chunk_errors in results:
+            referenced.update(names)
+            errors += chunk_errors
+        return sum(len(chunk) for chunk in chunks), referenced, errors
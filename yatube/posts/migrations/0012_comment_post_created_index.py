@@ -0,0 +1,17 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:53
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_authorstats'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='comment',
+            index_together={('post', 'created')},
+        ),
+    ]
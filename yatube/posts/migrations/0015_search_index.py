@@ -0,0 +1,112 @@
+# Generated by Django 2.2.16 on 2026-10-17 07:06
+
+from collections import Counter
+
+from django.db import OperationalError, migrations, models
+import django.db.models.deletion
+from django.utils.html import strip_tags
+
+from core.stemmer import tokenize
+
+# Копия схемы и построения индекса на момент миграции: posts.search
+# зависит от настроек и соединения по умолчанию и может меняться.
+FTS_TABLE = 'posts_search'
+POST_WEIGHT = 2
+BATCH_SIZE = 500
+FTS_INSERT = (f'INSERT INTO {FTS_TABLE} (rowid, post_text, comment_text, '
+              f'post_id) VALUES (%s, %s, %s, %s)')
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+                f'post_text, comment_text, post_id UNINDEXED, '
+                f"tokenize='unicode61 remove_diacritics 0')"
+            )
+        except OperationalError:
+            # SQLite собран без FTS5: остаётся обратный индекс.
+            pass
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def documents(apps, alias):
+    """(номер документа, пост, основы слов, пост ли это) для всех
+    постов и комментариев."""
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    sources = (
+        (Post.objects.using(alias).values_list('pk', 'pk', 'text'), 0, True),
+        (Comment.objects.using(alias).values_list('pk', 'post_id', 'text'),
+         1, False),
+    )
+    for queryset, parity, is_post in sources:
+        for pk, post_id, text in queryset.iterator(BATCH_SIZE):
+            yield pk * 2 + parity, post_id, tokenize(strip_tags(text)), is_post
+
+
+def build_index(apps, schema_editor):
+    """Заполняет FTS5, если таблица создана, иначе обратный индекс.
+    При SEARCH_BACKEND=inverted на SQLite с FTS5 индекс строит
+    команда rebuild_search_index."""
+    connection = schema_editor.connection
+    alias = connection.alias
+    if (connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()):
+        with connection.cursor() as cursor:
+            batch = []
+            for document, post_id, words, is_post in documents(apps, alias):
+                body = ' '.join(words)
+                batch.append((document, *((body, '') if is_post
+                                          else ('', body)), post_id))
+                if len(batch) == BATCH_SIZE:
+                    cursor.executemany(FTS_INSERT, batch)
+                    batch = []
+            cursor.executemany(FTS_INSERT, batch)
+        return
+    SearchEntry = apps.get_model('posts', 'SearchEntry')
+    entries = []
+    for document, post_id, words, is_post in documents(apps, alias):
+        scale = POST_WEIGHT if is_post else 1
+        for term, count in Counter(words).items():
+            entries.append(SearchEntry(term=term[:64], document=document,
+                                       post_id=post_id, weight=count * scale))
+        if len(entries) >= BATCH_SIZE:
+            SearchEntry.objects.using(alias).bulk_create(entries)
+            entries = []
+    SearchEntry.objects.using(alias).bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_thumbnail_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Основа слова')),
+                ('document', models.PositiveIntegerField(db_index=True, verbose_name='Документ')),
+                ('weight', models.PositiveIntegerField(verbose_name='Вес')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Запись поискового индекса',
+                'verbose_name_plural': 'Поисковый индекс',
+                'unique_together': {('term', 'document')},
+            },
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+        migrations.RunPython(build_index, migrations.RunPython.noop),
+    ]
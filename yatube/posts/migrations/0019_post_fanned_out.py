@@ -0,0 +1,50 @@
+# Generated by Django 2.2.16 on 2026-10-17 08:30
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+# TIMELINE_FANOUT_LIMIT на момент миграции.
+FANOUT_LIMIT = 5000
+
+
+def mark_missed(apps, schema_editor):
+    """Посты популярных авторов, которых нет ни в одной ленте, не были
+    разложены при публикации. Посты остальных авторов могут
+    отсутствовать в лентах только потому, что старше окна backfill:
+    их не помечаем, иначе автор навсегда попал бы в
+    unfanned_author_ids и замедлил ленты своих подписчиков."""
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    celebrities = AuthorStats.objects.filter(
+        followers_count__gte=FANOUT_LIMIT).values('user_id')
+    missed = Post.objects.annotate(
+        in_timelines=Exists(
+            TimelineEntry.objects.filter(post_id=OuterRef('pk'))),
+    ).filter(author_id__in=celebrities, in_timelines=False).values_list(
+        'pk', flat=True)
+    missed = list(missed)
+    for start in range(0, len(missed), 500):
+        Post.objects.filter(
+            pk__in=missed[start:start + 500]).update(fanned_out=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_post_image_content_addressed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='fanned_out',
+            field=models.BooleanField(default=True, verbose_name='Разложен по лентам'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(fanned_out=False), fields=['author'], name='posts_unfanned_author_idx'),
+        ),
+        migrations.RunPython(mark_missed, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,8 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, router, transaction
 
 from .constants import LEN_STR
+from .storage import ContentAddressedStorage
 
 User = get_user_model()
 
@@ -37,14 +38,30 @@ class Group(models.Model):
         return self.title
 
 
-class Post(models.Model):
+class AtomicSaveMixin:
+    """Сохранение вместе с обработчиками post_save (счётчики, ленты,
+    поиск) выполняется одной транзакцией: при ошибке откатывается всё."""
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class Post(AtomicSaveMixin, models.Model):
     """
     Класс Post предназначен для создания публикаций пользователей.
     Имеет следующие параметры:
     text - текст публикации,
     pub_date - дата публикации,
+    updated - дата последнего изменения, служит версией поста,
     author - автор публикации,
     group - тематическая группа, к которой относится публикация,
+    image - изображение,
+    thumbnails_ready - миниатюры изображения уже созданы фоновой задачей,
+    fanned_out - пост разложен по лентам подписчиков; посты,
+    опубликованные популярным автором, подмешиваются в ленты при чтении,
     LEN_STR - длина поста для вывода в консоль.
     """
 
@@ -58,11 +75,16 @@ class Post(models.Model):
         auto_now_add=True,
         db_index=True,
     )
+    updated = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+    )
     author = models.ForeignKey(
         User,
         verbose_name='Автор',
         help_text='Ну и кто же это придумал?',
         on_delete=models.CASCADE,
+        db_index=False,
     )
     group = models.ForeignKey(
         Group,
@@ -71,19 +93,41 @@ class Post(models.Model):
         null=True,
         on_delete=models.SET_NULL,
         help_text='В каком сообществе опубликовать?',
+        db_index=False,
     )
     image = models.ImageField(
         verbose_name='Изображение',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True,
+        db_index=True,
         help_text='Здесь можно прикрепить картинку.',
     )
+    thumbnails_ready = models.BooleanField(
+        verbose_name='Миниатюры готовы',
+        default=False,
+    )
+    fanned_out = models.BooleanField(
+        verbose_name='Разложен по лентам',
+        default=True,
+    )
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
         default_related_name = 'posts'
+        index_together = (
+            ('group', 'pub_date'),
+            ('author', 'pub_date'),
+        )
+        indexes = (
+            models.Index(
+                fields=('author',),
+                name='posts_unfanned_author_idx',
+                condition=models.Q(fanned_out=False),
+            ),
+        )
 
     def __str__(self):
         return self.text[:LEN_STR]
@@ -118,12 +162,15 @@ class Comment(models.Model):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         default_related_name = 'comments'
+        index_together = (
+            ('post', 'created'),
+        )
 
     def __str__(self):
         return self.text[:LEN_STR]
 
 
-class Follow(models.Model):
+class Follow(AtomicSaveMixin, models.Model):
     """Класс Follow предназначен для создания
     подписчиков на авторов."""
     user = models.ForeignKey(
@@ -140,3 +187,173 @@ class Follow(models.Model):
         help_text='Автор, у которого есть подписчики.',
         on_delete=models.CASCADE,
     )
+
+    class Meta:
+        unique_together = ('user', 'author')
+        index_together = (
+            ('author', 'user'),
+        )
+
+
+class TimelineEntry(models.Model):
+    """Класс TimelineEntry хранит материализованную ленту подписок:
+    запись на каждый пост автора для каждого его подписчика.
+    pub_date копируется из поста, чтобы лента читалась
+    по индексу (user, pub_date) без соединения с Follow."""
+    user = models.ForeignKey(
+        User,
+        related_name='timeline_entries',
+        verbose_name='Читатель',
+        on_delete=models.CASCADE,
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+        on_delete=models.CASCADE,
+    )
+    author = models.ForeignKey(
+        User,
+        related_name='+',
+        verbose_name='Автор',
+        on_delete=models.CASCADE,
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        unique_together = ('user', 'post')
+        index_together = (
+            ('user', 'pub_date'),
+            ('user', 'author'),
+        )
+
+
+class AuthorStats(models.Model):
+    """Класс AuthorStats хранит денормализованные счётчики
+    для карточки автора, чтобы не выполнять COUNT при каждом показе.
+    posts_count - количество постов пользователя,
+    followers_count - количество подписчиков,
+    following_count - количество авторов, на которых он подписан."""
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Постов',
+        default=0,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Подписчиков',
+        default=0,
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name='Подписок',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+
+class ThumbnailJob(models.Model):
+    """Класс ThumbnailJob - задача фонового создания миниатюр
+    изображения поста. Очередь хранится в базе и разбирается
+    командой thumbnail_worker."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    post = models.ForeignKey(
+        Post,
+        related_name='thumbnail_jobs',
+        verbose_name='Пост',
+        on_delete=models.CASCADE,
+    )
+    status = models.CharField(
+        verbose_name='Статус',
+        max_length=16,
+        choices=STATUSES,
+        default=PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток',
+        default=0,
+    )
+    error = models.TextField(
+        verbose_name='Ошибка',
+        blank=True,
+    )
+    created = models.DateTimeField(
+        verbose_name='Создана',
+        auto_now_add=True,
+    )
+    started = models.DateTimeField(
+        verbose_name='Начата',
+        null=True,
+        blank=True,
+    )
+    finished = models.DateTimeField(
+        verbose_name='Завершена',
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        ordering = ('created',)
+        verbose_name = 'Задача миниатюр'
+        verbose_name_plural = 'Задачи миниатюр'
+        index_together = (
+            ('status', 'created'),
+        )
+
+    def __str__(self):
+        return f'{self.post_id}: {self.status}'
+
+
+class SearchEntry(models.Model):
+    """Класс SearchEntry - запись обратного индекса для поиска,
+    используется, когда база не поддерживает FTS5.
+    term - основа слова,
+    document - номер документа: пост или комментарий,
+    post - пост, к которому относится документ,
+    weight - вес основы в документе."""
+    term = models.CharField(
+        verbose_name='Основа слова',
+        max_length=64,
+    )
+    document = models.PositiveIntegerField(
+        verbose_name='Документ',
+        db_index=True,
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name='+',
+        verbose_name='Пост',
+        on_delete=models.CASCADE,
+    )
+    weight = models.PositiveIntegerField(
+        verbose_name='Вес',
+    )
+
+    class Meta:
+        verbose_name = 'Запись поискового индекса'
+        verbose_name_plural = 'Поисковый индекс'
+        unique_together = ('term', 'document')
+
+    def __str__(self):
+        return self.term
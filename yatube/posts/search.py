@@ -0,0 +1,216 @@
+import math
+from collections import Counter
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models import (Case, Count, ExpressionWrapper, F, FloatField,
+                              Sum, When)
+from django.utils.html import strip_tags
+
+from core.stemmer import tokenize
+
+from .constants import (SEARCH_BATCH_SIZE, SEARCH_MAX_RESULTS,
+                        SEARCH_POST_WEIGHT)
+from .models import Comment, Post, SearchEntry
+
+FTS_TABLE = 'posts_search'
+
+
+def post_document(pk):
+    return pk * 2
+
+
+def comment_document(pk):
+    return pk * 2 + 1
+
+
+def terms(text):
+    return tokenize(strip_tags(text))
+
+
+def unique_posts(rows, limit):
+    """Первые limit различных постов из строк, упорядоченных по оценке:
+    пост находят и по тексту, и по каждому комментарию."""
+    post_ids = {}
+    for post_id, *_ in rows:
+        post_ids.setdefault(post_id)
+        if len(post_ids) == limit:
+            break
+    return list(post_ids)
+
+
+class FTS5Index:
+    """Индекс в виртуальной таблице SQLite FTS5. Тексты хранятся
+    в виде основ слов, ранжирование - bm25 с повышенным весом постов."""
+
+    def index_many(self, documents):
+        rows = []
+        for document, post_id, text, is_post in documents:
+            body = ' '.join(terms(text))
+            rows.append((document, *((body, '') if is_post else ('', body)),
+                         post_id))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(row[0],) for row in rows],
+            )
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} '
+                f'(rowid, post_text, comment_text, post_id) '
+                f'VALUES (%s, %s, %s, %s)',
+                rows,
+            )
+
+    def remove(self, documents):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(document,) for document in documents],
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def search(self, query_terms, limit):
+        match = ' '.join(f'"{term}"' for term in query_terms)
+        with connection.cursor() as cursor:
+            # Сортировку по rank FTS5 выполняет сам, без временного
+            # B-дерева, как для ORDER BY bm25(...).
+            cursor.execute(
+                f'SELECT post_id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'AND rank MATCH %s ORDER BY rank',
+                [match, f'bm25({float(SEARCH_POST_WEIGHT)}, 1.0)'],
+            )
+            return unique_posts(cursor, limit)
+
+
+class InvertedIndex:
+    """Обратный индекс в обычной таблице: основа - документ - вес.
+    Ранжирование - сумма tf-idf по словам запроса."""
+
+    def __init__(self, model=SearchEntry):
+        self.model = model
+
+    def index_many(self, documents):
+        documents = list(documents)
+        self.remove(document for document, *_ in documents)
+        entries = []
+        for document, post_id, text, is_post in documents:
+            scale = SEARCH_POST_WEIGHT if is_post else 1
+            for term, count in Counter(terms(text)).items():
+                entries.append(self.model(
+                    term=term[:64],
+                    document=document,
+                    post_id=post_id,
+                    weight=count * scale,
+                ))
+        self.model.objects.bulk_create(entries, batch_size=SEARCH_BATCH_SIZE)
+
+    def remove(self, documents):
+        self.model.objects.filter(document__in=list(documents)).delete()
+
+    def clear(self):
+        self.model.objects.all().delete()
+
+    def search(self, query_terms, limit):
+        entries = self.model.objects.filter(term__in=query_terms)
+        frequency = dict(entries.values_list('term').annotate(Count('pk')))
+        if len(frequency) < len(query_terms):
+            return []
+        total = Post.objects.count() + Comment.objects.count()
+        score = Sum(Case(
+            *(When(term=term, then=ExpressionWrapper(
+                F('weight') * math.log(1 + total / count),
+                output_field=FloatField(),
+            )) for term, count in frequency.items()),
+            output_field=FloatField(),
+        ))
+        # Документ должен содержать все слова запроса; пост получает
+        # лучшую оценку среди своего текста и комментариев.
+        ranked = entries.values('document', 'post').annotate(
+            matched=Count('pk'), score=score,
+        ).filter(
+            matched=len(query_terms),
+        ).order_by('-score').values_list('post', flat=True)
+        return unique_posts(([post_id] for post_id in ranked.iterator()),
+                            limit)
+
+
+@lru_cache(maxsize=None)
+def _has_fts_table(alias):
+    connection = connections[alias]
+    return (connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names())
+
+
+def fts5_available():
+    """Есть ли таблица FTS5 в базе текущего соединения. Ответ
+    запоминается для каждой базы и сбрасывается после migrate."""
+    return _has_fts_table(connection.alias)
+
+
+def forget_tables():
+    """Сбрасывает запомненные ответы fts5_available."""
+    _has_fts_table.cache_clear()
+
+
+def get_index(model=SearchEntry):
+    """Индекс из настройки SEARCH_BACKEND: fts5, inverted или auto -
+    FTS5, если таблица для него создана."""
+    backend = settings.SEARCH_BACKEND
+    if backend == 'fts5' or backend == 'auto' and fts5_available():
+        return FTS5Index()
+    return InvertedIndex(model)
+
+
+def index_post(post):
+    get_index().index_many(
+        [(post_document(post.pk), post.pk, post.text, True)])
+
+
+def index_comment(comment):
+    get_index().index_many(
+        [(comment_document(comment.pk), comment.post_id, comment.text,
+          False)])
+
+
+def remove_post(post):
+    get_index().remove([post_document(post.pk)])
+
+
+def remove_comment(comment):
+    get_index().remove([comment_document(comment.pk)])
+
+
+def rebuild(index=None, posts=Post.objects, comments=Comment.objects):
+    """Полностью перестраивает индекс по постам и комментариям.
+    Возвращает число проиндексированных документов."""
+    index = index or get_index()
+    index.clear()
+    sources = (
+        (posts.values_list('pk', 'pk', 'text'), post_document, True),
+        (comments.values_list('pk', 'post_id', 'text'), comment_document,
+         False),
+    )
+    total = 0
+    for queryset, document, is_post in sources:
+        batch = []
+        for pk, post_id, text in queryset.iterator(SEARCH_BATCH_SIZE):
+            batch.append((document(pk), post_id, text, is_post))
+            if len(batch) == SEARCH_BATCH_SIZE:
+                index.index_many(batch)
+                total += len(batch)
+                batch = []
+        index.index_many(batch)
+        total += len(batch)
+    return total
+
+
+def find(query, limit=SEARCH_MAX_RESULTS):
+    """Номера постов, подходящих под запрос, от лучшего к худшему."""
+    query_terms = list(dict.fromkeys(terms(query)))
+    if not query_terms:
+        return []
+    return get_index().search(query_terms, limit)
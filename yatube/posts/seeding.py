@@ -0,0 +1,207 @@
+"""Синтетические данные для нагрузочных замеров.
+
+Распределения близки к настоящей социальной сети: авторство постов
+и подписчики подчиняются степенному закону (несколько авторов
+собирают большую часть подписок), у немногих горячих постов сотни
+комментариев, у остальных - единицы. Строки вставляются bulk_create,
+производные данные (счётчики, ленты, поиск) пересчитываются в конце.
+"""
+import random
+from datetime import timedelta
+from io import BytesIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from . import search, stats, timeline
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+from .transfer import original_dates
+
+SEED_PASSWORD = 'seed-password'
+# Показатель степенного закона: вес автора с рангом r равен 1 / r ** s.
+POWER_LAW_EXPONENT = 1.1
+HISTORY_DAYS = 365
+
+
+def power_law_weights(total, exponent=POWER_LAW_EXPONENT):
+    return [1 / rank ** exponent for rank in range(1, total + 1)]
+
+
+def make_images(total, rng):
+    """Сохраняет total разных JPEG и возвращает их имена в хранилище."""
+    storage = Post._meta.get_field('image').storage
+    names = []
+    for number in range(total):
+        buffer = BytesIO()
+        color = tuple(rng.randrange(256) for _ in range(3))
+        Image.new('RGB', (1280, 720), color).save(buffer, 'JPEG')
+        names.append(storage.save(
+            f'posts/seed_{number}.jpg', ContentFile(buffer.getvalue())))
+    return names
+
+
+def seed_users(total, start, fake):
+    password = make_password(SEED_PASSWORD)
+    usernames = [f'{fake.user_name()}_{start + number}'
+                 for number in range(total)]
+    User.objects.bulk_create([
+        User(username=username, first_name=fake.first_name(),
+             last_name=fake.last_name(), password=password)
+        for username in usernames
+    ])
+    user_ids = list(User.objects.filter(username__in=usernames).order_by(
+        'pk').values_list('pk', flat=True))
+    AuthorStats.objects.bulk_create(
+        [AuthorStats(user_id=user_id) for user_id in user_ids],
+        ignore_conflicts=True)
+    return user_ids
+
+
+def seed_groups(total, start, fake):
+    prefix = f'seed-{start}-'
+    Group.objects.bulk_create([
+        Group(title=fake.sentence(nb_words=3)[:200],
+              slug=f'{prefix}{number}',
+              description=fake.paragraph())
+        for number in range(total)
+    ])
+    return list(Group.objects.filter(
+        slug__startswith=prefix).values_list('pk', flat=True))
+
+
+def seed_posts(total, user_ids, group_ids, image_names, rng, fake):
+    """Посты за последний год; авторы и группы по степенному закону,
+    картинка у каждого десятого поста."""
+    last_post = Post.objects.aggregate(last=Max('pk'))['last'] or 0
+    now = timezone.now()
+    author_weights = power_law_weights(len(user_ids))
+    group_weights = power_law_weights(len(group_ids))
+    posts = []
+    for number in range(total):
+        pub_date = now - timedelta(
+            seconds=rng.randrange(HISTORY_DAYS * 24 * 3600))
+        group_id = None
+        if group_ids and rng.random() < 0.7:
+            group_id = rng.choices(group_ids, group_weights)[0]
+        posts.append(Post(
+            text=fake.paragraph(nb_sentences=rng.randint(1, 8)),
+            pub_date=pub_date,
+            updated=pub_date,
+            author_id=rng.choices(user_ids, author_weights)[0],
+            group_id=group_id,
+            image=(rng.choice(image_names)
+                   if image_names and number % 10 == 0 else ''),
+            thumbnails_ready=True,
+        ))
+    Post.objects.bulk_create(posts)
+    return list(Post.objects.filter(pk__gt=last_post).order_by(
+        'pk').values_list('pk', 'pub_date'))
+
+
+def seed_comments(post_rows, user_ids, hot_posts, hot_comments, comments,
+                  batch_size, rng, fake):
+    """У hot_posts случайных постов по hot_comments комментариев,
+    у остальных - от нуля до comments."""
+    hot = set(rng.sample(range(len(post_rows)),
+                         min(hot_posts, len(post_rows))))
+    batch = []
+    total = 0
+    for index, (post_id, pub_date) in enumerate(post_rows):
+        amount = hot_comments if index in hot else rng.randint(0, comments)
+        total += amount
+        batch.extend(
+            Comment(
+                post_id=post_id,
+                author_id=rng.choice(user_ids),
+                text=fake.sentence(),
+                created=pub_date + timedelta(
+                    seconds=rng.randrange(7 * 24 * 3600)),
+            )
+            for _ in range(amount)
+        )
+        if len(batch) >= batch_size:
+            Comment.objects.bulk_create(batch)
+            batch = []
+    Comment.objects.bulk_create(batch)
+    return total
+
+
+def seed_follows(user_ids, follows, rng):
+    """Число подписок пользователя распределено экспоненциально
+    со средним follows, авторы выбираются по степенному закону."""
+    weights = power_law_weights(len(user_ids))
+    pairs = set()
+    for user_id in user_ids:
+        wanted = 0
+        if follows:
+            wanted = min(int(rng.expovariate(1 / follows)),
+                         len(user_ids) // 2)
+        while wanted:
+            author_id = rng.choices(user_ids, weights)[0]
+            if author_id != user_id and (user_id, author_id) not in pairs:
+                pairs.add((user_id, author_id))
+                wanted -= 1
+    Follow.objects.bulk_create(
+        [Follow(user_id=user_id, author_id=author_id)
+         for user_id, author_id in pairs],
+        ignore_conflicts=True)
+    return pairs
+
+
+def seed(users=1000, posts=10000, groups=20, follows=20, hot_posts=20,
+         hot_comments=200, comments=3, images=10, random_seed=0,
+         batch_size=1000):
+    """
+    Заполняет базу и возвращает словарь с количеством созданных строк.
+    follows - среднее число подписок пользователя,
+    comments - наибольшее число комментариев обычного поста,
+    images - число разных картинок.
+    Все пользователи получают пароль SEED_PASSWORD.
+    """
+    rng = random.Random(random_seed)
+    fake = Faker('ru_RU')
+    fake.seed_instance(random_seed)
+
+    with transaction.atomic(), original_dates():
+        # Повторный запуск дополняет базу, а не конфликтует с ней.
+        start = User.objects.count()
+        user_ids = seed_users(users, start, fake)
+        group_ids = seed_groups(groups, start, fake)
+        image_names = make_images(images, rng) if images else []
+        post_rows = seed_posts(
+            posts, user_ids, group_ids, image_names, rng, fake)
+        comments_total = seed_comments(
+            post_rows, user_ids, hot_posts, hot_comments, comments,
+            batch_size, rng, fake)
+        pairs = seed_follows(user_ids, follows, rng)
+
+        # bulk_create не отправляет сигналы: производные данные
+        # пересчитываются явно.
+        for offset in range(0, len(user_ids), batch_size):
+            stats.reconcile(user_ids[offset:offset + batch_size])
+        cache.delete_many([timeline.CELEBRITIES_KEY, timeline.UNFANNED_KEY])
+        celebrities = timeline.celebrity_ids()
+        for user_id, author_id in pairs:
+            if author_id not in celebrities:
+                timeline.backfill(user_id, author_id)
+        # Посты популярных авторов не раскладываются, а подмешиваются
+        # в ленты при чтении, как после timeline.fan_out.
+        Post.objects.filter(
+            author_id__in=celebrities, fanned_out=True,
+        ).update(fanned_out=False)
+        transaction.on_commit(lambda: cache.delete(timeline.UNFANNED_KEY))
+        search.rebuild()
+
+    return {
+        'users': len(user_ids),
+        'groups': len(group_ids),
+        'posts': len(post_rows),
+        'comments': comments_total,
+        'follows': len(pairs),
+    }
@@ -0,0 +1,120 @@
+from django.db.models.signals import (post_delete, post_migrate, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core import replicas
+
+from . import search, stats, thumbnails, timeline
+from .cache import invalidate
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+
+def post_scopes(post):
+    """Области кэша страниц, на которых показывается пост."""
+    scopes = {'index', f'profile:{post.author.username}'}
+    if post.group_id:
+        scopes.add(f'group:{post.group.slug}')
+    previous_group = getattr(post, '_previous_group_slug', None)
+    if previous_group:
+        scopes.add(f'group:{previous_group}')
+    return scopes
+
+
+@receiver(post_save, sender=User)
+def create_author_stats(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous(sender, instance, **kwargs):
+    previous_image = ''
+    if instance.pk:
+        instance._previous_group_slug, previous_image = Post.objects.filter(
+            pk=instance.pk,
+        ).values_list('group__slug', 'image').first() or (None, '')
+    instance._image_changed = (
+        bool(instance.image) and instance.image.name != previous_image)
+    if instance._image_changed:
+        instance.thumbnails_ready = False
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        stats.bump(instance.author_id, 'posts_count', 1)
+        timeline.fan_out(instance)
+    if getattr(instance, '_image_changed', False):
+        # Такой же файл уже у другого поста: миниатюры общие.
+        if Post.objects.filter(
+            image=instance.image.name, thumbnails_ready=True,
+        ).exclude(pk=instance.pk).exists():
+            instance.thumbnails_ready = True
+            Post.objects.filter(pk=instance.pk).update(thumbnails_ready=True)
+        else:
+            thumbnails.enqueue(instance)
+    update_fields = kwargs.get('update_fields')
+    if not update_fields or 'text' in update_fields:
+        search.index_post(instance)
+    invalidate(*post_scopes(instance))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    stats.bump(instance.author_id, 'posts_count', -1)
+    # Изображение здесь не удаляется: такой же файл может прямо сейчас
+    # загружаться для нового поста. Файлы без ссылок удаляет
+    # warm_thumbnails через ContentAddressedStorage.collect.
+    search.remove_post(instance)
+    invalidate(*post_scopes(instance))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, **kwargs):
+    search.index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    search.remove_comment(instance)
+    # Страница поста изменилась: новая дата сбрасывает её ETag.
+    Post.objects.filter(pk=instance.post_id).update(updated=timezone.now())
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        stats.bump(instance.author_id, 'followers_count', 1)
+        stats.bump(instance.user_id, 'following_count', 1)
+        timeline.backfill(instance.user_id, instance.author_id)
+        invalidate(f'profile:{instance.author.username}',
+                   f'profile:{instance.user.username}')
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    stats.bump(instance.author_id, 'followers_count', -1)
+    stats.bump(instance.user_id, 'following_count', -1)
+    timeline.trim(instance.user_id, instance.author_id)
+    invalidate(f'profile:{instance.author.username}',
+               f'profile:{instance.user.username}')
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=User)
+def content_changed(sender, **kwargs):
+    # Автор изменения читает из основной базы, пока реплики не догонят.
+    replicas.mark_written()
+
+
+@receiver(post_migrate)
+def migrated(sender, **kwargs):
+    # Миграции могли создать или удалить таблицу FTS5.
+    search.forget_tables()
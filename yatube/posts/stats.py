@@ -0,0 +1,77 @@
+from django.db.models import Count, F
+
+from .models import AuthorStats, Follow, Post
+
+
+def compute(user_id):
+    """Точные значения счётчиков пользователя."""
+    return {
+        'posts_count': Post.objects.filter(author_id=user_id).count(),
+        'followers_count': Follow.objects.filter(author_id=user_id).count(),
+        'following_count': Follow.objects.filter(user_id=user_id).count(),
+    }
+
+
+def author_stats(user):
+    """
+    Статистика пользователя. Если строки ещё нет (пользователь создан
+    в обход сигналов, например через bulk_create), она создаётся
+    с точными значениями.
+    """
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        user.stats, _ = AuthorStats.objects.get_or_create(
+            user_id=user.pk, defaults=compute(user.pk))
+        return user.stats
+
+
+def bump(user_id, field, delta):
+    """
+    Атомарно изменяет счётчик field на delta в транзакции вызывающего
+    кода: если сохранение поста или подписки откатится, откатится
+    и счётчик. Если строки статистики ещё нет, она создаётся
+    с точными значениями, которые уже учитывают изменение.
+    Уменьшение ниже нуля пропускается: такое расхождение исправит
+    reconcile_author_stats.
+    """
+    rows = AuthorStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        rows = rows.filter(**{f'{field}__gte': -delta})
+    updated = rows.update(**{field: F(field) + delta})
+    if not updated and delta > 0:
+        AuthorStats.objects.get_or_create(
+            user_id=user_id, defaults=compute(user_id))
+
+
+def _grouped(model, field, user_ids):
+    rows = model.objects.order_by().filter(
+        **{f'{field}__in': user_ids},
+    ).values(field).annotate(total=Count('pk'))
+    return {row[field]: row['total'] for row in rows}
+
+
+def reconcile(user_ids):
+    """Пересчитывает счётчики пачки пользователей тремя групповыми
+    запросами и возвращает количество исправленных строк."""
+    posts = _grouped(Post, 'author_id', user_ids)
+    followers = _grouped(Follow, 'author_id', user_ids)
+    following = _grouped(Follow, 'user_id', user_ids)
+    stats = AuthorStats.objects.in_bulk(user_ids)
+    fixed = 0
+    for user_id in user_ids:
+        actual = {
+            'posts_count': posts.get(user_id, 0),
+            'followers_count': followers.get(user_id, 0),
+            'following_count': following.get(user_id, 0),
+        }
+        current = stats.get(user_id)
+        if current is None:
+            AuthorStats.objects.create(user_id=user_id, **actual)
+        elif any(getattr(current, field) != value
+                 for field, value in actual.items()):
+            AuthorStats.objects.filter(user_id=user_id).update(**actual)
+        else:
+            continue
+        fixed += 1
+    return fixed
@@ -0,0 +1,95 @@
+"""Хранилище изображений постов с адресацией по содержимому.
+
+Файл сохраняется под именем <каталог>/<xx>/<sha256><расширение>,
+поэтому одинаковые загрузки указывают на один файл, а sorl создаёт
+для него одни миниатюры. Копии, полученные из сохранённого файла
+(например, WebP из UPLOAD_IMAGE_VARIANTS), лежат под тем же адресом
+с другим расширением.
+
+Файлы, на которые не ссылается ни один пост, удаляются не при
+удалении поста, а командой warm_thumbnails, и только если они не
+менялись ORPHAN_MIN_AGE секунд. Загрузка уже существующего файла
+обновляет его время, поэтому файл доживёт до сохранения поста,
+который на него сошлётся.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+ADDRESS = re.compile(r'(?:^|/)([0-9a-f]{2})/\1[0-9a-f]{62}(?:\.\w+)?$')
+# Префикс временных файлов, которые пишутся до переноса на адрес.
+TEMP_PREFIX = '.upload-'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # Одинаковое имя означает одинаковое содержимое: суффиксы
+        # для уникальности не нужны.
+        return name
+
+    def _save(self, name, content):
+        """Пишет файл во временный в том же каталоге, по дороге
+        считая хеш, и переносит его на адрес. Если такой файл уже
+        есть, временный удаляется, а у файла обновляется время."""
+        directory = os.path.dirname(name)
+        os.makedirs(self.path(directory), exist_ok=True)
+        digest = hashlib.sha256()
+        descriptor, temporary = tempfile.mkstemp(
+            dir=self.path(directory), prefix=TEMP_PREFIX)
+        try:
+            with os.fdopen(descriptor, 'wb') as output:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    output.write(chunk)
+            if not ADDRESS.search(name):
+                address = digest.hexdigest()
+                name = os.path.join(
+                    directory, address[:2],
+                    address + os.path.splitext(name)[1].lower(),
+                ).replace(os.sep, '/')
+            if self.touch(name):
+                os.remove(temporary)
+                return name
+            os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary, self.file_permissions_mode)
+            os.replace(temporary, self.path(name))
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return name
+
+    def touch(self, name):
+        """Обновляет время изменения файла; False, если файла нет."""
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def collect(self, name, before):
+        """
+        Удаляет файл без ссылок, если он не менялся после before,
+        и возвращает True. Загрузка того же содержимого могла обновить
+        время файла уже после проверки, поэтому файл сначала
+        переносится во временный и проверяется ещё раз: обновлённый
+        возвращается на место, а загрузка, пришедшая после переноса,
+        не найдёт файла и запишет его заново.
+        """
+        directory, filename = os.path.split(name)
+        trash = os.path.join(directory, TEMP_PREFIX + filename)
+        try:
+            os.rename(self.path(name), self.path(trash))
+        except FileNotFoundError:
+            return False
+        if self.get_modified_time(trash) >= before:
+            os.replace(self.path(trash), self.path(name))
+            return False
+        self.delete(trash)
+        return True
@@ -0,0 +1,76 @@
+import logging
+
+from django import template
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+from sorl.thumbnail import get_thumbnail
+
+from ..constants import CARD_SIZES
+from .. import thumbnails
+from ..thumbnails import MODERN_FORMATS, card_geometries
+
+logger = logging.getLogger(__name__)
+register = template.Library()
+# Изображения постов страницы, метаданные миниатюр которых ещё
+# не загружены.
+PENDING = '_thumbnails_pending'
+
+
+def srcset(image, format_name=None):
+    thumbnails = [
+        get_thumbnail(image, geometry, **options)
+        for _, geometry, options in card_geometries(format_name)
+    ]
+    return thumbnails[-1], ', '.join(
+        f'{thumbnail.url} {thumbnail.width}w' for thumbnail in thumbnails)
+
+
+@register.simple_tag(takes_context=True)
+def prefetch_thumbnails(context, posts):
+    """
+    Запоминает изображения постов страницы, чтобы первая
+    responsive_image загрузила метаданные всех их миниатюр
+    одним обращением. Если все карточки взяты из кэша шаблонов,
+    обращений нет вовсе.
+    """
+    context[PENDING] = [post.image for post in posts
+                        if post.image and post.thumbnails_ready]
+    return ''
+
+
+@register.simple_tag(takes_context=True)
+def responsive_image(context, image, css_class='', lazy=True):
+    """
+    Миниатюры карточки поста всех ширин CARD_WIDTHS в srcset
+    и, если Pillow их поддерживает, в современных форматах через
+    <picture>. Размеры указываются явно, чтобы страница не прыгала
+    при загрузке; lazy=False - для картинки на первом экране.
+    """
+    if not image:
+        return ''
+    try:
+        pending = context.get(PENDING) or []
+        thumbnails.prefetch([image, *pending])
+        pending.clear()
+        largest, candidates = srcset(image)
+        sources = [(mime, srcset(image, format_name)[1])
+                   for format_name, mime in MODERN_FORMATS]
+    except Exception:
+        logger.exception('Не удалось получить миниатюры %s', image)
+        return format_html('<img class="{}" src="{}" alt="">',
+                           css_class, image.url)
+    img = format_html(
+        '<img class="{}" src="{}" srcset="{}" sizes="{}" width="{}" '
+        'height="{}"{} alt="">',
+        css_class, largest.url, candidates, CARD_SIZES, largest.width,
+        largest.height, mark_safe(' loading="lazy"') if lazy else '',
+    )
+    if not sources:
+        return img
+    return format_html(
+        '<picture>{}{}</picture>',
+        format_html_join(
+            '', '<source type="{}" srcset="{}" sizes="{}">',
+            ((mime, candidates, CARD_SIZES) for mime, candidates in sources)),
+        img,
+    )
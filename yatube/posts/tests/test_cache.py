@@ -0,0 +1,135 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Group, Post, User
+
+
+class PageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.author,
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_anonymous_pages_served_from_cache(self):
+        """Повторный анонимный запрос страницы не обращается к базе."""
+        addresses = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+        )
+        for address in addresses:
+            with self.subTest(address=address):
+                first = self.client.get(address)
+                with self.assertNumQueries(0):
+                    second = self.client.get(address)
+                self.assertEqual(first.content, second.content)
+
+    def test_pages_cached_per_page_number(self):
+        """Разные страницы пагинации кэшируются отдельно."""
+        address = reverse('posts:index')
+        self.client.get(address)
+        response = self.client.get(address + '?page=2')
+        self.assertIsNotNone(response.context)
+
+    def test_authenticated_pages_not_cached(self):
+        """Страницы авторизованных пользователей не кэшируются."""
+        address = reverse('posts:group_list', args=(self.group.slug,))
+        self.reader_client.get(address)
+        response = self.reader_client.get(address)
+        self.assertIsNotNone(response.context)
+
+    def test_new_post_invalidates_pages(self):
+        """Новый пост сразу появляется в закэшированных лентах."""
+        addresses = (
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+        )
+        for address in addresses:
+            self.client.get(address)
+        Post.objects.create(
+            text='Свежий пост', author=self.author, group=self.group)
+        for address in addresses:
+            with self.subTest(address=address):
+                self.assertContains(self.client.get(address), 'Свежий пост')
+
+    def test_group_change_invalidates_previous_group(self):
+        """Перенос поста в другую группу обновляет обе страницы групп."""
+        address = reverse('posts:group_list', args=(self.group.slug,))
+        self.assertContains(self.client.get(address), self.post.text)
+        self.post.group = self.other_group
+        self.post.save()
+        self.assertNotContains(self.client.get(address), self.post.text)
+
+    def test_follow_invalidates_profile(self):
+        """Подписка обновляет счётчики в закэшированном профиле."""
+        address = reverse('posts:profile', args=(self.author.username,))
+        self.assertContains(self.client.get(address), 'Подписчиков: 0')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertContains(self.client.get(address), 'Подписчиков: 1')
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.author,
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_edit_bumps_card_version(self):
+        """Редактирование поста сбрасывает кэш его карточки."""
+        address = reverse('posts:group_list', args=(self.group.slug,))
+        self.assertContains(self.author_client.get(address), 'Тестовый текст')
+        self.author_client.post(
+            reverse('posts:post_edit', args=(self.post.pk,)),
+            data={'text': 'Исправленный текст', 'group': self.group.pk},
+        )
+        response = self.author_client.get(address)
+        self.assertContains(response, 'Исправленный текст')
+        self.assertNotContains(response, 'Тестовый текст')
+
+    def test_author_and_group_change_card(self):
+        """Новое имя автора и новый slug группы попадают в карточку."""
+        address = reverse('posts:profile', args=(self.author.username,))
+        self.author_client.get(address)
+        User.objects.filter(pk=self.author.pk).update(first_name='Лев')
+        Group.objects.filter(pk=self.group.pk).update(slug='new-slug')
+        response = self.author_client.get(address)
+        self.assertContains(response, 'Автор: Лев')
+        self.assertContains(
+            response, reverse('posts:group_list', args=('new-slug',)))
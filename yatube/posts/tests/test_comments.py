@@ -0,0 +1,159 @@
+import threading
+import time
+from unittest import mock
+
+from django.db import connection
+from django.test import Client, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.replicas import PIN_KEY
+
+from ..comments import WriteBuffer, write_comments
+from ..models import Comment, Post, User
+from ..search import find
+
+
+class AjaxCommentTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='Commenter', first_name='Иван', last_name='Петров')
+        cls.post = Post.objects.create(text='Тестовый текст', author=cls.user)
+
+    def setUp(self):
+        self.client = Client(HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.client.force_login(self.user)
+        self.address = reverse('posts:add_comment', args=(self.post.pk,))
+
+    def test_returns_fragment(self):
+        """Ответ содержит фрагмент комментария, комментарий
+        сохранён и попал в поиск."""
+        response = self.client.post(self.address, {'text': 'Пингвины'})
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        comment = Comment.objects.get()
+        self.assertEqual(data['id'], comment.pk)
+        self.assertEqual(comment.author, self.user)
+        self.assertIn('Пингвины', data['html'])
+        self.assertIn('Иван Петров', data['html'])
+        self.assertEqual(list(find('пингвины')), [self.post.pk])
+
+    def test_invalid_form(self):
+        response = self.client.post(self.address, {'text': ''})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('text', response.json()['errors'])
+        self.assertFalse(Comment.objects.exists())
+
+    def test_missing_post(self):
+        response = self.client.post(
+            reverse('posts:add_comment', args=(self.post.pk + 1,)),
+            {'text': 'Комментарий'})
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_batch_write(self):
+        """Пачка пишется одной вставкой, каждый комментарий
+        получает свой id, комментарий к удалённому посту - нет."""
+        comments = [
+            Comment(post=self.post, author=self.user, text=f'Текст {i}')
+            for i in range(3)
+        ]
+        missing = Comment(
+            post_id=self.post.pk + 1, author=self.user, text='Потерян')
+        with CaptureQueriesContext(connection) as queries:
+            write_comments(comments[:2] + [missing] + comments[2:])
+        inserts = [query for query in queries.captured_queries
+                   if query['sql'].startswith('INSERT INTO "posts_comment"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertIsNone(missing.pk)
+        for comment in comments:
+            self.assertEqual(Comment.objects.get(pk=comment.pk).text,
+                             comment.text)
+
+    def test_row_by_row_without_returning(self):
+        """Без RETURNING и вне SQLite комментарии пишутся по одному."""
+        comments = [
+            Comment(post=self.post, author=self.user, text=f'Слон {i}')
+            for i in range(2)
+        ]
+        with mock.patch.object(connection, 'vendor', 'other'), \
+                CaptureQueriesContext(connection) as queries:
+            write_comments(comments)
+        inserts = [query for query in queries.captured_queries
+                   if query['sql'].startswith('INSERT INTO "posts_comment"')]
+        self.assertEqual(len(inserts), 2)
+        self.assertEqual([Comment.objects.get(pk=comment.pk).text
+                          for comment in comments], ['Слон 0', 'Слон 1'])
+
+    def test_comment_pins_session(self):
+        """Сессия закрепляется за основной базой, даже если пачку
+        записал другой поток."""
+        with mock.patch('posts.comments.buffer.add'):
+            self.client.post(self.address, {'text': 'Комментарий'})
+        self.assertIn(PIN_KEY, self.client.session)
+
+
+class WriteBufferTest(SimpleTestCase):
+    def add_concurrently(self, buffer, items):
+        errors = []
+
+        def add(item):
+            try:
+                buffer.add(item)
+            except ValueError as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=add, args=(item,))
+                   for item in items]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    def test_groups_writes(self):
+        """Одновременные записи уходят одной пачкой, заполненная
+        пачка пишется, не дожидаясь конца окна."""
+        batches = []
+        buffer = WriteBuffer(batches.append, window=10, max_size=4)
+        self.add_concurrently(buffer, range(4))
+        self.assertEqual([sorted(batch) for batch in batches],
+                         [[0, 1, 2, 3]])
+
+    def test_window(self):
+        batches = []
+        buffer = WriteBuffer(batches.append, window=0.01)
+        buffer.add(1)
+        buffer.add(2)
+        self.assertEqual(batches, [[1], [2]])
+
+    def test_groups_requests_during_write(self):
+        """При нулевом окне запросы, пришедшие во время записи,
+        уходят следующей пачкой вместе."""
+        batches = []
+
+        def write(items):
+            batches.append(list(items))
+            time.sleep(0.05)
+
+        buffer = WriteBuffer(write, window=0)
+        threads = []
+        for item in range(20):
+            threads.append(threading.Thread(target=buffer.add, args=(item,)))
+            threads[-1].start()
+            time.sleep(0.005)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(sum(batches, [])), list(range(20)))
+        self.assertLess(len(batches), 20)
+        self.assertGreater(max(map(len, batches)), 1)
+
+    def test_error_reaches_every_request(self):
+        def write(items):
+            raise ValueError('Ошибка записи')
+
+        buffer = WriteBuffer(write, window=10, max_size=3)
+        errors = self.add_concurrently(buffer, range(3))
+        self.assertEqual(len(errors), 3)
@@ -0,0 +1,114 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.author,
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.addresses = (
+            reverse('posts:post_detail', args=(self.post.pk,)),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+        )
+
+    def revalidate(self, client, address):
+        etag = client.get(address)['ETag']
+        return client.get(address, HTTP_IF_NONE_MATCH=etag)
+
+    def test_not_modified(self):
+        """Повторный запрос с ETag получает 304. Даты изменения
+        у страниц нет: она не учитывает удаления и подписки."""
+        for address in self.addresses:
+            with self.subTest(address=address):
+                response = self.client.get(address)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn('Last-Modified', response)
+                self.assertEqual(self.client.get(
+                    address, HTTP_IF_NONE_MATCH=response['ETag'],
+                ).status_code, 304)
+                self.assertEqual(self.client.get(
+                    address,
+                    HTTP_IF_MODIFIED_SINCE='Sun, 17 Oct 2100 00:00:00 GMT',
+                ).status_code, 200)
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    def test_deleted_post_changes_group_version(self):
+        """Удаление самого нового поста группы меняет её версию."""
+        address = self.addresses[1]
+        Post.objects.create(
+            text='Новый пост', author=self.author, group=self.group)
+        etag = self.client.get(address)['ETag']
+        Post.objects.filter(text='Новый пост').delete()
+        self.assertEqual(self.client.get(
+            address, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    def test_not_modified_without_rendering(self):
+        """Ответ 304 не выполняет запросов страницы и рендера."""
+        address = self.addresses[0]
+        etag = self.client.get(address)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(response.content)
+
+    def test_changes_give_new_version(self):
+        """Комментарий, правка и перенос поста меняют версию страниц."""
+        detail, group, profile = self.addresses
+        changes = (
+            (lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий'),
+             (detail,)),
+            (lambda: Comment.objects.filter(post=self.post).delete(),
+             (detail,)),
+            (lambda: self.post.save(), self.addresses),
+            (lambda: Post.objects.filter(pk=self.post.pk).update(group=None),
+             (group,)),
+        )
+        for change, changed in changes:
+            etags = {address: self.client.get(address)['ETag']
+                     for address in changed}
+            change()
+            cache.clear()
+            for address, etag in etags.items():
+                with self.subTest(address=address):
+                    response = self.client.get(
+                        address, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code, 200)
+
+    def test_viewer_in_version(self):
+        """Версия страницы своя у каждого зрителя и меняется
+        при подписке на автора."""
+        address = self.addresses[2]
+        anonymous = self.client.get(address)['ETag']
+        response = self.reader_client.get(
+            address, HTTP_IF_NONE_MATCH=anonymous)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.reader_client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.revalidate(self.reader_client, address).status_code, 304)
@@ -0,0 +1,107 @@
+from unittest import mock
+from xml.dom import minidom
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Group, Post, User
+
+
+class FeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create([
+            Post(text=f'Тестовый текст {i} <b>', author=cls.author,
+                 group=cls.group)
+            for i in range(5)
+        ])
+        cls.post = Post.objects.create(
+            text='Последний пост', author=cls.author, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.addresses = {
+            reverse('posts:index_feed'): 'entry',
+            reverse('posts:index_rss'): 'item',
+            reverse('posts:group_feed', args=(self.group.slug,)): 'entry',
+            reverse('posts:group_rss', args=(self.group.slug,)): 'item',
+            reverse('posts:profile_feed', args=('Author',)): 'entry',
+            reverse('posts:profile_rss', args=('Author',)): 'item',
+        }
+
+    def read(self, address, **headers):
+        response = self.client.get(address, **headers)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_feeds(self):
+        """Ленты - корректный XML со всеми постами, новые первыми."""
+        for address, tag in self.addresses.items():
+            with self.subTest(address=address):
+                _, body = self.read(address)
+                items = minidom.parseString(body).getElementsByTagName(tag)
+                self.assertEqual(len(items), 6)
+                self.assertIn('Последний пост', items[0].toxml())
+
+    def test_missing_group_or_author(self):
+        for address in (
+            reverse('posts:group_feed', args=('missing',)),
+            reverse('posts:profile_rss', args=('missing',)),
+        ):
+            with self.subTest(address=address):
+                self.assertEqual(self.client.get(address).status_code, 404)
+
+    def test_chunked_iteration(self):
+        """Посты читаются порциями, лента собирается по частям."""
+        address = reverse('posts:index_feed')
+        with mock.patch('posts.feeds.FEED_CHUNK_SIZE', 2):
+            response = self.client.get(address)
+            chunks = list(response.streaming_content)
+        # Заголовок, три порции постов и окончание.
+        self.assertEqual(len(chunks), 5)
+
+    def test_cached_feed(self):
+        """Повторная лента читается из кэша, 304 - без запросов."""
+        address = reverse('posts:group_feed', args=(self.group.slug,))
+        first, body = self.read(address)
+        with self.assertNumQueries(0):
+            second, cached = self.read(address)
+            not_modified = self.client.get(
+                address, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(body, cached)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertIn('Last-Modified', second)
+
+    def test_evicted_chunk_restored(self):
+        """Вытесненная из кэша порция читается из базы заново."""
+        address = reverse('posts:index_rss')
+        get = cache.get
+
+        def evicted(key, *args, **kwargs):
+            return None if key.endswith(':2') else get(key, *args, **kwargs)
+
+        with mock.patch('posts.feeds.FEED_CHUNK_SIZE', 2):
+            _, body = self.read(address)
+            with mock.patch.object(cache, 'get', evicted), \
+                    self.assertNumQueries(1):
+                _, restored = self.read(address)
+        self.assertEqual(body, restored)
+
+    def test_edit_invalidates_feed(self):
+        """Правка поста сбрасывает закэшированную ленту и её ETag."""
+        address = reverse('posts:profile_feed', args=('Author',))
+        response, _ = self.read(address)
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        response, body = self.read(
+            address, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Исправленный пост', body.decode())
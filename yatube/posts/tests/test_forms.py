@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -91,7 +92,10 @@ class PostFormTests(TestCase):
         self.assertEqual(created_post.text, form_data['text'])
         self.assertEqual(created_post.group.slug, self.group.slug)
         self.assertEqual(created_post.author.id, self.user.id)
-        self.assertEqual(created_post.image.name, f'posts/{uploaded.name}')
+        # Файл хранится под хешем содержимого.
+        address = hashlib.sha256(image).hexdigest()
+        self.assertEqual(created_post.image.name,
+                         f'posts/{address[:2]}/{address}.jpg')
 
     def test_author_user_edit_post(self):
         """Проверка изменения поста при его редактировании автором."""
@@ -0,0 +1,109 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.kvstores import cached_db_kvstore
+
+from .. import thumbnails
+from ..kvstore import LRU, thumbnail_file
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+POSTS = 3
+
+
+def make_image(number):
+    buffer = BytesIO()
+    Image.new('RGB', (200, 100), (number, 120, 200)).save(buffer, 'JPEG')
+    return SimpleUploadedFile(
+        name=f'image_{number}.jpg', content=buffer.getvalue(),
+        content_type='image/jpeg')
+
+
+class LRUTest(TestCase):
+    def test_least_recent_evicted(self):
+        lru = LRU(max_size=2, timeout=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual(len(lru), 2)
+        self.assertEqual((lru.get('a'), lru.get('b'), lru.get('c')),
+                         (1, None, 3))
+
+    def test_expired(self):
+        lru = LRU(max_size=2, timeout=60)
+        lru.set('a', 1)
+        with mock.patch('posts.kvstore.time.monotonic',
+                        return_value=float('inf')):
+            self.assertIsNone(lru.get('a'))
+        self.assertEqual(len(lru), 0)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BatchedKVStoreTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        default.kvstore.lru.clear()
+        for number in range(POSTS):
+            post = Post.objects.create(text=f'Пост {number}',
+                                       author=self.author,
+                                       image=make_image(number))
+            thumbnails.generate(post.image)
+        Post.objects.update(thumbnails_ready=True)
+        cache.clear()
+        default.kvstore.lru.clear()
+
+    def test_thumbnail_file_name(self):
+        """Имя миниатюры совпадает с тем, что создаёт sorl."""
+        image = Post.objects.first().image
+        for geometry, options in thumbnails.THUMBNAIL_GEOMETRIES:
+            with self.subTest(geometry=geometry, options=options):
+                self.assertEqual(
+                    thumbnail_file(image, geometry, **options).name,
+                    get_thumbnail(image, geometry, **options).name)
+
+    def test_page_single_lookup(self):
+        """Метаданные миниатюр всех постов страницы загружаются одним
+        get_many из кэша и одним запросом к базе, а повторно берутся
+        из LRU."""
+        url = reverse('posts:profile', args=(self.author.username,))
+        with mock.patch.object(
+                cached_db_kvstore.KVStore, '_get_raw') as get_raw, \
+                mock.patch.object(
+                    default.kvstore.cache, 'get_many',
+                    wraps=default.kvstore.cache.get_many) as get_many, \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertContains(response, 'srcset=', count=POSTS)
+        lookups = [query for query in queries
+                   if 'thumbnail_kvstore' in query['sql']]
+        self.assertEqual(len(lookups), 1)
+        self.assertEqual(get_many.call_count, 1)
+        get_raw.assert_not_called()
+
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse([query for query in queries
+                          if 'thumbnail_kvstore' in query['sql']])
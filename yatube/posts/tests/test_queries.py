@@ -0,0 +1,84 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class QueryCountTest(TestCase):
+    """Количество запросов страниц не зависит от объёма данных."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.author,
+            group=cls.group,
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def add_comments(self, amount):
+        start = Comment.objects.count()
+        for i in range(start, start + amount):
+            commenter = User.objects.create_user(username=f'Commenter{i}')
+            Comment.objects.create(
+                post=self.post, author=commenter, text=f'Комментарий {i}')
+
+    def add_posts(self, amount):
+        for i in range(amount):
+            group = Group.objects.create(
+                title=f'Группа {i}', slug=f'group-{i}', description='-')
+            Post.objects.create(
+                text=f'Тестовый текст {i}', author=self.author, group=group)
+
+    def count_queries(self, client, address):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            client.get(address)
+        return len(queries)
+
+    def test_post_detail_constant_queries(self):
+        """Страница поста: число запросов не растёт с комментариями."""
+        address = reverse('posts:post_detail', args=(self.post.pk,))
+        self.add_comments(1)
+        with self.assertNumQueries(2):
+            self.client.get(address)
+        self.add_comments(30)
+        with self.assertNumQueries(2):
+            response = self.client.get(address)
+        self.assertEqual(len(response.context['comments']), 31)
+
+    def test_feeds_constant_queries(self):
+        """Ленты: число запросов не растёт с количеством постов."""
+        addresses = {
+            reverse('posts:index'): self.client,
+            reverse('posts:group_list', args=(self.group.slug,)):
+            self.client,
+            reverse('posts:profile', args=(self.author.username,)):
+            self.client,
+            reverse('posts:follow_index'): self.reader_client,
+        }
+        before = {
+            address: self.count_queries(client, address)
+            for address, client in addresses.items()
+        }
+        self.add_posts(15)
+        for address, client in addresses.items():
+            with self.subTest(address=address):
+                self.assertEqual(
+                    self.count_queries(client, address), before[address])
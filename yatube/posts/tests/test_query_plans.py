@@ -0,0 +1,130 @@
+import re
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+# Просмотр подзапроса (COUNT по объединению частей ленты) читает
+# только его строки, таблицы в нём проверяются отдельными шагами.
+FULL_SCAN = re.compile(
+    r'^SCAN (?:TABLE )?(?!subquery)(\w+)(?!\w| USING| VIRTUAL)')
+TEMP_SORT = 'USE TEMP B-TREE'
+# Форма поста выводит все группы, полный просмотр здесь ожидаем.
+FULL_SCAN_ALLOWED = {Group._meta.db_table}
+
+
+def query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class QueryPlanTest(TestCase):
+    """Запросы страниц posts читаются по индексам: без полного
+    просмотра таблиц и без сортировки во временном B-дереве."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.author,
+            group=cls.group,
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        # Подписчик популярного автора читает ленту подписок
+        # смешанным запросом: из ленты и не разложенные посты.
+        cls.celebrity = User.objects.create_user(username='Celebrity')
+        cls.fan = User.objects.create_user(username='Fan')
+        Follow.objects.create(user=cls.fan, author=cls.author)
+        Follow.objects.create(user=cls.fan, author=cls.celebrity)
+        Post.objects.create(
+            text='Пост популярного автора', author=cls.celebrity)
+        Post.objects.filter(author=cls.celebrity).update(fanned_out=False)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.fan_client = Client()
+        self.fan_client.force_login(self.fan)
+
+    def problems(self, sql):
+        plan = query_plan(sql)
+        found = [step for step in plan if TEMP_SORT in step]
+        for step in plan:
+            match = FULL_SCAN.match(step)
+            if match and match.group(1) not in FULL_SCAN_ALLOWED:
+                found.append(step)
+        return found
+
+    def assert_indexed(self, client, address):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(address)
+            if response.streaming:
+                # Ленты Atom и RSS читают посты во время отдачи.
+                b''.join(response.streaming_content)
+        selects = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+        ]
+        self.assertTrue(selects)
+        for sql in selects:
+            with self.subTest(address=address, sql=sql):
+                self.assertEqual(self.problems(sql), [])
+
+    def test_pages_use_indexes(self):
+        author = self.author.username
+        addresses = (
+            (self.client, reverse('posts:index')),
+            (self.client, reverse('posts:index') + '?page=2'),
+            (self.client, reverse('posts:group_list',
+                                  args=(self.group.slug,))),
+            (self.client, reverse('posts:profile', args=(author,))),
+            (self.reader_client, reverse('posts:profile', args=(author,))),
+            (self.client, reverse('posts:post_detail', args=(self.post.pk,))),
+            (self.client, reverse('posts:post_create')),
+            (self.client, reverse('posts:post_edit', args=(self.post.pk,))),
+            (self.reader_client, reverse('posts:follow_index')),
+            (self.fan_client, reverse('posts:follow_index')),
+            (self.client, reverse('posts:search') + '?q=текст'),
+            (self.client, reverse('posts:index_feed')),
+            (self.client, reverse('posts:index_rss')),
+            (self.client, reverse('posts:group_feed',
+                                  args=(self.group.slug,))),
+            (self.client, reverse('posts:group_rss',
+                                  args=(self.group.slug,))),
+            (self.client, reverse('posts:profile_feed', args=(author,))),
+            (self.client, reverse('posts:profile_rss', args=(author,))),
+            (self.reader_client, reverse('posts:profile_follow',
+                                         args=(author,))),
+            (self.reader_client, reverse('posts:profile_unfollow',
+                                         args=(author,))),
+        )
+        for client, address in addresses:
+            self.assert_indexed(client, address)
+
+    def test_detector(self):
+        """Проверка сама замечает полный просмотр и сортировку."""
+        table = Post._meta.db_table
+        self.assertTrue(self.problems(
+            f'SELECT * FROM {table} WHERE text = \'x\''))
+        self.assertTrue(self.problems(
+            f'SELECT * FROM {table} WHERE author_id = 1 ORDER BY text'))
@@ -0,0 +1,96 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import search
+from ..constants import POSTS_AMOUNT
+from ..models import Comment, Post, User
+
+
+class SearchTestMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.post = Post.objects.create(
+            text='Красивые котики гуляли по крыше',
+            author=cls.author,
+        )
+        cls.commented = Post.objects.create(
+            text='Обычный пост без ключевых слов',
+            author=cls.author,
+        )
+        cls.comment = Comment.objects.create(
+            post=cls.commented,
+            author=cls.author,
+            text='Под постом тоже есть котик',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_finds_word_forms(self):
+        """Поиск находит пост по другой форме слов."""
+        self.assertEqual(search.find('красивый кот'), [])
+        self.assertEqual(search.find('красивого котика'), [self.post.pk])
+
+    def test_post_text_ranked_above_comment(self):
+        """Совпадение в тексте поста важнее совпадения в комментарии."""
+        self.assertEqual(
+            search.find('котики'), [self.post.pk, self.commented.pk])
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при правке и удалении."""
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Собаки спят'
+        post.save()
+        self.assertEqual(search.find('собака'), [post.pk])
+        Comment.objects.get(pk=self.comment.pk).delete()
+        self.assertEqual(search.find('котик'), [])
+
+    def test_rebuild(self):
+        """Перестроенный индекс даёт те же результаты."""
+        self.assertEqual(search.rebuild(), 3)
+        self.assertEqual(
+            search.find('котики'), [self.post.pk, self.commented.pk])
+
+    def test_search_page(self):
+        """Страница поиска показывает найденные посты и сохраняет
+        запрос в ссылках пагинации."""
+        Post.objects.bulk_create(
+            Post(text=f'Котики {i}', author=self.author)
+            for i in range(POSTS_AMOUNT)
+        )
+        search.rebuild()
+        response = self.client.get(reverse('posts:search'), {'q': 'котик'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, POSTS_AMOUNT + 2)
+        self.assertEqual(len(page_obj.object_list), POSTS_AMOUNT)
+        self.assertContains(response, '?q={}&amp;page=2'.format(
+            response.request['QUERY_STRING'].split('=')[1]))
+
+    def test_empty_query(self):
+        """Пустой запрос ничего не находит."""
+        response = self.client.get(reverse('posts:search'))
+        self.assertEqual(response.context['page_obj'].paginator.count, 0)
+
+
+@override_settings(SEARCH_BACKEND='fts5')
+class FTS5SearchTest(SearchTestMixin, TestCase):
+    pass
+
+
+@override_settings(SEARCH_BACKEND='inverted')
+class InvertedSearchTest(SearchTestMixin, TestCase):
+    pass
+
+
+@override_settings(SEARCH_BACKEND='auto')
+class AutoSearchTest(TestCase):
+    def test_fts5_table_checked_once(self):
+        """Наличие таблицы FTS5 проверяется один раз на базу."""
+        search.forget_tables()
+        self.assertTrue(search.fts5_available())
+        with self.assertNumQueries(0):
+            self.assertTrue(search.fts5_available())
+            self.assertIsInstance(search.get_index(), search.FTS5Index)
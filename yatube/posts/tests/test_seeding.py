@@ -0,0 +1,65 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.db.models import Count
+from django.test import TestCase, override_settings
+
+from ..models import AuthorStats, Comment, Follow, Post, TimelineEntry
+from ..seeding import seed
+from ..timeline import follow_feed
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_distributions(self):
+        """Данные создаются с перекосом по авторам и комментариям,
+        производные счётчики и ленты согласованы."""
+        created = seed(users=40, posts=300, groups=5, follows=5,
+                       hot_posts=2, hot_comments=50, comments=2, images=2)
+        self.assertEqual(created['posts'], Post.objects.count())
+        self.assertEqual(created['comments'], Comment.objects.count())
+        self.assertEqual(created['follows'], Follow.objects.count())
+
+        authors = list(Post.objects.values('author').annotate(
+            total=Count('pk')).order_by('-total').values_list(
+            'total', flat=True))
+        self.assertGreater(authors[0], 5 * authors[len(authors) // 2])
+        hottest = Post.objects.annotate(total=Count('comments')).order_by(
+            '-total').values_list('total', flat=True)[:3]
+        self.assertGreaterEqual(hottest[1], 50)
+        self.assertLess(hottest[2], 50)
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        self.assertGreater(
+            len(set(Post.objects.values_list('pub_date', flat=True))), 290)
+
+        stats = AuthorStats.objects.order_by('-posts_count').first()
+        self.assertEqual(stats.posts_count, authors[0])
+        self.assertTrue(TimelineEntry.objects.exists())
+
+    def test_repeated_seed(self):
+        """Повторный запуск дополняет базу без конфликтов."""
+        seed(users=5, posts=10, groups=2, follows=1, images=0)
+        created = seed(users=5, posts=10, groups=2, follows=1, images=0)
+        self.assertEqual(created['users'], 5)
+        self.assertEqual(Post.objects.count(), 20)
+
+    def test_celebrity_posts_in_feeds(self):
+        """Посты популярных авторов не раскладываются по лентам,
+        но попадают в ленты подписчиков."""
+        with mock.patch('posts.timeline.TIMELINE_FANOUT_LIMIT', 3):
+            seed(users=20, posts=60, groups=2, follows=5, images=0)
+            post = Post.objects.filter(
+                author__stats__followers_count__gte=3).first()
+            self.assertFalse(post.fanned_out)
+            self.assertFalse(
+                TimelineEntry.objects.filter(post=post).exists())
+            follow = Follow.objects.filter(author=post.author).first()
+            self.assertIn(post, follow_feed(follow.user))
@@ -0,0 +1,94 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import AuthorStats, Follow, Post, User
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+
+    def setUp(self):
+        cache.clear()
+
+    def get_stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_counters_follow_posts_and_subscriptions(self):
+        """Счётчики меняются при создании и удалении постов и подписок."""
+        post = Post.objects.create(text='Тестовый текст', author=self.author)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.get_stats(self.author).posts_count, 1)
+        self.assertEqual(self.get_stats(self.author).followers_count, 1)
+        self.assertEqual(self.get_stats(self.reader).following_count, 1)
+        post.delete()
+        follow.delete()
+        stats = self.get_stats(self.author)
+        self.assertEqual(stats.posts_count, 0)
+        self.assertEqual(stats.followers_count, 0)
+        self.assertEqual(self.get_stats(self.reader).following_count, 0)
+
+    def test_profile_card_without_count_queries(self):
+        """Карточка автора на странице поста не выполняет
+        агрегирующих запросов."""
+        Post.objects.create(text='Тестовый текст', author=self.author)
+        post = Post.objects.create(text='Тестовый текст', author=self.author)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('posts:post_detail', args=(post.pk,)))
+        self.assertContains(response, 'Всего постов: 2')
+        self.assertFalse(any('COUNT' in query['sql'] for query in queries))
+
+    def test_pages_without_stats_row(self):
+        """Профиль и страница поста открываются и у пользователя
+        без строки статистики: она создаётся с точными значениями."""
+        post = Post.objects.create(text='Тестовый текст', author=self.author)
+        urls = (
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:post_detail', args=(post.pk,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                AuthorStats.objects.filter(user=self.author).delete()
+                cache.clear()
+                response = self.client.get(url)
+                self.assertContains(response, 'Всего постов: 1')
+        self.assertEqual(self.get_stats(self.author).posts_count, 1)
+
+    def test_reconcile_fixes_drift(self):
+        """Команда reconcile_author_stats исправляет расхождения."""
+        Post.objects.bulk_create([
+            Post(text='Тестовый текст', author=self.author)
+            for _ in range(3)
+        ])
+        AuthorStats.objects.filter(user=self.reader).delete()
+        out = StringIO()
+        call_command('reconcile_author_stats', stdout=out)
+        self.assertIn('исправлено: 2', out.getvalue())
+        self.assertEqual(self.get_stats(self.author).posts_count, 3)
+        self.assertTrue(
+            AuthorStats.objects.filter(user=self.reader).exists())
+
+
+class AuthorStatsTransactionTest(TransactionTestCase):
+    def test_counters_roll_back_with_save(self):
+        """Ошибка в обработчике post_save откатывает и пост,
+        и счётчик."""
+        author = User.objects.create_user(username='Author')
+        with mock.patch('posts.signals.timeline.fan_out',
+                        side_effect=RuntimeError), \
+                self.assertRaises(RuntimeError):
+            Post.objects.create(text='Тестовый текст', author=author)
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(
+            AuthorStats.objects.get(user=author).posts_count, 0)
@@ -0,0 +1,139 @@
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from sorl.thumbnail import default
+
+from .. import thumbnails
+from ..constants import ORPHAN_MIN_AGE
+from ..models import Post, ThumbnailJob, User
+from ..storage import ADDRESS
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def image_bytes(color):
+    buffer = BytesIO()
+    Image.new('RGB', (200, 100), color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def upload(color, name='image.jpg'):
+    return SimpleUploadedFile(name=name, content=image_bytes(color))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTest(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        default.kvstore.lru.clear()
+        self.author = User.objects.create_user(username='Author')
+        self.storage = Post._meta.get_field('image').storage
+
+    def create(self, image):
+        return Post.objects.create(
+            text='Пост с картинкой', author=self.author, image=image)
+
+    def test_same_content_shared(self):
+        """Одинаковые загрузки под разными именами - один файл."""
+        first = self.create(upload((1, 2, 3), 'first.jpg'))
+        second = self.create(upload((1, 2, 3), 'second.JPG'))
+        other = self.create(upload((200, 0, 0), 'first.jpg'))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, other.image.name)
+        self.assertRegex(first.image.name, ADDRESS)
+        directory = first.image.name.rsplit('/', 1)[0]
+        self.assertEqual(len(self.storage.listdir(directory)[1]), 1)
+
+    def test_shared_thumbnails(self):
+        """Второй пост с той же картинкой не ставит задачу миниатюр."""
+        first = self.create(upload((1, 2, 3)))
+        call_command('thumbnail_worker', once=True, stdout=StringIO())
+        second = self.create(upload((1, 2, 3)))
+        self.assertTrue(second.thumbnails_ready)
+        self.assertTrue(Post.objects.get(pk=second.pk).thumbnails_ready)
+        self.assertFalse(ThumbnailJob.objects.filter(post=second).exists())
+        self.assertEqual(thumbnails.generate(first.image),
+                         thumbnails.generate(second.image))
+
+    def collect_garbage(self):
+        call_command('warm_thumbnails', workers=0, min_age=0,
+                     stdout=StringIO())
+
+    def test_released_with_last_reference(self):
+        """Файл и миниатюры удаляются сборкой мусора,
+        когда на них не ссылается ни один пост."""
+        first = self.create(upload((1, 2, 3)))
+        second = self.create(upload((1, 2, 3)))
+        name = first.image.name
+        variant = self.storage.save(
+            name[:-len('.jpg')] + '.webp', ContentFile(b'webp'))
+        names = thumbnails.generate(first.image)
+        first.delete()
+        self.collect_garbage()
+        self.assertTrue(self.storage.exists(name))
+        second.delete()
+        self.assertTrue(self.storage.exists(name))
+        self.collect_garbage()
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(self.storage.exists(variant))
+        for thumbnail in names:
+            self.assertFalse(self.storage.exists(thumbnail))
+
+    def test_replaced_image_released(self):
+        post = self.create(upload((1, 2, 3)))
+        old = post.image.name
+        post.image = upload((4, 5, 6))
+        post.save()
+        self.collect_garbage()
+        self.assertFalse(self.storage.exists(old))
+        self.assertTrue(self.storage.exists(post.image.name))
+
+    def test_reuploaded_file_not_collected(self):
+        """Файл, загруженный заново после удаления поста,
+        сборка мусора не удаляет."""
+        post = self.create(upload((1, 2, 3)))
+        name = post.image.name
+        stale = time.time() - 2 * ORPHAN_MIN_AGE
+        os.utime(self.storage.path(name), (stale, stale))
+        post.delete()
+        before = timezone.now() - timedelta(seconds=ORPHAN_MIN_AGE)
+        self.assertEqual(self.create(upload((1, 2, 3))).image.name, name)
+        self.assertFalse(self.storage.collect(name, before))
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.storage.listdir(name.rsplit('/', 1)[0])[1],
+                         [name.rsplit('/', 1)[1]])
+
+    def test_dedupe_media(self):
+        """Старые файлы со случайными суффиксами сводятся к одному."""
+        legacy = FileSystemStorage()
+        names = [legacy.save('posts/image.jpg', ContentFile(
+            image_bytes((1, 2, 3)))) for _ in range(3)]
+        Post.objects.bulk_create(
+            Post(text='Пост', author=self.author, image=name)
+            for name in names)
+        out = StringIO()
+        call_command('dedupe_media', stdout=out)
+        self.assertIn('Файлов: 3, уникальных: 1', out.getvalue())
+        addresses = set(Post.objects.values_list('image', flat=True))
+        self.assertEqual(len(addresses), 1)
+        self.assertRegex(addresses.pop(), ADDRESS)
+        for name in names:
+            self.assertFalse(legacy.exists(name))
@@ -0,0 +1,201 @@
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from sorl.thumbnail import default
+
+from .. import thumbnails
+from ..constants import CARD_WIDTHS, ORPHAN_MIN_AGE, THUMBNAIL_JOB_ATTEMPTS
+from ..models import Post, ThumbnailJob, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(name='image.jpg'):
+    buffer = BytesIO()
+    Image.new('RGB', (200, 100), (40, 120, 200)).save(buffer, 'JPEG')
+    return SimpleUploadedFile(
+        name=name, content=buffer.getvalue(), content_type='image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailJobTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        default.kvstore.lru.clear()
+        self.post = Post.objects.create(
+            text='Пост с картинкой', author=self.author, image=make_image())
+
+    def test_new_image_enqueues_job(self):
+        """Пост с картинкой ставит задачу, миниатюры ещё не готовы."""
+        self.assertFalse(self.post.thumbnails_ready)
+        self.assertEqual(
+            self.post.thumbnail_jobs.get().status, ThumbnailJob.PENDING)
+
+    def test_text_edit_keeps_thumbnails(self):
+        """Правка текста не создаёт новую задачу."""
+        thumbnails.process(self.post.thumbnail_jobs.get().pk)
+        self.post.refresh_from_db()
+        self.post.text = 'Новый текст'
+        self.post.save()
+        self.post.refresh_from_db()
+        self.assertTrue(self.post.thumbnails_ready)
+        self.assertEqual(self.post.thumbnail_jobs.count(), 1)
+
+    def test_job_claimed_once(self):
+        """Задачу выполняет только один исполнитель."""
+        job = self.post.thumbnail_jobs.get()
+        self.assertTrue(thumbnails.process(job.pk))
+        self.assertFalse(thumbnails.process(job.pk))
+
+    def test_failed_job_retried(self):
+        """Ошибка возвращает задачу в очередь до исчерпания попыток."""
+        job = self.post.thumbnail_jobs.get()
+        with mock.patch.object(
+                thumbnails, 'generate', side_effect=OSError('disk')):
+            for _ in range(THUMBNAIL_JOB_ATTEMPTS):
+                thumbnails.process(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ThumbnailJob.FAILED)
+        self.assertEqual(job.attempts, THUMBNAIL_JOB_ATTEMPTS)
+        self.assertEqual(job.error, 'disk')
+
+    def test_stale_job_requeued(self):
+        """Зависшая задача возвращается в очередь."""
+        ThumbnailJob.objects.update(
+            status=ThumbnailJob.RUNNING,
+            started=timezone.now() - timedelta(days=1),
+        )
+        self.assertEqual(thumbnails.requeue_stale(), 1)
+        self.assertEqual(thumbnails.pending(10), [
+            self.post.thumbnail_jobs.get().pk])
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailWorkerTest(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        default.kvstore.lru.clear()
+        self.author = User.objects.create_user(username='Author')
+        self.post = Post.objects.create(
+            text='Пост с картинкой', author=self.author, image=make_image())
+
+    def test_original_image_until_job_done(self):
+        """До выполнения задачи показывается оригинал, после - миниатюра."""
+        address = reverse('posts:post_detail', args=(self.post.pk,))
+        self.assertContains(self.client.get(address), self.post.image.url)
+        call_command('thumbnail_worker', once=True, stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertTrue(self.post.thumbnails_ready)
+        response = self.client.get(address)
+        self.assertNotContains(response, self.post.image.url)
+        self.assertContains(response, settings.MEDIA_URL + 'cache/')
+
+    def test_srcset(self):
+        """Миниатюры всех ширин в srcset с размерами; лениво
+        загружаются только картинки в лентах."""
+        call_command('thumbnail_worker', once=True, stdout=StringIO())
+        for address, lazy in (
+            (reverse('posts:index'), True),
+            (reverse('posts:post_detail', args=(self.post.pk,)), False),
+        ):
+            with self.subTest(address=address):
+                content = self.client.get(address).content.decode()
+                for width in CARD_WIDTHS:
+                    self.assertIn(f' {width}w', content)
+                self.assertIn(f'width="{CARD_WIDTHS[-1]}" height="339"',
+                              content)
+                self.assertEqual('loading="lazy"' in content, lazy)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class WarmThumbnailsTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # Одинаковые картинки разных тестов хранятся под одним именем,
+        # а записи sorl о миниатюрах удалённых файлов остаются в кэше
+        # и в LRU процесса.
+        cache.clear()
+        default.kvstore.lru.clear()
+        author = User.objects.create_user(username='Author')
+        self.post = Post.objects.create(
+            text='Пост с картинкой', author=author, image=make_image())
+        self.orphan = self.save_old('posts/orphan.jpg')
+        self.stale = self.save_old('cache/00/00/stale.jpg')
+
+    @staticmethod
+    def save_old(name):
+        """Файл, сохранённый раньше ORPHAN_MIN_AGE назад."""
+        name = default_storage.save(name, make_image())
+        modified = time.time() - 2 * ORPHAN_MIN_AGE
+        os.utime(default_storage.path(name), (modified, modified))
+        return name
+
+    def warm(self, **options):
+        out = StringIO()
+        call_command('warm_thumbnails', workers=0, stdout=out, **options)
+        return out.getvalue()
+
+    def test_dry_run_only_reports(self):
+        """Без удаления команда только перечисляет лишние файлы."""
+        output = self.warm(dry_run=True)
+        self.assertIn('Изображений: 1, создано миниатюр: '
+                      f'{len(thumbnails.THUMBNAIL_GEOMETRIES)}', output)
+        self.assertIn(self.orphan, output)
+        self.assertIn(self.stale, output)
+        self.assertTrue(default_storage.exists(self.orphan))
+
+    def test_orphans_deleted(self):
+        """Лишние оригиналы и миниатюры удаляются, нужные остаются."""
+        self.warm()
+        self.assertFalse(default_storage.exists(self.orphan))
+        self.assertFalse(default_storage.exists(self.stale))
+        self.assertTrue(default_storage.exists(self.post.image.name))
+        for thumbnail in thumbnails.generate(self.post.image):
+            self.assertTrue(default_storage.exists(thumbnail))
+        self.assertIn('создано миниатюр: 0', self.warm())
+
+    def test_recent_and_temporary_kept(self):
+        """Свежие файлы, пост которых ещё может сохраняться,
+        и временные файлы загрузки не удаляются."""
+        recent = default_storage.save('posts/recent.jpg', make_image())
+        temporary = self.save_old('posts/ab/.upload-x1y2z3')
+        self.warm()
+        self.assertFalse(default_storage.exists(self.orphan))
+        self.assertTrue(default_storage.exists(recent))
+        self.assertTrue(default_storage.exists(temporary))
+        self.warm(min_age=0)
+        self.assertFalse(default_storage.exists(recent))
+        self.assertTrue(default_storage.exists(temporary))
@@ -0,0 +1,103 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from ..models import Follow, Post, TimelineEntry, User
+from ..timeline import follow_feed
+from ..utils import KeysetPaginator
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.other = User.objects.create_user(username='Other')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_fanned_out_to_followers(self):
+        """Новый пост попадает в ленты всех подписчиков автора."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        post = Post.objects.create(text='Тестовый текст', author=self.author)
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(post=post).values_list(
+                'user', flat=True)),
+            {self.reader.pk, self.other.pk},
+        )
+        self.assertEqual(list(follow_feed(self.reader)), [post])
+
+    def test_follow_backfills_and_unfollow_trims(self):
+        """Подписка переносит старые посты автора, отписка их удаляет."""
+        posts = [
+            Post.objects.create(text=f'Тестовый текст {i}', author=self.author)
+            for i in range(3)
+        ]
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(set(follow_feed(self.reader)), set(posts))
+        follow.delete()
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists())
+        self.assertEqual(list(follow_feed(self.reader)), [])
+
+    def test_feed_does_not_join_follow(self):
+        """Лента читается из материализованной таблицы без Follow."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        sql = str(follow_feed(self.reader).query)
+        self.assertNotIn(Follow._meta.db_table, sql)
+
+    @mock.patch('posts.timeline.TIMELINE_FANOUT_LIMIT', 2)
+    def test_celebrity_posts_merged_on_read(self):
+        """Посты популярного автора не раскладываются,
+        но попадают в ленту при чтении."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.other)
+        celebrity_post = Post.objects.create(
+            text='Популярный пост', author=self.author)
+        regular_post = Post.objects.create(
+            text='Обычный пост', author=self.other)
+        self.assertFalse(
+            TimelineEntry.objects.filter(post=celebrity_post).exists())
+        self.assertEqual(
+            set(follow_feed(self.reader)), {celebrity_post, regular_post})
+        self.assertEqual(list(follow_feed(self.other)), [celebrity_post])
+
+    @mock.patch('posts.timeline.TIMELINE_FANOUT_LIMIT', 2)
+    def test_former_celebrity_posts_kept(self):
+        """Посты, опубликованные популярным автором, остаются в ленте,
+        когда подписчиков становится меньше порога."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        follow = Follow.objects.create(user=self.other, author=self.author)
+        post = Post.objects.create(text='Популярный пост', author=self.author)
+        follow.delete()
+        cache.clear()
+        self.assertEqual(list(follow_feed(self.reader)), [post])
+
+    @mock.patch('posts.timeline.TIMELINE_FANOUT_LIMIT', 2)
+    def test_merged_feed_pages(self):
+        """Смешанная лента читается без сортировки всех постов
+        и обходится страницами по курсору без пропусков и повторов."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.other)
+        posts = [
+            Post.objects.create(text=f'Тестовый текст {i}',
+                                author=(self.author, self.other)[i % 2])
+            for i in range(7)
+        ]
+        feed = follow_feed(self.reader)
+        self.assertIn('UNION ALL', str(feed.query))
+        self.assertEqual(list(feed), posts[::-1])
+        seen, cursor = [], None
+        while True:
+            paginator = KeysetPaginator(feed, 3, cursor=cursor)
+            seen += list(paginator.page())
+            cursor = paginator.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(seen, posts[::-1])
@@ -0,0 +1,122 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import AuthorStats, Comment, Follow, Group, Post, User
+
+
+class TransferTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Тестовый текст {i}', author=cls.author,
+                group=cls.group)
+            for i in range(5)
+        ]
+        cls.old_date = timezone.now() - timedelta(days=30)
+        Post.objects.filter(pk=cls.posts[0].pk).update(
+            pub_date=cls.old_date, updated=cls.old_date)
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'dump.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def call(self, name, *args):
+        out = StringIO()
+        call_command(name, self.path, *args, stdout=out)
+        return out.getvalue()
+
+    def snapshot(self):
+        return (
+            list(Group.objects.values_list('pk', 'slug')),
+            list(Post.objects.order_by('pk').values_list(
+                'pk', 'text', 'pub_date', 'author__username', 'group')),
+            list(Comment.objects.values_list(
+                'pk', 'post', 'author__username', 'text', 'created')),
+            list(Follow.objects.values_list(
+                'user__username', 'author__username')),
+        )
+
+    def clear(self):
+        for model in (Follow, Comment, Post, Group, User):
+            model.objects.all().delete()
+
+    def test_round_trip(self):
+        """Выгрузка и загрузка сохраняют id, даты и связи,
+        а производные данные пересчитываются."""
+        before = self.snapshot()
+        output = self.call('export_data', '--chunk', '2')
+        self.assertIn('строк/с', output)
+        self.clear()
+        self.call('import_data', '--batch', '2')
+        self.assertEqual(self.snapshot(), before)
+        author = User.objects.get(username='Author')
+        self.assertFalse(author.has_usable_password())
+        self.assertEqual(AuthorStats.objects.get(user=author).posts_count, 5)
+        self.assertEqual(
+            Post.objects.get(pk=self.posts[0].pk).updated, self.old_date)
+        reader = User.objects.get(username='Reader')
+        self.assertEqual(reader.timeline_entries.count(), 5)
+        self.assertFalse(os.path.exists(self.path + '.checkpoint'))
+
+    def test_import_is_idempotent(self):
+        """Повторная загрузка не создаёт дубликатов."""
+        self.call('export_data')
+        self.call('import_data')
+        self.call('import_data', '--skip-derived')
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(Follow.objects.count(), 1)
+
+    def test_resume_export(self):
+        """Выгрузка продолжается с контрольной точки без повторов,
+        недописанный хвост файла отбрасывается."""
+        self.call('export_data')
+        with open(self.path, 'rb') as source:
+            full = source.read()
+        lines = full.splitlines(keepends=True)
+        # Прервались после трёх постов, часть четвёртого уже записана.
+        offset = sum(len(line) for line in lines[:4])
+        with open(self.path, 'wb') as out:
+            out.write(full[:offset] + lines[4][:10])
+        with open(self.path + '.checkpoint', 'w') as out:
+            json.dump({'model': 'post', 'after': self.posts[2].pk,
+                       'offset': offset}, out)
+        self.call('export_data', '--resume')
+        with open(self.path, 'rb') as source:
+            self.assertEqual(source.read(), full)
+
+    def test_resume_import(self):
+        """Загрузка продолжается со строки после контрольной точки."""
+        self.call('export_data')
+        with open(self.path, 'rb') as source:
+            lines = source.readlines()
+        self.clear()
+        # Прошлый запуск успел загрузить только группу.
+        Group.objects.create(pk=self.group.pk, title='Группа', slug='group')
+        with open(self.path + '.checkpoint', 'w') as out:
+            json.dump({'offset': len(lines[0])}, out)
+        output = self.call('import_data', '--resume', '--skip-derived')
+        self.assertIn(f'всего: {len(lines) - 1} строк', output)
+        self.assertEqual(Post.objects.filter(group__slug='group').count(), 5)
@@ -0,0 +1,97 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import uploads
+from ..constants import UPLOAD_MAX_DIMENSION
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+ORIENTATION = 0x0112
+
+
+def make_upload(name, size, mode='RGB', format_name='JPEG', **options):
+    buffer = BytesIO()
+    image = Image.effect_noise(size, 64).convert(mode)
+    image.save(buffer, format_name, **options)
+    return SimpleUploadedFile(name=name, content=buffer.getvalue())
+
+
+def rotated_exif():
+    exif = Image.Exif()
+    exif[ORIENTATION] = 6
+    return exif.tobytes()
+
+
+class NormalizeTest(TestCase):
+    def test_downscale_and_strip_exif(self):
+        """Большой снимок уменьшается, поворачивается по EXIF,
+        а сам EXIF не сохраняется."""
+        upload = make_upload('photo.jpeg', (2200, 1100), quality=95,
+                             exif=rotated_exif())
+        with self.assertLogs('posts.uploads', 'INFO') as logs:
+            result = uploads.normalize(upload)
+        self.assertEqual(result.name, 'photo.jpg')
+        self.assertLess(result.size, upload.size)
+        self.assertIn('сэкономлено', logs.output[0])
+        image = Image.open(result)
+        self.assertEqual(image.format, 'JPEG')
+        self.assertEqual(image.size, (UPLOAD_MAX_DIMENSION // 2,
+                                      UPLOAD_MAX_DIMENSION))
+        self.assertNotIn('exif', image.info)
+
+    def test_transparency_kept(self):
+        upload = make_upload('logo.png', (2100, 100), 'RGBA', 'PNG')
+        image = Image.open(uploads.normalize(upload))
+        self.assertEqual(image.format, 'PNG')
+        self.assertEqual(image.mode, 'RGBA')
+        self.assertEqual(image.width, UPLOAD_MAX_DIMENSION)
+
+    def test_small_image_unchanged(self):
+        """Если пережатие не уменьшает файл, сохраняется оригинал."""
+        upload = make_upload('tiny.gif', (2, 1), 'P', 'GIF')
+        with self.assertLogs('posts.uploads', 'INFO'):
+            self.assertIs(uploads.normalize(upload), upload)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class UploadFormTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='Author')
+        self.client.force_login(self.user)
+
+    @override_settings(UPLOAD_IMAGE_VARIANTS=['webp', 'avif'])
+    def test_create_post(self):
+        """Пост сохраняется с обработанным изображением и копиями
+        в поддерживаемых форматах."""
+        Image.init()
+        supported = [name for name in ('WEBP', 'AVIF') if name in Image.SAVE]
+        with self.assertLogs('posts.uploads', 'INFO') as logs:
+            self.client.post(reverse('posts:post_create'), {
+                'text': 'Пост с фотографией',
+                'image': make_upload('photo.jpeg', (2400, 1800)),
+            })
+        post = Post.objects.get()
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        stem = post.image.name[:-len('.jpg')]
+        self.assertEqual(
+            Image.open(post.image.path).size, (UPLOAD_MAX_DIMENSION, 1536))
+        for name in ('WEBP', 'AVIF'):
+            variant = f'{stem}.{name.lower()}'
+            with self.subTest(variant=variant):
+                self.assertEqual(post.image.storage.exists(variant),
+                                 name in supported)
+        self.assertEqual(
+            sum('не умеет сохранять' in line for line in logs.output),
+            2 - len(supported))
@@ -0,0 +1,97 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..constants import POSTS_AMOUNT
+from ..models import Post, User
+from ..utils import KeysetPaginator, decode_cursor, encode_cursor
+
+
+class KeysetPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+        Post.objects.bulk_create([
+            Post(text=f'Тестовый текст {i}', author=cls.author)
+            for i in range(POSTS_AMOUNT * 2 + 5)
+        ])
+        cls.posts = Post.objects.select_related('author', 'group')
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self):
+        """Проходит ленту по курсорам next и возвращает все страницы."""
+        pages = []
+        cursor = None
+        while True:
+            paginator = KeysetPaginator(self.posts, POSTS_AMOUNT,
+                                        cursor=cursor)
+            pages.append(paginator.page())
+            if not paginator.has_next:
+                return pages
+            cursor = paginator.next_cursor
+
+    def test_walk_covers_all_posts_in_order(self):
+        """Курсоры проходят все посты без пропусков и повторов."""
+        pages = self.walk()
+        ids = [post.pk for page in pages for post in page]
+        expected = list(
+            self.posts.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual([len(page) for page in pages],
+                         [POSTS_AMOUNT, POSTS_AMOUNT, 5])
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Переход назад возвращает ту же страницу, что и вперёд."""
+        first, second, _ = self.walk()
+        paginator = KeysetPaginator(
+            self.posts, POSTS_AMOUNT,
+            cursor=second.paginator.previous_cursor, backwards=True)
+        page = paginator.page()
+        self.assertEqual(list(page), list(first))
+        self.assertFalse(paginator.has_previous)
+        self.assertTrue(paginator.has_next)
+
+    def test_page_costs_single_query(self):
+        """Страница выбирается одним запросом без COUNT."""
+        post = self.posts.order_by('-pub_date', '-pk')[POSTS_AMOUNT - 1]
+        paginator = KeysetPaginator(self.posts, POSTS_AMOUNT,
+                                    cursor=encode_cursor(post))
+        with CaptureQueriesContext(connection) as queries:
+            list(paginator.page())
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('COUNT', queries[0]['sql'])
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        """Некорректный курсор приводит к первой странице."""
+        for cursor in ('', 'мусор', 'bm90LWEtZGF0ZXwx'):
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(decode_cursor(cursor))
+                paginator = KeysetPaginator(self.posts, POSTS_AMOUNT,
+                                            cursor=cursor)
+                self.assertEqual(list(paginator.page()),
+                                 list(self.walk()[0]))
+
+    @override_settings(POSTS_KEYSET_PAGINATION=True)
+    def test_views_use_keyset_links(self):
+        """При включённой настройке ленты отдают ссылки по курсору."""
+        addresses = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=(self.author.username,)),
+        )
+        for address in addresses:
+            with self.subTest(address=address):
+                response = self.client.get(address)
+                paginator = response.context['page_obj'].paginator
+                self.assertIsInstance(paginator, KeysetPaginator)
+                self.assertContains(
+                    response, f'?after={paginator.next_cursor}')
+                response = self.client.get(
+                    address + f'?after={paginator.next_cursor}')
+                self.assertEqual(len(response.context['page_obj']),
+                                 POSTS_AMOUNT)
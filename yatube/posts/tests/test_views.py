@@ -5,6 +5,7 @@ from django import forms
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
@@ -315,6 +316,22 @@ class TestViewFollow(TestCase):
                     kwargs={'username': self.author.username}))
         self.assertEqual(Follow.objects.count(), count_followers + 1)
 
+    def test_repeated_follow_is_ignored(self):
+        """Проверка, что повторная подписка не создаёт дубликат
+        и не меняет счётчики."""
+        address = reverse('posts:profile_follow',
+                          kwargs={'username': self.author.username})
+        self.follower_client.get(address)
+        response = self.follower_client.get(address)
+        self.assertRedirects(response, reverse(
+            'posts:profile', kwargs={'username': self.author.username}))
+        self.assertEqual(
+            Follow.objects.filter(user=self.follower).count(), 1)
+        self.follower.stats.refresh_from_db()
+        self.assertEqual(self.follower.stats.following_count, 1)
+        with self.assertRaises(IntegrityError):
+            Follow.objects.create(user=self.follower, author=self.author)
+
     def test_follow_index_page(self):
         """Проверка, что в ленте подписчика отображаются посты автора,
         на которого он подписан."""
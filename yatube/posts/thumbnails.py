@@ -0,0 +1,171 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from .constants import (CARD_HEIGHT, CARD_WIDTHS, THUMBNAIL_JOB_ATTEMPTS,
+                        THUMBNAIL_JOB_TIMEOUT)
+from .kvstore import thumbnail_file
+from .models import Post, ThumbnailJob
+
+logger = logging.getLogger(__name__)
+
+Image.init()
+# Современные форматы, которые умеет сохранять установленный Pillow;
+# браузер выбирает их через <source type> в теге responsive_image.
+MODERN_FORMATS = tuple(
+    (format_name, f'image/{format_name.lower()}')
+    for format_name in ('AVIF', 'WEBP') if format_name in Image.SAVE
+)
+
+
+def card_geometries(format_name=None):
+    """Размеры карточки поста для srcset: (ширина, геометрия, опции)."""
+    options = {'crop': 'center', 'upscale': True}
+    if format_name:
+        options['format'] = format_name
+    return [
+        (width, f'{width}x{round(width * CARD_HEIGHT / CARD_WIDTHS[-1])}',
+         options)
+        for width in CARD_WIDTHS
+    ]
+
+
+# Размеры, которые запрашивают шаблоны постов.
+THUMBNAIL_GEOMETRIES = tuple(
+    (geometry, options)
+    for format_name in (None, *(name for name, _ in MODERN_FORMATS))
+    for _, geometry, options in card_geometries(format_name)
+)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def generate(image):
+    """Создаёт все миниатюры изображения и возвращает их имена.
+    image - файл поля Post.image или его имя."""
+    if isinstance(image, str):
+        # Ключ миниатюры в sorl включает хранилище исходника.
+        image = ImageFile(image, Post._meta.get_field('image').storage)
+    return [
+        get_thumbnail(image, geometry, **options).name
+        for geometry, options in THUMBNAIL_GEOMETRIES
+    ]
+
+
+def prefetch(images):
+    """Заранее загружает метаданные миниатюр всех изображений
+    одним обращением к кэшу и одним запросом к базе, если хранилище
+    sorl это умеет (см. kvstore.py)."""
+    if not hasattr(default.kvstore, 'prefetch'):
+        return
+    default.kvstore.prefetch([
+        thumbnail_file(image, geometry, **options)
+        for image in images if image
+        for geometry, options in THUMBNAIL_GEOMETRIES
+    ])
+
+
+def warm(names):
+    """Создаёт недостающие миниатюры для пачки изображений; выполняется
+    в дочернем процессе. Возвращает имена миниатюр и число ошибок."""
+    thumbnail_names, errors = [], 0
+    for name in names:
+        try:
+            names_created = generate(name)
+        except Exception:
+            logger.exception('Не удалось создать миниатюры %s', name)
+            names_created = [None]
+        # Для недоступного файла sorl возвращает заглушку без имени.
+        if not all(names_created):
+            errors += 1
+        thumbnail_names.extend(filter(None, names_created))
+    return thumbnail_names, errors
+
+
+def enqueue(post):
+    """Ставит задачу в очередь; после коммита она сразу уходит
+    в пул потоков, а оставшиеся подберёт thumbnail_worker."""
+    job = ThumbnailJob.objects.create(post=post)
+    if settings.THUMBNAIL_WORKERS > 0:
+        transaction.on_commit(lambda: submit(job.pk))
+    return job
+
+
+def submit(job_id):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    return _pool.submit(run_in_thread, job_id)
+
+
+def run_in_thread(job_id):
+    """Выполняет задачу в отдельном потоке со своим соединением с БД."""
+    close_old_connections()
+    try:
+        return process(job_id)
+    finally:
+        connection.close()
+
+
+def claim(job_id):
+    """Атомарно переводит задачу в работу; False, если её уже взял
+    другой исполнитель."""
+    return bool(ThumbnailJob.objects.filter(
+        pk=job_id, status=ThumbnailJob.PENDING,
+    ).update(status=ThumbnailJob.RUNNING, started=timezone.now()))
+
+
+def process(job_id):
+    """Выполняет задачу, если она ещё не взята. Возвращает True,
+    если миниатюры созданы."""
+    if not claim(job_id):
+        return False
+    job = ThumbnailJob.objects.select_related('post').get(pk=job_id)
+    job.attempts += 1
+    try:
+        if job.post.image:
+            generate(job.post.image)
+    except Exception as error:
+        logger.exception('Не удалось создать миниатюры поста %s',
+                         job.post_id)
+        job.error = str(error)
+        job.status = (ThumbnailJob.PENDING
+                      if job.attempts < THUMBNAIL_JOB_ATTEMPTS
+                      else ThumbnailJob.FAILED)
+    else:
+        job.status = ThumbnailJob.DONE
+        # Сохранение через модель сбрасывает кэш страниц с постом,
+        # а новая дата изменения - ETag страниц у клиентов.
+        job.post.thumbnails_ready = True
+        job.post.save(update_fields=('thumbnails_ready', 'updated'))
+    job.finished = timezone.now()
+    job.save(update_fields=('status', 'attempts', 'error', 'finished'))
+    return job.status == ThumbnailJob.DONE
+
+
+def pending(limit):
+    return list(ThumbnailJob.objects.filter(
+        status=ThumbnailJob.PENDING,
+    ).values_list('pk', flat=True)[:limit])
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи, исполнитель которых не ответил
+    за THUMBNAIL_JOB_TIMEOUT секунд."""
+    deadline = timezone.now() - timedelta(seconds=THUMBNAIL_JOB_TIMEOUT)
+    return ThumbnailJob.objects.filter(
+        status=ThumbnailJob.RUNNING, started__lt=deadline,
+    ).update(status=ThumbnailJob.PENDING)
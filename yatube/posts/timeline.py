@@ -0,0 +1,128 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from .constants import (CELEBRITIES_TIMEOUT, TIMELINE_BATCH_SIZE,
+                        TIMELINE_FANOUT_LIMIT, TIMELINE_LENGTH)
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+CELEBRITIES_KEY = 'timeline:celebrities'
+UNFANNED_KEY = 'timeline:unfanned'
+
+
+def celebrity_ids():
+    """Авторы, у которых подписчиков не меньше TIMELINE_FANOUT_LIMIT.
+    Их посты не раскладываются по лентам, а подмешиваются при чтении."""
+    ids = cache.get(CELEBRITIES_KEY)
+    if ids is None:
+        ids = set(AuthorStats.objects.filter(
+            followers_count__gte=TIMELINE_FANOUT_LIMIT,
+        ).values_list('user_id', flat=True))
+        cache.set(CELEBRITIES_KEY, ids, CELEBRITIES_TIMEOUT)
+    return ids
+
+
+def unfanned_author_ids():
+    """Авторы, у которых есть посты не из лент. Автор остаётся
+    здесь и после того, как подписчиков станет меньше порога:
+    его старые посты по-прежнему подмешиваются при чтении."""
+    ids = cache.get(UNFANNED_KEY)
+    if ids is None:
+        ids = set(Post.objects.filter(fanned_out=False).order_by(
+        ).values_list('author_id', flat=True).distinct())
+        cache.set(UNFANNED_KEY, ids, CELEBRITIES_TIMEOUT)
+    return ids
+
+
+def fan_out(post):
+    """Добавляет пост в ленты всех подписчиков автора. Пост популярного
+    автора только помечается как не разложенный."""
+    if post.author_id in celebrity_ids():
+        post.fanned_out = False
+        Post.objects.filter(pk=post.pk).update(fanned_out=False)
+        if post.author_id not in unfanned_author_ids():
+            transaction.on_commit(lambda: cache.delete(UNFANNED_KEY))
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id,
+    ).values_list('user_id', flat=True)
+    entries = [
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in followers.iterator()
+    ]
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=TIMELINE_BATCH_SIZE, ignore_conflicts=True)
+
+
+def backfill(user_id, author_id):
+    """Переносит последние посты автора в ленту нового подписчика."""
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date')[:TIMELINE_LENGTH]
+    entries = [
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for post_id, pub_date in posts
+    ]
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=TIMELINE_BATCH_SIZE, ignore_conflicts=True)
+
+
+def trim(user_id, author_id):
+    """Убирает посты автора из ленты отписавшегося пользователя."""
+    TimelineEntry.objects.filter(
+        user_id=user_id,
+        author_id=author_id,
+    ).delete()
+
+
+def follow_feed(user):
+    """
+    Лента подписок пользователя.
+    Посты читаются из материализованной ленты; не разложенные посты
+    авторов, на которых подписан пользователь, добавляются при чтении.
+    """
+    posts = Post.objects.select_related(
+        'author',
+        'group',
+    )
+    unfanned = unfanned_author_ids()
+    followed_unfanned = unfanned and list(
+        Follow.objects.filter(
+            user=user,
+            author_id__in=unfanned,
+        ).values_list('author_id', flat=True)
+    )
+    if not followed_unfanned:
+        # Сортировка по копии pub_date в ленте читает индекс
+        # (user, pub_date) без сортировки всех постов.
+        return posts.filter(
+            timeline_entries__user=user,
+        ).order_by('-timeline_entries__pub_date')
+
+    # Материализованная лента и посты каждого популярного автора
+    # читаются по своим индексам уже в порядке даты, и база сливает
+    # их без сортировки; условие с OR заставило бы сортировать все
+    # подходящие посты. Не разложенные посты, попавшие в ленту через
+    # backfill, берутся только из части автора, чтобы не повторяться.
+    timeline_posts = posts.filter(
+        timeline_entries__user=user,
+        fanned_out=True,
+    ).annotate(feed_date=F('timeline_entries__pub_date')).order_by()
+    unfanned_posts = [
+        posts.filter(
+            author_id=author_id,
+            fanned_out=False,
+        ).annotate(feed_date=F('pub_date')).order_by()
+        for author_id in followed_unfanned
+    ]
+    return timeline_posts.union(*unfanned_posts, all=True).order_by(
+        '-feed_date')
@@ -0,0 +1,134 @@
+"""Перенос данных в формате JSONL для команд export_data и import_data.
+
+Каждая строка - одна запись: {"model": "post", "id": 1, ...}.
+Пользователи передаются по username, остальные связи - по id,
+поэтому адреса групп и постов после переноса не меняются.
+Модели идут в порядке зависимостей: группы, посты, комментарии,
+подписки.
+"""
+import json
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.utils.dateparse import parse_datetime
+
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+
+class Spec:
+    """
+    Описание переносимой модели.
+    fields - имя поля в записи и путь для values_list при выгрузке,
+    users - поля записи, которые содержат username,
+    dates - поля с датами.
+    """
+
+    def __init__(self, name, model, fields, users=(), dates=()):
+        self.name = name
+        self.model = model
+        self.fields = fields
+        self.users = users
+        self.dates = dates
+
+    def rows(self, after, chunk_size):
+        """Записи с id больше after, не более chunk_size, по порядку id."""
+        queryset = self.model.objects.filter(pk__gt=after).order_by(
+            'pk').values_list(*self.fields.values())[:chunk_size]
+        for values in queryset.iterator(chunk_size):
+            record = dict(zip(self.fields, values))
+            for name in self.dates:
+                record[name] = record[name].isoformat()
+            yield {'model': self.name, **record}
+
+    def build(self, record, user_ids):
+        values = {}
+        for name in self.fields:
+            value = record.get(name)
+            if name in self.users:
+                values[f'{name}_id'] = user_ids[value]
+            elif name in self.dates:
+                values[name] = parse_datetime(value)
+            elif name in ('group', 'post'):
+                values[f'{name}_id'] = value
+            else:
+                values[name] = value
+        return self.model(**values)
+
+
+SPECS = (
+    Spec('group', Group, {
+        'id': 'pk',
+        'title': 'title',
+        'slug': 'slug',
+        'description': 'description',
+    }),
+    Spec('post', Post, {
+        'id': 'pk',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'updated': 'updated',
+        'author': 'author__username',
+        'group': 'group_id',
+        'image': 'image',
+        'thumbnails_ready': 'thumbnails_ready',
+    }, users=('author',), dates=('pub_date', 'updated')),
+    Spec('comment', Comment, {
+        'id': 'pk',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    }, users=('author',), dates=('created',)),
+    Spec('follow', Follow, {
+        'id': 'pk',
+        'user': 'user__username',
+        'author': 'author__username',
+    }, users=('user', 'author')),
+)
+SPECS_BY_NAME = {spec.name: spec for spec in SPECS}
+
+
+def dump(record):
+    return (json.dumps(record, ensure_ascii=False) + '\n').encode()
+
+
+def resolve_users(usernames):
+    """id пользователей по username; недостающие создаются
+    без пароля, войти они смогут после его сброса."""
+    user_ids = dict(User.objects.filter(
+        username__in=usernames).values_list('username', 'pk'))
+    missing = set(usernames) - set(user_ids)
+    if missing:
+        User.objects.bulk_create(
+            [User(username=name, password=make_password(None))
+             for name in missing],
+            ignore_conflicts=True,
+        )
+        user_ids.update(User.objects.filter(
+            username__in=missing).values_list('username', 'pk'))
+        AuthorStats.objects.bulk_create(
+            [AuthorStats(user_id=user_ids[name]) for name in missing],
+            ignore_conflicts=True,
+        )
+    return user_ids
+
+
+@contextmanager
+def original_dates():
+    """Отключает auto_now и auto_now_add, чтобы bulk_create
+    сохранил даты из выгрузки."""
+    fields = [
+        field
+        for spec in SPECS
+        for field in spec.model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    flags = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, flags):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
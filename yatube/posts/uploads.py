@@ -0,0 +1,104 @@
+"""Обработка загруженных изображений постов.
+
+Оригинал уменьшается до UPLOAD_MAX_DIMENSION по большей стороне,
+лишается EXIF (поворот из него применяется заранее) и пережимается
+в JPEG, а при прозрачности - в PNG. Результат пишется во временный
+файл, который остаётся в памяти только пока он небольшой; JPEG
+декодируется сразу в уменьшенном масштабе. Если пережатый файл
+не меньше исходного, а уменьшать и чистить было нечего, сохраняется
+исходный. Дополнительно можно сохранить копии в форматах
+из UPLOAD_IMAGE_VARIANTS, например WebP.
+"""
+import logging
+import os
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files import File
+from PIL import Image, ImageOps
+
+from .constants import UPLOAD_JPEG_QUALITY, UPLOAD_MAX_DIMENSION
+
+logger = logging.getLogger(__name__)
+
+# Сколько байт результата держать в памяти до переноса на диск.
+SPOOL_SIZE = 1024 * 1024
+VARIANT_OPTIONS = {
+    'WEBP': {'quality': 80, 'method': 6},
+    'AVIF': {'quality': 60},
+}
+
+
+def has_alpha(image):
+    return (image.mode in ('RGBA', 'LA', 'PA')
+            or (image.mode == 'P' and 'transparency' in image.info))
+
+
+def encode(image, format_name, output, **options):
+    if format_name == 'JPEG':
+        options.update(quality=UPLOAD_JPEG_QUALITY, progressive=True)
+    image.save(output, format_name, optimize=True, **options)
+
+
+def normalize(upload):
+    """Возвращает файл, который нужно сохранить вместо upload,
+    или сам upload, если обработка ничего не даёт."""
+    upload.seek(0)
+    image = Image.open(upload)
+    if getattr(image, 'is_animated', False):
+        return upload
+    limit = (UPLOAD_MAX_DIMENSION, UPLOAD_MAX_DIMENSION)
+    oversized = max(image.size) > UPLOAD_MAX_DIMENSION
+    if oversized:
+        # Для JPEG декодер сразу уменьшает картинку в 2-8 раз.
+        image.draft('RGB', limit)
+    has_metadata = 'exif' in image.info
+    icc_profile = image.info.get('icc_profile')
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail(limit, Image.LANCZOS)
+    alpha = has_alpha(image)
+    format_name, extension = ('PNG', '.png') if alpha else ('JPEG', '.jpg')
+    image = image.convert('RGBA' if alpha else 'RGB')
+
+    output = SpooledTemporaryFile(SPOOL_SIZE)
+    encode(image, format_name, output,
+           **({'icc_profile': icc_profile} if icc_profile else {}))
+    size = output.tell()
+    if size >= upload.size and not (oversized or has_metadata):
+        output.close()
+        logger.info('Изображение %s сохранено без изменений: %d байт',
+                    upload.name, upload.size)
+        return upload
+    name = os.path.splitext(upload.name)[0] + extension
+    logger.info(
+        'Изображение %s сохранено как %s: %d -> %d байт, сэкономлено %d',
+        upload.name, name, upload.size, size, upload.size - size)
+    output.seek(0)
+    return File(output, name=name)
+
+
+def save_variants(field_file):
+    """Сохраняет рядом с изображением копии в форматах
+    UPLOAD_IMAGE_VARIANTS и возвращает их имена. Форматы,
+    которые не поддерживает установленный Pillow, пропускаются."""
+    names = []
+    formats = [name.upper() for name in settings.UPLOAD_IMAGE_VARIANTS]
+    if not formats:
+        return names
+    with field_file.open('rb'):
+        image = Image.open(field_file)
+        image.load()
+    # Загружает все модули форматов, а с ними и Image.SAVE.
+    Image.init()
+    for format_name in formats:
+        if format_name not in Image.SAVE:
+            logger.warning('Pillow не умеет сохранять %s', format_name)
+            continue
+        output = SpooledTemporaryFile(SPOOL_SIZE)
+        image.save(output, format_name, **VARIANT_OPTIONS.get(format_name, {}))
+        output.seek(0)
+        names.append(field_file.storage.save(
+            f'{os.path.splitext(field_file.name)[0]}.{format_name.lower()}',
+            File(output)))
+        output.close()
+    return names
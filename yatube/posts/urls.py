@@ -15,7 +15,18 @@ urlpatterns = [
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('profile/<str:username>/feed/', views.profile_feed,
+         name='profile_feed'),
+    path('profile/<str:username>/feed/rss/', views.profile_feed,
+         {'feed_format': 'rss'}, name='profile_rss'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path('group/<slug:slug>/feed/', views.group_feed, name='group_feed'),
+    path('group/<slug:slug>/feed/rss/', views.group_feed,
+         {'feed_format': 'rss'}, name='group_rss'),
+    path('feed/', views.index_feed, name='index_feed'),
+    path('feed/rss/', views.index_feed, {'feed_format': 'rss'},
+         name='index_rss'),
+    path('search/', views.search, name='search'),
     path('create/', views.post_create, name='post_create'),
     path('', views.index, name='index'),
 ]
@@ -1,12 +1,160 @@
-from django.core.paginator import Paginator
+import base64
+import hashlib
 
-from .constants import POSTS_AMOUNT
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from .constants import APPROXIMATE_COUNT_TIMEOUT, POSTS_AMOUNT
 
 
 def pagin(request, posts):
     """ Функция-утилита для деления постов по страницам."""
+    if settings.POSTS_KEYSET_PAGINATION:
+        return keyset_page(request, posts, POSTS_AMOUNT, approximate=True)
+
     paginator = Paginator(posts, POSTS_AMOUNT)
     page_number = request.GET.get('page')
-    paginator.get_page(page_number)
 
     return paginator.get_page(page_number)
+
+
+def keyset_page(request, queryset, per_page, **kwargs):
+    """Страница по курсору из параметров after/before запроса."""
+    before = request.GET.get('before')
+    paginator = KeysetPaginator(
+        queryset,
+        per_page,
+        cursor=before or request.GET.get('after'),
+        backwards=bool(before),
+        **kwargs,
+    )
+    return paginator.get_page()
+
+
+def encode_cursor(obj, field='pub_date'):
+    """Кодирует позицию объекта (field, id) в непрозрачную строку."""
+    raw = f'{getattr(obj, field).isoformat()}|{obj.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Возвращает пару (дата, id) или None для некорректного курсора."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        pub_date, pk = raw.rsplit('|', 1)
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (ValueError, UnicodeError):
+        return None
+    if pub_date is None:
+        return None
+    return pub_date, pk
+
+
+def approximate_count(queryset):
+    """Количество записей, закэшированное на APPROXIMATE_COUNT_TIMEOUT.
+    COUNT(*) выполняется не чаще одного раза за период для каждого
+    уникального запроса."""
+    sql = str(queryset.order_by().query)
+    key = 'approx_count:' + hashlib.md5(sql.encode()).hexdigest()
+    return cache.get_or_set(
+        key, queryset.order_by().count, APPROXIMATE_COUNT_TIMEOUT)
+
+
+class KeysetPaginator(Paginator):
+    """
+    Пагинатор по курсору (дата, id).
+    Вместо OFFSET страница выбирается условием по ключу сортировки,
+    поэтому стоимость перехода не зависит от глубины страницы,
+    а COUNT(*) выполняется только при обращении к count.
+    cursor - закодированная позиция крайнего объекта соседней страницы,
+    backwards - выбрать страницу, предшествующую курсору,
+    approximate - брать общее количество из кэша,
+    ordering - поле даты и направление сортировки, id добавляется сам.
+    """
+
+    is_keyset = True
+    ordering = ('-pub_date', '-pk')
+
+    def __init__(self, object_list, per_page, cursor=None,
+                 backwards=False, approximate=False, ordering=None,
+                 **kwargs):
+        if ordering is not None:
+            prefix = '-' if ordering.startswith('-') else ''
+            self.ordering = (ordering, f'{prefix}pk')
+        super().__init__(
+            object_list.order_by(*self.ordering), per_page, **kwargs)
+        self.field = self.ordering[0].lstrip('-')
+        self.cursor = decode_cursor(cursor)
+        self.backwards = backwards and self.cursor is not None
+        self.approximate = approximate
+        self.has_next = False
+        self.has_previous = False
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    @cached_property
+    def count(self):
+        if self.approximate:
+            return approximate_count(self.object_list)
+        return super().count
+
+    def _filtered(self):
+        queryset = self.object_list
+        ordering = self.ordering
+        if self.backwards:
+            ordering = tuple(
+                name[1:] if name.startswith('-') else f'-{name}'
+                for name in ordering
+            )
+        if self.cursor is None:
+            return queryset.order_by(*ordering)
+        value, pk = self.cursor
+        lookup = 'lt' if ordering[0].startswith('-') else 'gt'
+        # Избыточное нестрогое условие по дате превращает OR-предикат
+        # в поиск по диапазону индекса вместо сканирования с начала.
+        condition = Q(
+            Q(**{f'{self.field}__{lookup}': value})
+            | Q(**{self.field: value, f'pk__{lookup}': pk}),
+            **{f'{self.field}__{lookup}e': value},
+        )
+        if not queryset.query.combinator:
+            return queryset.filter(condition).order_by(*ordering)
+        # К объединению запросов (лента подписок) filter не применяется:
+        # условие добавляется в каждую часть.
+        parts = [
+            QuerySet(queryset.model, query.clone()).filter(condition)
+            for query in queryset.query.combined_queries
+        ]
+        return parts[0].union(
+            *parts[1:], all=queryset.query.combinator_all,
+        ).order_by(*ordering)
+
+    def get_page(self, number=None):
+        return self.page(number)
+
+    def page(self, number=None):
+        rows = list(self._filtered()[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if self.backwards:
+            rows.reverse()
+            self.has_previous = has_more
+            self.has_next = True
+        else:
+            self.has_previous = self.cursor is not None
+            self.has_next = has_more
+        if rows:
+            if self.has_next:
+                self.next_cursor = encode_cursor(rows[-1], self.field)
+            if self.has_previous:
+                self.previous_cursor = encode_cursor(rows[0], self.field)
+        else:
+            self.has_next = self.has_previous = False
+        return Page(rows, 1, self)
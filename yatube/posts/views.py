@@ -1,11 +1,28 @@
+from urllib.parse import urlencode
+
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.db import IntegrityError, transaction
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+from .cache import cache_anonymous_page
+from .comments import save_comment
+from .conditional import (PageVersion, last_comment, last_post_update,
+                          posts_total)
+from .constants import COMMENTS_AMOUNT, POSTS_AMOUNT
+from .feeds import feed_response
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post, User
-from .utils import pagin
+from .search import find
+from .stats import author_stats
+from .timeline import follow_feed
+from .utils import keyset_page, pagin
 
 
+@cache_anonymous_page('index')
 def index(request):
     """
     Метод, предназначенный для вывода данных при
@@ -23,12 +40,26 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@cache_anonymous_page('group:{slug}')
 def group_posts(request, slug):
     """
     Метод, предназначенный для вывода данных при
     обращении к публикациям в тематической группе.
     """
-    group = get_object_or_404(Group, slug=slug)
+    group = get_object_or_404(Group.objects.annotate(
+        posts_updated=last_post_update('group'),
+        posts_total=posts_total('group'),
+    ), slug=slug)
+    version = PageVersion(
+        request,
+        group.posts_updated,
+        group.title,
+        group.description,
+        group.posts_total,
+    )
+    if version.response:
+
+        return version.response
     posts = group.posts.select_related(
         'author',
         'group',
@@ -39,33 +70,52 @@ def group_posts(request, slug):
         'page_obj': page_obj,
     }
 
-    return render(request, 'posts/group_list.html', context)
+    return version.finish(render(request, 'posts/group_list.html', context))
 
 
+@cache_anonymous_page('profile:{username}')
 def profile(request, username):
     """
     Метод, предназначенный для данных
     обо всех записях пользователя.
     """
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.select_related(
-        'author',
-        'group',
+    author = get_object_or_404(
+        User.objects.select_related('stats').annotate(
+            posts_updated=last_post_update('author'),
+        ),
+        username=username,
     )
-    page_obj = pagin(request, posts)
     following = request.user.is_authenticated and (
         Follow.objects.filter(
             user=request.user,
             author=author,
         ).exists()
     )
+    stats = author_stats(author)
+    version = PageVersion(
+        request,
+        author.posts_updated,
+        author.get_full_name(),
+        stats.posts_count,
+        stats.followers_count,
+        stats.following_count,
+        following,
+    )
+    if version.response:
+
+        return version.response
+    posts = author.posts.select_related(
+        'author',
+        'group',
+    )
+    page_obj = pagin(request, posts)
     context = {
         'author': author,
         'page_obj': page_obj,
         'following': following,
     }
 
-    return render(request, 'posts/profile.html', context)
+    return version.finish(render(request, 'posts/profile.html', context))
 
 
 def post_detail(request, post_id):
@@ -73,12 +123,28 @@ def post_detail(request, post_id):
     о деталях записи.
     """
     post = get_object_or_404(Post.objects.select_related(
-        'author',
+        'author__stats',
         'group',
-    ), id=post_id)
+    ).annotate(last_comment=last_comment()), id=post_id)
+    stats = author_stats(post.author)
+    version = PageVersion(
+        request,
+        max(post.updated, post.last_comment or post.updated),
+        post.author.get_full_name(),
+        post.group and post.group.title,
+        stats.posts_count,
+        stats.followers_count,
+        stats.following_count,
+    )
+    if version.response:
+
+        return version.response
     form = CommentForm(request.POST or None)
-    comments = post.comments.select_related(
-        'post',
+    comments = keyset_page(
+        request,
+        post.comments.select_related('author'),
+        COMMENTS_AMOUNT,
+        ordering='created',
     )
     context = {
         'post': post,
@@ -86,7 +152,64 @@ def post_detail(request, post_id):
         'comments': comments,
     }
 
-    return render(request, 'posts/post_detail.html', context)
+    return version.finish(render(request, 'posts/post_detail.html', context))
+
+
+def search(request):
+    """Метод, предназначенный для полнотекстового поиска
+    по постам и комментариям к ним."""
+    query = request.GET.get('q', '').strip()
+    page_obj = Paginator(find(query) if query else [], POSTS_AMOUNT).get_page(
+        request.GET.get('page'))
+    posts = Post.objects.select_related(
+        'author',
+        'group',
+    ).in_bulk(page_obj.object_list)
+    page_obj.object_list = [
+        posts[pk] for pk in page_obj.object_list if pk in posts
+    ]
+    context = {
+        'query': query,
+        'query_string': urlencode({'q': query}) + '&' if query else '',
+        'page_obj': page_obj,
+    }
+
+    return render(request, 'posts/search.html', context)
+
+
+def index_feed(request, feed_format='atom'):
+    """Лента Atom или RSS последних записей сайта."""
+    return feed_response(request, 'index', feed_format, lambda: (
+        'Последние обновления на сайте',
+        reverse('posts:index'),
+        Post.objects.select_related('author', 'group'),
+    ))
+
+
+def group_feed(request, slug, feed_format='atom'):
+    """Лента Atom или RSS записей тематической группы."""
+    def load():
+        group = get_object_or_404(Group, slug=slug)
+        return (
+            f'Записи сообщества {group.title}',
+            reverse('posts:group_list', args=(slug,)),
+            group.posts.select_related('author', 'group'),
+        )
+
+    return feed_response(request, f'group:{slug}', feed_format, load)
+
+
+def profile_feed(request, username, feed_format='atom'):
+    """Лента Atom или RSS записей пользователя."""
+    def load():
+        author = get_object_or_404(User, username=username)
+        return (
+            f'Записи пользователя {author.get_full_name() or username}',
+            reverse('posts:profile', args=(username,)),
+            author.posts.select_related('author', 'group'),
+        )
+
+    return feed_response(request, f'profile:{username}', feed_format, load)
 
 
 @login_required
@@ -143,14 +266,25 @@ def post_edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
-    """Метод, предназначенный для комментирования записей."""
-    post = get_object_or_404(Post.objects.all(), id=post_id)
+    """Метод, предназначенный для комментирования записей.
+    На запрос из JavaScript отвечает JSON с готовым фрагментом
+    комментария вместо перенаправления на страницу поста."""
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
-        comment.post = post
-        comment.save()
+        comment.post_id = post_id
+        if not save_comment(comment):
+            raise Http404
+        if request.is_ajax():
+            return JsonResponse({
+                'id': comment.pk,
+                'html': render_to_string(
+                    'posts/includes/comment_item.html',
+                    {'comment': comment}, request),
+            }, status=201)
+    elif request.is_ajax():
+        return JsonResponse({'errors': form.errors}, status=400)
 
     return redirect('posts:post_detail', post_id=post_id)
 
@@ -159,10 +293,7 @@ def add_comment(request, post_id):
 def follow_index(request):
     """Метод, предназаначенный для получения постов автора,
     на которого подписан текущий пользователь."""
-    posts = Post.objects.select_related(
-        'author',
-        'group',
-    ).filter(author__following__user=request.user)
+    posts = follow_feed(request.user)
     page_obj = pagin(request, posts)
     context = {
         'page_obj': page_obj,
@@ -174,12 +305,13 @@ def follow_index(request):
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    if author == request.user or Follow.objects.filter(
-            user=request.user, author=author).exists():
-
-        return redirect('posts:profile', username)
-
-    Follow.objects.create(user=request.user, author=author)
+    if author != request.user:
+        try:
+            with transaction.atomic():
+                Follow.objects.create(user=request.user, author=author)
+        except IntegrityError:
+            # Подписка уже есть: уникальность проверяет база.
+            pass
 
     return redirect('posts:profile', username)
 
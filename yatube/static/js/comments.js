@@ -0,0 +1,31 @@
+// Отправляет комментарий без перезагрузки страницы и добавляет
+// в список готовый фрагмент из ответа. Без JavaScript форма
+// работает как обычно.
+document.querySelectorAll('form[data-comments]').forEach(function (form) {
+  form.addEventListener('submit', function (event) {
+    event.preventDefault();
+    var button = form.querySelector('[type=submit]');
+    button.disabled = true;
+    fetch(form.action, {
+      method: 'POST',
+      body: new FormData(form),
+      credentials: 'same-origin',
+      headers: {'X-Requested-With': 'XMLHttpRequest'},
+    }).then(function (response) {
+      if (response.status === 201) {
+        return response.json().then(function (data) {
+          document.getElementById(form.dataset.comments)
+            .insertAdjacentHTML('beforeend', data.html);
+          form.reset();
+        });
+      }
+      if (response.status !== 400) {
+        form.submit();
+      }
+    }).catch(function () {
+      form.submit();
+    }).finally(function () {
+      button.disabled = false;
+    });
+  });
+});
@@ -26,16 +26,20 @@ INSTALLED_APPS = [
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
     'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
+    'core.nplusone.NPlusOneMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.replicas.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
@@ -72,6 +76,37 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения: пути к файлам SQLite через запятую
+# или собственные записи в DATABASES с именами из REPLICA_DATABASES.
+REPLICA_DATABASES = []
+for number, name in enumerate(
+        filter(None, os.getenv('DATABASE_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+# Представления, которые могут читать с реплик.
+REPLICA_VIEWS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+    'api:v1:post_list',
+    'api:v1:post_detail',
+    'api:v1:comment_list',
+    'api:v1:group_list',
+    'api:v1:group_detail',
+)
+
+# Сколько секунд после записи сессия читает только из default.
+REPLICA_PIN_SECONDS = 5
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -104,6 +139,16 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 
+# collectstatic собирает сюда файлы с хешами в именах и их копии
+# .gz и .br; отдаёт их слой core.static.StaticFiles из wsgi.py.
+STATIC_ROOT = os.getenv(
+    'STATIC_ROOT', os.path.join(BASE_DIR, 'collected_static'))
+
+STATICFILES_STORAGE = 'core.static.CompressedManifestStaticFilesStorage'
+
+# Время кэширования статики без хеша в имени, секунды.
+STATIC_MAX_AGE = 60 * 60
+
 LOGIN_URL = 'users:login'
 
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -120,12 +165,72 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CASHES = {
-    'default': {
-        'BACKEND': 'django.core.cash.backends.locmem.LocMemCashe',
-    }
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')),
+    },
+    'redis': {
+        'BACKEND': 'core.cache.resp.RespCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', 'redis://127.0.0.1:6379/0'),
+    },
 }
 
+CACHES = {
+    'default': CACHE_BACKENDS[CACHE_BACKEND],
+}
+
+PAGE_CACHE_TIMEOUT = 60 * 15
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
+
+POSTS_KEYSET_PAGINATION = False
+
+# Сколько потоков веб-процесса сразу создают миниатюры новых постов;
+# 0 - задачи разбирает только команда thumbnail_worker. С SQLite
+# лучше оставить 0: запись из нескольких потоков упирается в блокировки.
+THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', 0))
+
+# Метаданные миниатюр: кэш и база, как в sorl, плюс пакетная загрузка
+# для страницы постов и LRU в памяти процесса.
+THUMBNAIL_KVSTORE = os.getenv(
+    'THUMBNAIL_KVSTORE', 'posts.kvstore.BatchedKVStore')
+
+# Поисковый индекс: fts5 (SQLite FTS5), inverted (таблица SearchEntry)
+# или auto - FTS5, если база его поддерживает.
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'auto')
+
+# Метрики запросов в памяти процесса, отдаются на /metrics.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') == '1'
+METRICS_ALLOWED_IPS = INTERNAL_IPS + list(
+    filter(None, os.getenv('METRICS_ALLOWED_IPS', '').split(',')))
+# Запросы не быстрее этого порога пишутся в журнал core.metrics
+# вместе с METRICS_SLOW_TOP_QUERIES самыми долгими SQL-запросами.
+METRICS_SLOW_REQUEST_SECONDS = float(
+    os.getenv('METRICS_SLOW_REQUEST_SECONDS', 1.0))
+METRICS_SLOW_TOP_QUERIES = 5
+
+# Поиск N+1: off, warn (журнал core.nplusone) или raise (для тестов).
+NPLUSONE_MODE = os.getenv('NPLUSONE_MODE', 'off')
+# Сколько раз за запрос может повториться один SELECT.
+NPLUSONE_THRESHOLD = int(os.getenv('NPLUSONE_THRESHOLD', 5))
+# manage.py test проверяет каждый запрос тестов в режиме raise.
+TEST_RUNNER = 'core.test_runner.NPlusOneRunner'
+
+# Сколько секунд собирать комментарии в одну вставку. На горячих
+# постах с SQLite помогает окно в 0.01-0.05 с; 0 - пачка складывается
+# только из комментариев, пришедших во время предыдущей записи.
+COMMENT_BUFFER_WINDOW = float(os.getenv('COMMENT_BUFFER_WINDOW', 0))
+
+# Дополнительные форматы загруженных изображений через запятую,
+# например webp,avif; формат должен поддерживаться установленным Pillow.
+UPLOAD_IMAGE_VARIANTS = list(
+    filter(None, os.getenv('UPLOAD_IMAGE_VARIANTS', '').split(',')))